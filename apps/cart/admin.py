@@ -1,3 +1,22 @@
 from django.contrib import admin
+from apps.cart.models import Cart, CartItem
 
-# Register your models here.
+
+class CartItemInline(admin.TabularInline):
+    model = CartItem
+    extra = 0
+    # Solo lectura: cambiar cantidades o reservas a mano desincroniza el stock reservado
+    fields = ('product', 'quantity', 'price', 'original_price', 'held_quantity', 'held_until', 'updated_at')
+    readonly_fields = fields
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Cart)
+class CartAdmin(admin.ModelAdmin):
+    list_display = ('user', 'created_at', 'updated_at')
+    search_fields = ('user__username', 'user__email')
+    readonly_fields = ('user', 'created_at', 'updated_at')
+    inlines = [CartItemInline]
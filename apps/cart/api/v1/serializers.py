@@ -0,0 +1,50 @@
+from rest_framework import serializers
+from apps.cart.models import Cart, CartItem
+from apps.orders.api.v1.serializers import AddressSerializer
+from apps.orders.choices import PaymentMethod
+from apps.shop.api.v1.serializers import ProductListSerializer
+from apps.shop.models import Product
+
+
+class CartLineSerializer(serializers.ModelSerializer):
+    """Respuesta liviana de agregar o cambiar una línea: el producto solo por id."""
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = CartItem
+        fields = ['product', 'quantity', 'price', 'original_price', 'subtotal', 'held_quantity', 'held_until']
+
+
+class CartItemSerializer(CartLineSerializer):
+    product = ProductListSerializer(read_only=True)
+
+
+class CartSerializer(serializers.ModelSerializer):
+    items = CartItemSerializer(many=True, read_only=True)
+    items_count = serializers.SerializerMethodField()
+    total = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Cart
+        fields = ['items', 'items_count', 'total', 'updated_at']
+
+    def get_items_count(self, obj):
+        return sum(item.quantity for item in obj.items.all())
+
+    def get_total(self, obj):
+        return sum(item.subtotal for item in obj.items.all())
+
+
+class CartItemAddSerializer(serializers.Serializer):
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all())
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class CartItemUpdateSerializer(serializers.Serializer):
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class CheckoutSerializer(serializers.Serializer):
+    address = AddressSerializer()
+    payment_method = serializers.ChoiceField(choices=PaymentMethod.choices)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
@@ -0,0 +1,10 @@
+from django.urls import path
+from .views import CartViewSet
+
+urlpatterns = [
+    path('', CartViewSet.as_view({'get': 'list', 'delete': 'clear'}), name='cart'),
+    path('items/', CartViewSet.as_view({'post': 'add'}), name='cart-items'),
+    path('items/<int:product_id>/', CartViewSet.as_view({'patch': 'update_item', 'delete': 'remove'}), name='cart-item'),
+    path('hold/', CartViewSet.as_view({'post': 'hold'}), name='cart-hold'),
+    path('checkout/', CartViewSet.as_view({'post': 'checkout'}), name='cart-checkout'),
+]
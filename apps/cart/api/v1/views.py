@@ -0,0 +1,92 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from rest_framework import status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from apps.cart import services
+from apps.cart.models import CartItem
+from apps.orders.api.v1.serializers import OrderSerializer
+from apps.orders.api.v1.views import order_queryset
+from apps.shop.models import Product, ProductImage
+from .serializers import (
+    CartItemAddSerializer, CartItemUpdateSerializer, CartLineSerializer, CartSerializer, CheckoutSerializer,
+)
+
+
+class CartViewSet(viewsets.GenericViewSet):
+    """Carrito del usuario: las líneas se identifican por producto (ver apps/cart/services.py)."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = CartSerializer
+    # Solo para el esquema OpenAPI: las vistas trabajan sobre el carrito del usuario
+    queryset = CartItem.objects.none()
+    query_budget = {'list': 6, 'clear': 6, 'add': 10, 'update_item': 10, 'remove': 6, 'hold': 14, 'checkout': 30}
+
+    def get_serializer_class(self):
+        return {
+            'add': CartItemAddSerializer,
+            'update_item': CartItemUpdateSerializer,
+            'checkout': CheckoutSerializer,
+        }.get(self.action, CartSerializer)
+
+    def cart_response(self, cart):
+        items = CartItem.objects.select_related('product__category', 'product__brand').prefetch_related(
+            Prefetch('product__large_pictures', queryset=ProductImage.objects.order_by('id'))
+        ).order_by('id')
+        prefetch_related_objects([cart], Prefetch('items', queryset=items))
+        return Response(CartSerializer(cart, context=self.get_serializer_context()).data)
+
+    def validated(self):
+        serializer = self.get_serializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def list(self, request, *args, **kwargs):
+        return self.cart_response(services.get_cart(request.user))
+
+    def clear(self, request, *args, **kwargs):
+        services.clear_cart(services.get_cart(request.user))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def add(self, request, *args, **kwargs):
+        data = self.validated()
+        try:
+            item = services.set_item(services.get_cart(request.user), data['product'], data['quantity'], add=True)
+        except DjangoValidationError as e:
+            raise ValidationError(e.messages)
+        return Response(CartLineSerializer(item).data, status=status.HTTP_201_CREATED)
+
+    def update_item(self, request, product_id, *args, **kwargs):
+        data = self.validated()
+        product = get_object_or_404(Product, pk=product_id)
+        try:
+            item = services.set_item(services.get_cart(request.user), product, data['quantity'])
+        except CartItem.DoesNotExist:
+            raise Http404
+        except DjangoValidationError as e:
+            raise ValidationError(e.messages)
+        return Response(CartLineSerializer(item).data)
+
+    def remove(self, request, product_id, *args, **kwargs):
+        if not services.remove_item(services.get_cart(request.user), product_id):
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def hold(self, request, *args, **kwargs):
+        cart = services.get_cart(request.user)
+        try:
+            services.hold_cart(cart)
+        except DjangoValidationError as e:
+            raise ValidationError(e.messages)
+        return self.cart_response(cart)
+
+    def checkout(self, request, *args, **kwargs):
+        data = self.validated()
+        try:
+            order = services.checkout(request.user, data['address'], data['payment_method'], data['notes'])
+        except DjangoValidationError as e:
+            raise ValidationError(e.messages)
+        order = order_queryset().get(pk=order.pk)
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
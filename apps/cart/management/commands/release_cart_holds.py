@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from apps.cart.services import SWEEP_BATCH_SIZE, release_expired_holds
+
+
+class Command(BaseCommand):
+    help = "Returns the stock of expired cart holds (run every minute from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        released = release_expired_holds(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{released} expired cart holds released"))
+
+# * * * * * python manage.py release_cart_holds
@@ -1,3 +1,43 @@
 from django.db import models
+from django.contrib.auth.models import User
+from django.core.validators import MinValueValidator
+from apps.shop.models import Product
 
-# Create your models here.
+
+class Cart(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Carrito de {self.user}'
+
+class CartItem(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    # Precios de get_display_price al agregar o reservar la línea
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    original_price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Unidades ya descontadas del stock por la reserva (0 sin reserva) y su vencimiento.
+    # Una reserva vencida sigue descontada hasta que release_cart_holds la devuelve
+    held_quantity = models.PositiveIntegerField(default=0)
+    held_until = models.DateTimeField(null=True, blank=True)
+    added_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
+        indexes = [
+            # Barrido de reservas vencidas
+            models.Index(fields=['held_until', 'id'], name='cart_item_held_idx'),
+        ]
+
+    @property
+    def subtotal(self):
+        return self.quantity * self.price
+
+    def is_held(self, now):
+        return self.held_quantity > 0 and self.held_until is not None and self.held_until > now
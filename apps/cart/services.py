@@ -0,0 +1,159 @@
+"""
+Carrito en el servidor con reservas de stock opcionales.
+
+Agregar, cambiar o quitar una línea sin reserva es un INSERT, UPDATE o DELETE
+sobre su fila; el stock solo se toca si la línea está reservada. POST /cart/hold/ valida el
+carrito completo: descuenta del stock lo que falta reservar con un solo UPDATE
+(apps.shop.stock) y renueva los precios. El checkout convierte el carrito en
+pedido sin volver a validar las líneas reservadas: su stock ya está descontado
+y se respeta el precio reservado mientras la reserva esté vigente.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.cart.models import Cart, CartItem
+from apps.orders.services import create_order
+from apps.shop.models import Product
+from apps.shop.stock import decrease_stock, increase_stock
+
+SWEEP_BATCH_SIZE = 1000
+
+
+def get_cart(user):
+    cart, _ = Cart.objects.get_or_create(user=user)
+    return cart
+
+
+def _adjust_hold(item, quantity):
+    """Lleva la reserva de la línea a `quantity` unidades; una línea reservada lo está completa."""
+    delta = quantity - item.held_quantity
+    if delta > 0:
+        decrease_stock([(item.product_id, delta)])
+    elif delta < 0:
+        increase_stock([(item.product_id, -delta)])
+    item.held_quantity = quantity
+
+
+def set_item(cart, product, quantity, add=False):
+    """
+    Con `add` suma `quantity` a la línea de `product` (creándola si falta); sin
+    `add` fija la cantidad de una línea existente (CartItem.DoesNotExist si no
+    está). El precio se vuelve a tomar de get_display_price.
+    """
+    price, original_price = product.get_display_price()
+    snapshot = {'price': price, 'original_price': original_price}
+    lines = CartItem.objects.filter(cart=cart, product=product)
+    # Línea sin reserva: un UPDATE, sin bloquearla antes
+    if lines.filter(held_quantity=0).update(
+        quantity=F('quantity') + quantity if add else quantity, updated_at=timezone.now(), **snapshot
+    ):
+        return lines.get()
+    if add:
+        try:
+            with transaction.atomic():
+                return CartItem.objects.create(cart=cart, product=product, quantity=quantity, **snapshot)
+        except IntegrityError:
+            pass  # La línea existe y está reservada
+    with transaction.atomic():
+        item = lines.select_for_update().get()
+        quantity = item.quantity + quantity if add else quantity
+        # El barrido pudo liberar la reserva entre el UPDATE y el bloqueo
+        if item.held_quantity:
+            _adjust_hold(item, quantity)
+        item.quantity, item.price, item.original_price = quantity, price, original_price
+        item.save(update_fields=['quantity', 'price', 'original_price', 'held_quantity', 'updated_at'])
+    return item
+
+
+def remove_item(cart, product_id):
+    """Quita la línea y devuelve su reserva; False si no estaba en el carrito."""
+    with transaction.atomic():
+        item = CartItem.objects.select_for_update().filter(cart=cart, product_id=product_id).first()
+        if item is None:
+            return False
+        if item.held_quantity:
+            increase_stock([(item.product_id, item.held_quantity)])
+        item.delete()
+    return True
+
+
+def clear_cart(cart):
+    with transaction.atomic():
+        held = list(cart.items.select_for_update().filter(held_quantity__gt=0).values_list('product_id', 'held_quantity'))
+        increase_stock(held)
+        cart.items.all().delete()
+
+
+def hold_cart(cart, now=None):
+    """
+    Reserva el stock de todas las líneas por CART_HOLD_SECONDS y renueva sus
+    precios. O alcanza para todas o no se reserva ninguna (InsufficientStock).
+    """
+    if not settings.CART_HOLD_SECONDS:
+        raise ValidationError('Las reservas de stock están deshabilitadas.')
+    now = now or timezone.now()
+    with transaction.atomic():
+        items = list(cart.items.select_for_update().order_by('product_id'))
+        if not items:
+            raise ValidationError('El carrito está vacío.')
+        products = Product.objects.in_bulk([item.product_id for item in items])
+        for item in items:
+            item.price, item.original_price = products[item.product_id].get_display_price()
+            item.held_until = now + timedelta(seconds=settings.CART_HOLD_SECONDS)
+        decrease_stock(
+            (item.product_id, item.quantity - item.held_quantity) for item in items if item.quantity > item.held_quantity
+        )
+        for item in items:
+            item.held_quantity = item.quantity
+        CartItem.objects.bulk_update(items, ['price', 'original_price', 'held_quantity', 'held_until'])
+    return items
+
+
+def release_expired_holds(batch_size=SWEEP_BATCH_SIZE, now=None):
+    """
+    Devuelve al stock las reservas vencidas, en lotes por id. Las líneas que un
+    checkout tiene bloqueadas se saltan (SKIP LOCKED) y quedan para el próximo barrido.
+    """
+    now = now or timezone.now()
+    expired = CartItem.objects.filter(held_quantity__gt=0, held_until__lte=now)
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(expired.select_for_update(skip_locked=True).order_by('id').values_list(
+                'id', 'product_id', 'held_quantity',
+            )[:batch_size])
+            if not rows:
+                break
+            CartItem.objects.filter(id__in=[item_id for item_id, _, _ in rows]).update(held_quantity=0, held_until=None)
+            increase_stock((product_id, quantity) for _, product_id, quantity in rows)
+        total += len(rows)
+    return total
+
+
+def checkout(user, address_data, payment_method, notes='', now=None):
+    """
+    Convierte el carrito del usuario en pedido y lo vacía. Las líneas reservadas no vuelven
+    a descontar stock (aunque la reserva haya vencido, si aún no se barrió) y
+    mientras la reserva está vigente conservan su precio; las demás se descuentan
+    con un solo UPDATE y toman el precio actual.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        items = list(CartItem.objects.select_for_update().filter(cart__user=user).order_by('product_id'))
+        if not items:
+            raise ValidationError('El carrito está vacío.')
+        products = Product.objects.in_bulk([item.product_id for item in items])
+        lines, decrement = [], []
+        for item in items:
+            product = products[item.product_id]
+            price = item.price if item.is_held(now) else product.get_display_price()[0]
+            lines.append((product, item.quantity, price))
+            if not item.held_quantity:
+                decrement.append((item.product_id, item.quantity))
+        order = create_order(user, address_data, lines, payment_method, notes, decrement=decrement)
+        # Las unidades reservadas pasan al pedido: se borran las líneas sin devolverlas al stock
+        CartItem.objects.filter(id__in=[item.id for item in items]).delete()
+    return order
@@ -0,0 +1,243 @@
+"""
+Benchmark de los endpoints públicos sobre un conjunto de datos generado.
+
+Cada escenario se pide una vez con la caché vacía y luego `iterations` veces
+con la caché caliente; se registran las consultas SQL de ambos casos y los
+percentiles de latencia del segundo. El resultado es un JSON estable (claves
+ordenadas) para poder compararlo entre commits con `compare`.
+"""
+import math
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass, field
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.orders.choices import PaymentMethod
+from apps.orders.models import Order
+from apps.shop.models import Brand, Category, Product
+from common.renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+
+PERCENTILES = (50, 90, 99)
+# Una regresión de latencia debe superar ambos umbrales para contar
+LATENCY_TOLERANCE = 0.2
+LATENCY_MIN_DELTA_MS = 1.0
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    # Máximo de consultas con la caché caliente
+    budget: int
+    method: str = 'get'
+    auth: str = None
+    data: dict = field(default=None)
+
+
+def fixtures():
+    """Valores reales del conjunto de datos para armar las URLs."""
+    category = Category.objects.filter(parent__isnull=True).order_by('-product_count', 'id').first()
+    brands = Brand.objects.order_by('-product_count', 'id')[:2]
+    product = Product.objects.order_by('-stock', 'id').first()
+    customer = (
+        User.objects.filter(is_staff=False).annotate(orders=Count('order')).order_by('-orders', 'id').first()
+    )
+    staff, _ = User.objects.get_or_create(username='benchmark-staff', defaults={'is_staff': True, 'is_superuser': True})
+    return {
+        'category': category.slug,
+        'category_id': category.id,
+        'brands': ','.join(brand.slug for brand in brands),
+        'brand_id': brands[0].id,
+        'product': product.slug,
+        'product_id': product.id,
+        'word': product.name.split()[0].lower(),
+        'order_id': Order.objects.filter(user=customer).order_by('-created_at').values_list('id', flat=True).first(),
+        'users': {'user': customer, 'staff': staff},
+    }
+
+
+def scenarios(values):
+    shop = '/api/v1/shop'
+    address = {
+        'first_name': 'Ana', 'last_name': 'Gómez', 'email': 'ana@example.com', 'phone': '3001234567',
+        'locality': 'CHA', 'street_type': 'CL', 'street_value': '79', 'number': '12-34', 'complement': 'Apto 101',
+    }
+    return [
+        Scenario('home', f'{shop}/home/', budget=0),
+        Scenario('products.list', f'{shop}/products/', budget=2),
+        Scenario('products.list.category', f'{shop}/products/?category={values["category"]}', budget=3),
+        Scenario('products.list.brands', f'{shop}/products/?brands={values["brands"]}', budget=2),
+        Scenario('products.list.price', f'{shop}/products/?min_price=5000&max_price=50000', budget=2),
+        Scenario('products.list.is_new', f'{shop}/products/?is_new=true', budget=2),
+        Scenario('products.list.is_top', f'{shop}/products/?is_top=true', budget=2),
+        Scenario('products.list.is_featured', f'{shop}/products/?is_featured=true', budget=2),
+        Scenario('products.list.ordering', f'{shop}/products/?ordering=-price', budget=2),
+        Scenario('products.list.search', f'{shop}/products/?search={values["word"]}', budget=3),
+        Scenario('products.list.facets', f'{shop}/products/?facets=true', budget=6),
+        Scenario('products.list.count', f'{shop}/products/?count=true', budget=2),
+        Scenario('products.detail', f'{shop}/products/{values["product"]}/', budget=5),
+        Scenario('categories.list', f'{shop}/categories/', budget=1),
+        Scenario('categories.detail', f'{shop}/categories/{values["category_id"]}/', budget=1),
+        Scenario('brands.list', f'{shop}/brands/', budget=2),
+        Scenario('brands.detail', f'{shop}/brands/{values["brand_id"]}/', budget=1),
+        Scenario('search.suggest', f'/api/v1/search/suggest/?q={values["word"][:3]}', budget=0),
+        Scenario('orders.list', '/api/v1/orders/orders/', budget=6, auth='user'),
+        Scenario('orders.detail', f'/api/v1/orders/orders/{values["order_id"]}/', budget=6, auth='user'),
+        Scenario(
+            'orders.create', '/api/v1/orders/orders/', budget=18, method='post', auth='user',
+            data={
+                'address': address, 'products': [{'product_id': values['product_id'], 'qty': 1}],
+                'payment_method': PaymentMethod.CASH_ON_DELIVERY, 'notes': '',
+            },
+        ),
+        Scenario('admin.overview', '/api/v1/admin/home/', budget=15, auth='staff'),
+    ]
+
+
+def percentile(samples, value):
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(value / 100 * len(ordered)) - 1, 0)]
+
+
+def renderer_candidates():
+    """El JSONRenderer de DRF como referencia contra los de common/renderers.py."""
+    renderers = {'drf': JSONRenderer(), 'orjson': ORJSONRenderer()}
+    if msgpack is not None:
+        renderers['msgpack'] = MessagePackRenderer()
+    return renderers
+
+
+def measure_renderers(data, iterations):
+    results = {}
+    for name, renderer in renderer_candidates().items():
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            content = renderer.render(data)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = {
+            'bytes': len(content),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'p50_ms': round(percentile(timings, 50), 3),
+        }
+    return results
+
+
+def measure(client, scenario, iterations, warmup, renderers=False):
+    request = getattr(client, scenario.method)
+    options = {'format': 'json'} if scenario.data is not None else {}
+
+    cache.clear()
+    # El registro de consultas tiene un máximo (9000); vacío, cada medición empieza en cero
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as cold:
+        response = request(scenario.path, scenario.data, **options)
+    # captured_queries se calcula sobre el registro actual: se lee antes de vaciarlo otra vez
+    cold_queries = len(cold)
+    for _ in range(warmup):
+        request(scenario.path, scenario.data, **options)
+
+    timings, queries = [], 0
+    for _ in range(iterations):
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as warm:
+            start = time.perf_counter()
+            response = request(scenario.path, scenario.data, **options)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries = max(queries, len(warm))
+    result = {
+        'method': scenario.method.upper(),
+        'path': scenario.path,
+        'status': response.status_code,
+        'bytes': len(response.content),
+        'error': response.content.decode(errors='replace')[:300] if response.status_code >= 400 else None,
+        'queries': queries,
+        'queries_cold': cold_queries,
+        'budget': scenario.budget,
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'max_ms': round(max(timings), 3),
+    }
+    result.update({f'p{value}_ms': round(percentile(timings, value), 3) for value in PERCENTILES})
+    # Solo el paso de render, sobre los datos que devolvió la vista (las de DRF; admin.overview es JsonResponse)
+    if renderers and response.status_code < 400 and hasattr(response, 'data'):
+        result['renderers'] = measure_renderers(response.data, iterations)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(iterations=20, warmup=2, only=None, renderers=False, report=print):
+    """
+    Mide los escenarios (o los que empiezan con algún prefijo de `only`) y devuelve el documento de resultados.
+    Con `renderers` agrega a cada escenario el tiempo y tamaño de su respuesta con cada renderer.
+    """
+    values = fixtures()
+    # Antes de medir: orders.create agrega pedidos
+    dataset = {'products': Product.objects.count(), 'orders': Order.objects.count()}
+    clients = {None: APIClient()}
+    for role, user in values['users'].items():
+        clients[role] = APIClient()
+        clients[role].credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    results = {}
+    for scenario in scenarios(values):
+        if only and not scenario.name.startswith(tuple(only)):
+            continue
+        results[scenario.name] = result = measure(clients[scenario.auth], scenario, iterations, warmup, renderers)
+        report(scenario.name, result)
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'iterations': iterations,
+            **dataset,
+        },
+        'results': results,
+    }
+
+
+def budget_violations(document):
+    problems = []
+    for name, result in document['results'].items():
+        if result['status'] >= 400:
+            problems.append(f'{name}: status {result["status"]}')
+        if result['queries'] > result['budget']:
+            problems.append(f'{name}: {result["queries"]} queries (budget {result["budget"]})')
+    return problems
+
+
+def compare(baseline, document, tolerance=LATENCY_TOLERANCE):
+    """
+    Regresiones respecto de otro archivo de resultados: (más consultas, p90 más lento).
+    Las consultas son deterministas; la latencia depende de la máquina y de su carga.
+    """
+    queries, latency = [], []
+    for name, result in document['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        if result['queries'] > before['queries']:
+            queries.append(f'{name}: queries {before["queries"]} -> {result["queries"]}')
+        slower = result['p90_ms'] - before['p90_ms']
+        if slower > LATENCY_MIN_DELTA_MS and slower > before['p90_ms'] * tolerance:
+            latency.append(f'{name}: p90 {before["p90_ms"]:.1f}ms -> {result["p90_ms"]:.1f}ms')
+    return queries, latency
@@ -0,0 +1,316 @@
+"""
+Generador determinista de datos sintéticos para pruebas de carga.
+
+Todo sale de random.Random sembrado con (semilla, tipo, bloque de filas), así
+el mismo comando produce los mismos datos sin importar el tamaño de lote ni
+cuántos procesos lo ejecuten.
+Los ids se asignan explícitamente a partir del máximo existente: los lotes no
+necesitan volver a consultar lo que insertaron y los procesos pueden escribir
+rangos disjuntos en paralelo.
+"""
+import multiprocessing
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+from apps.orders.choices import Locality, OrderStatus, PaymentMethod, PaymentStatus, StreetType
+from apps.orders.models import Address, Order, OrderItem, Payment
+from apps.orders.services import rebuild_sales_days
+from apps.search.engine import rebuild_index
+from apps.search.suggest import invalidate_suggestions
+from apps.shop import services
+from apps.shop.home import invalidate_home_rails
+from apps.shop.models import Brand, Category, Product, ProductImage, Wishlist
+from apps.shop.related import build_related_index
+from apps.shop.versions import BRANDS, CATEGORIES, PRODUCTS, touch_catalog
+
+BATCH_SIZE = 5000
+DATASET_SIZES = {
+    'small': {'products': 1000, 'users': 200, 'orders': 1000, 'brands': 50},
+    'medium': {'products': 50000, 'users': 5000, 'orders': 50000, 'brands': 300},
+    'large': {'products': 1000000, 'users': 100000, 'orders': 1000000, 'brands': 2000},
+}
+# Las secuencias aleatorias se siembran por bloques fijos de filas: el resultado no depende del tamaño de lote
+SEED_BLOCK = 1000
+
+DEPARTMENTS = (
+    'Alimentos y despensa', 'Lácteos y huevos', 'Carnes y pescados', 'Frutas y verduras', 'Bebidas',
+    'Aseo del hogar', 'Cuidado personal', 'Mascotas', 'Bebés', 'Licores', 'Panadería', 'Congelados',
+)
+SECTIONS = (
+    'Arroz', 'Granos', 'Aceites', 'Pastas', 'Enlatados', 'Snacks', 'Galletas', 'Cereales', 'Café',
+    'Chocolates', 'Salsas', 'Condimentos', 'Jugos', 'Gaseosas', 'Aguas', 'Quesos', 'Yogures', 'Leches',
+    'Detergentes', 'Limpiadores', 'Papel', 'Shampoo', 'Jabones', 'Cremas', 'Pañales', 'Vinos',
+    'Cervezas', 'Helados', 'Postres', 'Harinas', 'Azúcar', 'Embutidos', 'Pollo', 'Res', 'Cerdo',
+)
+KINDS = ('Clásico', 'Light', 'Premium', 'Integral', 'Familiar', 'Original', 'Natural', 'Tradicional', 'Extra')
+SIZES = ('125 G', '250 G', '500 G', '1 KG', '2 KG', '330 ML', '1 L', '1.5 L', '6 UND', '12 UND')
+BRAND_SYLLABLES = ('la', 'ma', 'zu', 'ri', 'to', 'co', 'ne', 'sa', 'vi', 'lo', 'ra', 'fe', 'mi', 'do', 'ka')
+FIRST_NAMES = ('Ana', 'Luis', 'María', 'Carlos', 'Laura', 'Jorge', 'Sofía', 'Andrés', 'Camila', 'Diego')
+LAST_NAMES = ('Gómez', 'Rodríguez', 'López', 'Martínez', 'García', 'Pérez', 'Sánchez', 'Ramírez', 'Torres')
+
+# Contexto de los lotes; se fija antes de crear el pool para que los procesos lo hereden
+_context = {}
+
+
+def rng(seed, kind, block):
+    return random.Random(f'{seed}:{kind}:{block}')
+
+
+def seeded_rows(kind, start, end):
+    """Recorre los índices [start, end) junto con el generador de su bloque."""
+    for index in range(start, end):
+        if index == start or index % SEED_BLOCK == 0:
+            random_ = rng(_context['seed'], kind, index // SEED_BLOCK)
+        yield index, random_
+
+
+@contextmanager
+def explicit_timestamps():
+    """Permite escribir created_at/updated_at/timestamp históricos con bulk_create."""
+    fields = [
+        field for model in (Product, Order, Payment) for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+def run_batches(function, total, batch_size, workers):
+    """Ejecuta `function(start, end)` por rangos alineados a SEED_BLOCK; devuelve la cantidad de filas."""
+    batch_size = max(batch_size // SEED_BLOCK, 1) * SEED_BLOCK
+    tasks = [(start, min(start + batch_size, total)) for start in range(0, total, batch_size)]
+    # SQLite bloquea la base completa en cada escritura: un solo proceso
+    if workers > 1 and len(tasks) > 1 and connection.vendor != 'sqlite':
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            return sum(pool.starmap(function, tasks))
+    return sum(function(*task) for task in tasks)
+
+
+def generate_categories(seed):
+    random_ = rng(seed, 'categories', 0)
+    roots = [Category(name=name, slug=slugify(name), lft=0, rght=0, tree_id=0, level=0) for name in DEPARTMENTS]
+    Category.objects.bulk_create(roots, ignore_conflicts=True)
+    ids = dict(Category.objects.filter(slug__in=[root.slug for root in roots]).values_list('slug', 'id'))
+    levels = [[(ids[root.slug], root.slug) for root in roots]]
+    # Dos niveles más con ramificación variable: departamento > sección > subsección
+    for fanout in ((4, 10), (0, 5)):
+        children = []
+        for parent_id, parent_slug in levels[-1]:
+            for name in random_.sample(SECTIONS, random_.randint(*fanout)):
+                children.append(Category(
+                    name=name, slug=f'{parent_slug}-{slugify(name)}', parent_id=parent_id, lft=0, rght=0, tree_id=0, level=0,
+                ))
+        Category.objects.bulk_create(children, ignore_conflicts=True)
+        ids = dict(Category.objects.filter(slug__in=[child.slug for child in children]).values_list('slug', 'id'))
+        levels.append([(ids[child.slug], child.slug) for child in children])
+    Category.objects.rebuild()
+    return list(Category.objects.filter(children__isnull=True).order_by('id').values_list('id', 'name'))
+
+
+def generate_brands(seed, total):
+    random_ = rng(seed, 'brands', 0)
+    names = set()
+    while len(names) < total:
+        name = ''.join(random_.choice(BRAND_SYLLABLES) for _ in range(random_.randint(2, 4))).capitalize()
+        names.add(f'{name} {len(names)}' if name in names else name)
+    brands = [Brand(name=name, slug=slugify(name)) for name in sorted(names)]
+    Brand.objects.bulk_create(brands, ignore_conflicts=True)
+    return list(Brand.objects.filter(slug__in=[brand.slug for brand in brands]).order_by('id').values_list('id', 'name'))
+
+
+def product_batch(start, end):
+    context = _context
+    now = context['now']
+    leaves, brands = context['leaves'], context['brands']
+    products, images = [], []
+    for index, random_ in seeded_rows('products', start, end):
+        product_id = context['first_product'] + index
+        # Popularidad sesgada: pocas categorías y marcas concentran muchos productos
+        category_id, section = leaves[int(len(leaves) * random_.random() ** 2)]
+        brand_id, brand = brands[int(len(brands) * random_.random() ** 2)]
+        name = f'{section} {random_.choice(KINDS)} {brand} {random_.choice(SIZES)}'
+        discount = random_.choice((10, 15, 20, 25, 30)) if random_.random() < 0.2 else 0
+        created_at = now - timedelta(seconds=random_.randint(0, 730 * 86400))
+        product = Product(
+            id=product_id,
+            name=name,
+            slug=f'{slugify(name)}-{product_id}',
+            description=f'{name}. Producto de la sección {section} de la marca {brand}.',
+            price=Decimal(random_.randint(20, 4000) * 50),
+            discount=discount,
+            discount_end_date=now + timedelta(days=random_.randint(1, 30)) if discount else None,
+            stock=random_.randint(0, 500),
+            is_new=created_at > now - timedelta(days=30),
+            is_top=random_.random() < 0.05,
+            is_featured=random_.random() < 0.05,
+            ratings=Decimal(random_.randint(0, 500)) / 100,
+            reviews_count=random_.randint(0, 300),
+            category_id=category_id,
+            brand_id=brand_id,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+        product.effective_price = product.compute_effective_price()
+        products.append(product)
+        for picture in range(context['images']):
+            images.append(ProductImage(
+                product_id=product_id, url=f'https://picsum.photos/seed/{product_id}-{picture}/600/600',
+                width=600, height=600,
+            ))
+    with transaction.atomic():
+        Product.objects.bulk_create(products, batch_size=1000)
+        ProductImage.objects.bulk_create(images, batch_size=1000)
+    return len(products)
+
+
+def user_batch(start, end):
+    context = _context
+    users, addresses = [], []
+    for index, random_ in seeded_rows('users', start, end):
+        user_id = context['first_user'] + index
+        first_name, last_name = random_.choice(FIRST_NAMES), random_.choice(LAST_NAMES)
+        email = f'usuario{user_id}@example.com'
+        users.append(User(
+            id=user_id, username=f'usuario{user_id}', email=email, first_name=first_name, last_name=last_name,
+            password=context['password'], date_joined=context['now'] - timedelta(days=random_.randint(0, 730)),
+        ))
+        # Dos direcciones por usuario con ids consecutivos: los pedidos las calculan sin consultar
+        for offset, address_type in enumerate(('B', 'S')):
+            addresses.append(Address(
+                id=context['first_address'] + 2 * index + offset, user_id=user_id,
+                locality=random_.choice(Locality.values), street_type=random_.choice(StreetType.values),
+                street_value=str(random_.randint(1, 200)), number=f'{random_.randint(1, 99)}-{random_.randint(1, 99)}',
+                complement='', address_type=address_type, first_name=first_name, last_name=last_name,
+                phone=f'3{random_.randint(100000000, 999999999)}', email=email,
+            ))
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=1000)
+        Address.objects.bulk_create(addresses, batch_size=1000)
+    return len(users)
+
+
+def order_batch(start, end):
+    context = _context
+    now = context['now']
+    product_ids, prices = context['product_ids'], context['prices']
+    orders, items, payments = [], [], []
+    statuses = (OrderStatus.DELIVERED,) * 7 + (OrderStatus.ACCEPTED, OrderStatus.PENDING, OrderStatus.REJECTED)
+    payment_status = {
+        OrderStatus.DELIVERED: PaymentStatus.COMPLETED, OrderStatus.ACCEPTED: PaymentStatus.COMPLETED,
+        OrderStatus.PENDING: PaymentStatus.PENDING, OrderStatus.REJECTED: PaymentStatus.FAILED,
+    }
+    for index, random_ in seeded_rows('orders', start, end):
+        order_id = context['first_order'] + index
+        user_index = random_.randrange(context['users'])
+        address_id = context['first_address'] + 2 * user_index
+        status = random_.choice(statuses)
+        created_at = now - timedelta(seconds=random_.randint(0, 365 * 86400))
+        orders.append(Order(
+            id=order_id, user_id=context['first_user'] + user_index, status=status, created_at=created_at,
+            billing_address_id=address_id, shipping_address_id=address_id + 1, notes='',
+        ))
+        total = Decimal(0)
+        chosen = set()
+        for _ in range(random_.randint(1, 6)):
+            # Los productos de índice bajo son los más vendidos
+            position = int(len(product_ids) * random_.random() ** 3)
+            if position in chosen:
+                continue
+            chosen.add(position)
+            quantity = random_.randint(1, 4)
+            items.append(OrderItem(order_id=order_id, product_id=product_ids[position], quantity=quantity, price=prices[position]))
+            total += quantity * prices[position]
+        payment = Payment(
+            order_id=order_id, amount=total, payment_method=random_.choice(PaymentMethod.values),
+            status=payment_status[status], timestamp=created_at + timedelta(minutes=random_.randint(1, 30)),
+        )
+        # Lo mismo que Payment.save(), que bulk_create no llama
+        payment.shipping_cost = payment.calculate_shipping_cost()
+        payment.amount += payment.shipping_cost
+        payments.append(payment)
+    with transaction.atomic():
+        Order.objects.bulk_create(orders, batch_size=1000)
+        OrderItem.objects.bulk_create(items, batch_size=1000)
+        Payment.objects.bulk_create(payments, batch_size=1000)
+    return len(orders)
+
+
+def wishlist_batch(start, end):
+    context = _context
+    product_ids = context['product_ids']
+    wishlists, entries = [], []
+    for index, random_ in seeded_rows('wishlists', start, end):
+        if random_.random() >= 0.3:
+            continue
+        wishlist_id = context['first_wishlist'] + index
+        wishlists.append(Wishlist(id=wishlist_id, user_id=context['first_user'] + index))
+        for position in set(random_.randrange(len(product_ids)) for _ in range(random_.randint(1, 15))):
+            entries.append(Wishlist.products.through(wishlist_id=wishlist_id, product_id=product_ids[position]))
+    with transaction.atomic():
+        Wishlist.objects.bulk_create(wishlists, batch_size=1000)
+        Wishlist.products.through.objects.bulk_create(entries, batch_size=1000)
+    return len(wishlists)
+
+
+def generate(seed=42, products=10000, users=1000, orders=5000, brands=200, images=1,
+             batch_size=BATCH_SIZE, workers=1, build_indexes=True, report=print):
+    """Genera el conjunto completo; `report` recibe un mensaje por etapa."""
+    _context.clear()
+    _context.update(
+        seed=seed, now=timezone.now(), images=images, users=users,
+        password=make_password('password'),
+        first_product=next_id(Product), first_user=next_id(User), first_address=next_id(Address),
+        first_order=next_id(Order), first_wishlist=next_id(Wishlist),
+    )
+    with explicit_timestamps():
+        _context['leaves'] = generate_categories(seed)
+        _context['brands'] = generate_brands(seed, brands)
+        report(f"{len(_context['leaves'])} leaf categories, {len(_context['brands'])} brands")
+        report(f'{run_batches(product_batch, products, batch_size, workers)} products')
+        report(f'{run_batches(user_batch, users, batch_size, workers)} users')
+
+        generated = Product.objects.filter(id__gte=_context['first_product']).order_by('id')
+        _context['product_ids'], _context['prices'] = map(list, zip(*generated.values_list('id', 'effective_price'))) if products else ([], [])
+        if users and products:
+            report(f'{run_batches(order_batch, orders, batch_size, workers)} orders')
+            report(f'{run_batches(wishlist_batch, users, batch_size, workers)} wishlists')
+
+    # Ids explícitos: las secuencias (PostgreSQL) deben continuar después del máximo
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Product, User, Address, Order, Wishlist]):
+            cursor.execute(sql)
+    _context.clear()
+    finish(workers, build_indexes, report)
+
+
+def finish(workers, build_indexes, report):
+    # bulk_create no dispara señales: contadores, ventas, índices y cachés se rehacen una vez
+    services.rebuild_product_counts()
+    services.invalidate_category_paths()
+    rebuild_sales_days()
+    if build_indexes:
+        build_related_index()
+        products, terms = rebuild_index(workers=workers)
+        report(f'search index: {products} products, {terms} terms')
+    invalidate_home_rails()
+    invalidate_suggestions()
+    touch_catalog(PRODUCTS, CATEGORIES, BRANDS)
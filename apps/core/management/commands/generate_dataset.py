@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.core.dataset import BATCH_SIZE, DATASET_SIZES, generate
+
+
+class Command(BaseCommand):
+    help = "Generates a deterministic synthetic dataset (catalog, users, orders, wishlists) for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=DATASET_SIZES, default='small', help='Preset; explicit counts override it')
+        parser.add_argument('--products', type=int)
+        parser.add_argument('--users', type=int)
+        parser.add_argument('--orders', type=int)
+        parser.add_argument('--brands', type=int)
+        parser.add_argument('--images', type=int, default=1, help='Images per product')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--skip-indexes', action='store_true', help='Do not rebuild the related and search indexes')
+
+    def handle(self, *args, **options):
+        counts = {key: options[key] if options[key] is not None else value for key, value in DATASET_SIZES[options['size']].items()}
+        start = time.monotonic()
+
+        def report(message):
+            self.stdout.write(f'[{time.monotonic() - start:7.1f}s] {message}')
+
+        generate(
+            seed=options['seed'], images=options['images'], batch_size=options['batch_size'],
+            workers=options['workers'], build_indexes=not options['skip_indexes'], report=report, **counts,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Dataset generated in {time.monotonic() - start:.1f}s'))
+
+# python manage.py generate_dataset --size medium --workers 4
@@ -0,0 +1,77 @@
+import json
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment
+from apps.core.benchmarks import budget_violations, compare, run_benchmarks
+from apps.core.dataset import DATASET_SIZES, generate
+from apps.shop.models import Product
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the public endpoints on a generated dataset and writes latency and query counts to a JSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=DATASET_SIZES, default='small')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', nargs='*', help='Scenario name prefixes, e.g. products.list orders')
+        parser.add_argument('--output', help='Results file (default: benchmarks/<size>.json)')
+        parser.add_argument('--baseline', help='Previous results file to compare against')
+        parser.add_argument('--fail-on-latency', action='store_true', help='Treat p90 regressions as errors, not warnings')
+        parser.add_argument('--renderers', action='store_true', help='Also time each response with every renderer')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the benchmark database and its dataset')
+
+    def handle(self, *args, **options):
+        output = options['output'] or os.path.join('benchmarks', f"{options['size']}.json")
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+
+        # Base de datos aparte, como la de los tests: el benchmark nunca toca datos reales
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            counts = DATASET_SIZES[options['size']]
+            if Product.objects.count() != counts['products']:
+                self.stdout.write(f"Generating the {options['size']} dataset...")
+                generate(seed=options['seed'], workers=os.cpu_count(), report=lambda message: None, **counts)
+            document = run_benchmarks(
+                iterations=options['iterations'], warmup=options['warmup'], only=options['only'],
+                renderers=options['renderers'], report=self.report,
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        document['meta'].update(size=options['size'], seed=options['seed'])
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w') as file:
+            json.dump(document, file, indent=2, sort_keys=True)
+            file.write('\n')
+        self.stdout.write(f'Results written to {output}')
+
+        problems = budget_violations(document)
+        if baseline is not None:
+            queries, latency = compare(baseline, document)
+            problems += queries
+            if options['fail_on_latency']:
+                problems += latency
+            else:
+                for message in latency:
+                    self.stdout.write(self.style.WARNING(f'Slower: {message}'))
+        if problems:
+            raise CommandError('Benchmark regressions:\n  ' + '\n  '.join(problems))
+        self.stdout.write(self.style.SUCCESS('All endpoints within budget'))
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:<28} {result['status']} {result['queries']:>3}q ({result['queries_cold']:>3} cold) "
+            f"p50 {result['p50_ms']:7.1f}ms  p90 {result['p90_ms']:7.1f}ms  p99 {result['p99_ms']:7.1f}ms"
+        )
+        for renderer, timing in result.get('renderers', {}).items():
+            self.stdout.write(f"{'':<28} {renderer:<8} {timing['mean_ms']:7.3f}ms  {timing['bytes']:>8} bytes")
+
+# python manage.py run_benchmarks --size medium --keepdb --baseline benchmarks/medium.json
@@ -1,3 +1,8 @@
+from django.urls import path
+from apps.core.views import MetricsView
+
 app_name = "core"
 
-urlpatterns = []
+urlpatterns = [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+]
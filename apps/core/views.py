@@ -0,0 +1,25 @@
+import hmac
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.permissions import BasePermission
+from rest_framework.views import APIView
+from common.metrics import collect, render
+
+
+class MetricsPermission(BasePermission):
+    """Staff, o el scraper de Prometheus con `Authorization: Token <METRICS_TOKEN>`."""
+
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        return bool(settings.METRICS_TOKEN) and hmac.compare_digest(header, f'Token {settings.METRICS_TOKEN}')
+
+
+class MetricsView(APIView):
+    permission_classes = [MetricsPermission]
+    # Interno: fuera del esquema OpenAPI
+    schema = None
+
+    def get(self, request):
+        return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from apps.orders.models import Address, Order, OrderItem, Payment, Coupon, Refund
+from apps.orders.services import set_orders_status
 
 
 class OrderItemInline(admin.TabularInline):
@@ -88,20 +89,30 @@ class OrderAdmin(admin.ModelAdmin):
     payment_method_display.short_description = 'Método de Pago'
     
     def mark_as_shipped(self, request, queryset):
-        updated = queryset.update(status='S')
+        updated = set_orders_status(queryset, 'S')
         self.message_user(request, f'{updated} pedidos marcados como enviados.')
     mark_as_shipped.short_description = 'Marcar como enviado'
     
     def mark_as_delivered(self, request, queryset):
-        updated = queryset.update(status='D')
+        updated = set_orders_status(queryset, 'D')
         self.message_user(request, f'{updated} pedidos marcados como entregados.')
     mark_as_delivered.short_description = 'Marcar como entregado'
     
     def cancel_order(self, request, queryset):
-        updated = queryset.update(status='C')
+        updated = set_orders_status(queryset, 'C')
         self.message_user(request, f'{updated} pedidos cancelados.')
     cancel_order.short_description = 'Cancelar pedido'
 
+    def save_model(self, request, obj, form, change):
+        # El estado pasa por el servicio para mantener los contadores de entregados
+        status = obj.status
+        if change and 'status' in form.changed_data:
+            obj.status = form.initial['status']
+        super().save_model(request, obj, form, change)
+        if obj.status != status:
+            set_orders_status(Order.objects.filter(pk=obj.pk), status)
+            obj.status = status
+
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
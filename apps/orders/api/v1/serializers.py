@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from apps.orders.models import Address, Order, OrderItem, Payment, Coupon, Refund
 from apps.shop.models import Product
-from apps.shop.api.v1.serializers import ProductSerializer
-from apps.orders.choices import PaymentMethod, PaymentStatus, OrderStatus
+from apps.shop.api.v1.serializers import ProductListSerializer
+from apps.orders.choices import PaymentMethod
+from apps.orders.services import create_order
+from apps.shop.stock import InsufficientStock
 from django.db import transaction
 import logging
 
@@ -23,7 +25,7 @@ class AddressSerializer(serializers.ModelSerializer):
         }
 
 class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer()
+    product = ProductListSerializer()
     subtotal = serializers.SerializerMethodField()
     class Meta:
         model = OrderItem
@@ -75,7 +77,7 @@ class OrderSerializer(serializers.ModelSerializer):
 
 class OrderItemCreateSerializer(serializers.ModelSerializer):
     product_id = serializers.IntegerField(write_only=True)
-    qty = serializers.IntegerField(write_only=True)
+    qty = serializers.IntegerField(write_only=True, min_value=1)
 
     class Meta:
         model = OrderItem
@@ -101,32 +103,19 @@ class OrderCreateSerializer(serializers.ModelSerializer):
 
         try:
             with transaction.atomic():
-                address, _ = Address.objects.get_or_create(user=user, **address_data)
-                
-                order = Order.objects.create(
-                    user=user, 
-                    billing_address=address, 
-                    shipping_address=address, 
-                    status=OrderStatus.PENDING, 
-                    notes=notes
-                )
-
-                total_amount = 0
+                # Lectura sin bloqueo: el stock se valida al descontarlo
+                products = Product.objects.in_bulk({product_data['product_id'] for product_data in products_data})
+                missing = [product_data['product_id'] for product_data in products_data if product_data['product_id'] not in products]
+                if missing:
+                    raise serializers.ValidationError(f"Producto {missing[0]} no encontrado")
+                lines = []
                 for product_data in products_data:
-                    product = Product.objects.select_for_update().get(id=product_data['product_id'])
-                    quantity = product_data['qty']
-                    product.decrease_stock(quantity)
-                    price = product.get_display_price()[0]
-                    OrderItem.objects.create(order=order, product=product, quantity=quantity, price=price)
-                    total_amount += price * quantity
-    
-                Payment.objects.create(
-                    order=order,
-                    amount=total_amount,
-                    payment_method=payment_method,
-                    status=PaymentStatus.PENDING
-                )
-                return order
+                    product = products[product_data['product_id']]
+                    lines.append((product, product_data['qty'], product.get_display_price()[0]))
+                try:
+                    return create_order(user, address_data, lines, payment_method, notes)
+                except InsufficientStock as e:
+                    raise serializers.ValidationError(e.messages)
         except serializers.ValidationError as e:
             raise e
         except Exception as e:
@@ -1,4 +1,5 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from apps.orders.models import Address, Order, OrderItem, Payment, Coupon, Refund
 from .serializers import AddressSerializer, OrderSerializer, OrderItemSerializer, PaymentSerializer, CouponSerializer, RefundSerializer, OrderCreateSerializer
 from rest_framework.views import APIView
@@ -6,7 +7,20 @@ from rest_framework.response import Response
 from apps.orders.choices import Locality, StreetType, OrderStatus, PaymentMethod
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
-from apps.shop.models import Product
+from apps.shop.models import Product, ProductImage
+from django.db.models import Prefetch
+from apps.orders.exports import ORDER_EXPORT_COLUMNS, order_rows
+from common.exports import export_output, export_response
+from common.pagination import KeysetPagination
+
+def order_queryset():
+    """Pedidos con todo lo que muestra OrderSerializer, en un número fijo de consultas."""
+    order_items = OrderItem.objects.select_related('product__category', 'product__brand').prefetch_related(
+        Prefetch('product__large_pictures', queryset=ProductImage.objects.order_by('id'))
+    )
+    return Order.objects.select_related('user', 'billing_address', 'shipping_address').prefetch_related(
+        Prefetch('orderitem_set', queryset=order_items), 'payment_set', 'refund_set'
+    )
 
 class AddressViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
@@ -19,9 +33,13 @@ class AddressViewSet(viewsets.ModelViewSet):
 class OrderViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = OrderSerializer
+    pagination_class = KeysetPagination
+    ordering = ['-created_at']
+    ordering_fields = ['created_at']
+    query_budget = {'list': 8, 'retrieve': 8, 'create': 30}
 
     def get_queryset(self):
-        queryset = Order.objects.select_related('billing_address', 'shipping_address').prefetch_related('orderitem_set', 'payment_set', 'refund_set')
+        queryset = order_queryset()
         if self.request.user.is_superuser:
             return queryset.all()
         return queryset.filter(user=self.request.user)
@@ -36,9 +54,17 @@ class OrderViewSet(viewsets.ModelViewSet):
         try:
             serializer.is_valid(raise_exception=True)
             order = serializer.save()
+            order = self.get_queryset().get(pk=order.pk)
             return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False)
+    def export(self, request, *args, **kwargs):
+        """Historial de pedidos (todos para superusuarios) en NDJSON o CSV, en streaming."""
+        output = export_output(request)
+        queryset = Order.objects.all() if request.user.is_superuser else Order.objects.filter(user=request.user)
+        return export_response(order_rows(queryset), output, ORDER_EXPORT_COLUMNS, 'orders')
     
 class OrderItemViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
@@ -0,0 +1,74 @@
+"""Exportación de pedidos: un registro por pedido con cliente, direcciones, ítems y pagos."""
+from django.db.models import Prefetch
+from apps.orders.models import Order, OrderItem
+from common.exports import EXPORT_CHUNK_SIZE, iterate_chunks
+
+ADDRESS_FIELDS = (
+    'first_name', 'last_name', 'email', 'phone', 'locality', 'street_type', 'street_value', 'number', 'complement',
+)
+ORDER_EXPORT_COLUMNS = [
+    'id', 'status', 'created_at', 'notes', 'coupon', 'user_id', 'user_username', 'user_email',
+    *[f'billing_address_{field}' for field in ADDRESS_FIELDS],
+    *[f'shipping_address_{field}' for field in ADDRESS_FIELDS],
+    'items_total', 'paid_total', 'items', 'payments',
+]
+
+
+def order_export_queryset(queryset=None):
+    queryset = Order.objects.all() if queryset is None else queryset
+    return queryset.select_related('user', 'billing_address', 'shipping_address', 'coupon').prefetch_related(
+        Prefetch('orderitem_set', queryset=OrderItem.objects.select_related('product').only(
+            'id', 'order_id', 'quantity', 'price', 'product__id', 'product__name', 'product__slug',
+        ).order_by('id')),
+        'payment_set',
+    )
+
+
+def address_row(address):
+    if address is None:
+        return None
+    return {field: getattr(address, field) for field in ADDRESS_FIELDS}
+
+
+def order_row(order):
+    items = [
+        {
+            'product_id': item.product.id,
+            'product_slug': item.product.slug,
+            'product_name': item.product.name,
+            'quantity': item.quantity,
+            'price': item.price,
+            'subtotal': item.subtotal,
+        }
+        for item in order.orderitem_set.all()
+    ]
+    payments = [
+        {
+            'id': payment.id,
+            'amount': payment.amount,
+            'shipping_cost': payment.shipping_cost,
+            'payment_method': payment.payment_method,
+            'status': payment.status,
+            'timestamp': payment.timestamp,
+        }
+        for payment in order.payment_set.all()
+    ]
+    return {
+        'id': order.id,
+        'status': order.status,
+        'created_at': order.created_at,
+        'notes': order.notes,
+        'coupon': order.coupon.code if order.coupon else None,
+        'user': {'id': order.user.id, 'username': order.user.username, 'email': order.user.email},
+        'billing_address': address_row(order.billing_address),
+        'shipping_address': address_row(order.shipping_address),
+        'items_total': sum((item['subtotal'] for item in items), 0),
+        'paid_total': sum((payment['amount'] for payment in payments), 0),
+        'items': items,
+        'payments': payments,
+    }
+
+
+def order_rows(queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    for orders in iterate_chunks(order_export_queryset(queryset), chunk_size):
+        yield [order_row(order) for order in orders]
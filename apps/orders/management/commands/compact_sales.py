@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from apps.orders.services import SALES_RETENTION_DAYS, compact_sales, rebuild_sales_days
+
+
+class Command(BaseCommand):
+    help = "Compacts daily sales counters into rolling 7/30-day totals (run daily from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Rebuild the daily counters from OrderItem first')
+        parser.add_argument('--retention-days', type=int, default=SALES_RETENTION_DAYS)
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            summaries, deleted = rebuild_sales_days(options['retention_days'])
+        else:
+            summaries, deleted = compact_sales(retention_days=options['retention_days'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Sales compacted: {summaries} products with sales, {deleted} expired daily rows removed"
+        ))
+
+# python manage.py compact_sales
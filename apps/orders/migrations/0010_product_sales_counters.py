@@ -0,0 +1,42 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_alter_address_locality_alter_payment_status'),
+        ('shop', '0005_category_brand_product_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSalesSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales_summary', serialize=False, to='shop.product')),
+                ('sold_7d', models.PositiveIntegerField(db_index=True, default=0)),
+                ('sold_30d', models.PositiveIntegerField(db_index=True, default=0)),
+                ('revenue_30d', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductSalesDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_days', to='shop.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='orders_prod_day_23a189_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productsalesday',
+            constraint=models.UniqueConstraint(fields=('product', 'day'), name='unique_product_sales_day'),
+        ),
+    ]
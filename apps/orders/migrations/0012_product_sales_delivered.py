@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0011_order_created_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productsalessummary",
+            name="delivered_365d",
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+    ]
@@ -36,6 +36,12 @@ class Order(models.Model):
     notes = models.TextField(blank=True)
     coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, null=True)
 
+    class Meta:
+        indexes = [
+            # Paginación por cursor del listado (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+        ]
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)  
@@ -68,4 +74,28 @@ class Refund(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     reason = models.TextField()
     accepted = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+
+class ProductSalesDay(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_days')
+    day = models.DateField()
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='unique_product_sales_day'),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+class ProductSalesSummary(models.Model):
+    # Totales móviles compactados desde ProductSalesDay (ver apps.orders.services.compact_sales)
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='sales_summary')
+    sold_7d = models.PositiveIntegerField(default=0, db_index=True)
+    sold_30d = models.PositiveIntegerField(default=0, db_index=True)
+    revenue_30d = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Unidades de pedidos entregados del último año (ver apps.orders.services.set_orders_status)
+    delivered_365d = models.PositiveIntegerField(default=0, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,179 @@
+from datetime import timedelta
+from functools import partial
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from common.helpers import bulk_increment
+from apps.orders.choices import OrderStatus, PaymentStatus
+from apps.orders.models import Address, Order, OrderItem, Payment, ProductSalesDay, ProductSalesSummary
+from apps.shop.home import invalidate_home_rails
+from apps.shop.models import Product
+from apps.shop.related import record_co_purchases
+from apps.shop.stock import decrease_stock
+
+SALES_RETENTION_DAYS = 90
+DELIVERED_WINDOW_DAYS = 365
+
+
+def create_order(user, address_data, lines, payment_method, notes='', decrement=None):
+    """
+    Crea el pedido con sus ítems y el pago pendiente. `lines` son (producto,
+    cantidad, precio); el stock de `decrement` (product_id, cantidad), por
+    defecto todas las líneas, se descuenta al final. Va dentro de una
+    transacción: si falta stock (InsufficientStock) no queda nada escrito.
+    Los contadores de ventas y de comprados juntos se suman al confirmar.
+    """
+    address, _ = Address.objects.get_or_create(user=user, **address_data)
+    order = Order.objects.create(
+        user=user,
+        billing_address=address,
+        shipping_address=address,
+        status=OrderStatus.PENDING,
+        notes=notes
+    )
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=product, quantity=quantity, price=price) for product, quantity, price in lines
+    ])
+    sold = sorted((product.id, quantity, price * quantity) for product, quantity, price in lines)
+    # Fuera de la transacción del pedido: sus filas son las más disputadas y no deben quedar
+    # bloqueadas hasta el commit. Si fallan se registra en el log sin afectar el pedido confirmado
+    transaction.on_commit(partial(record_sales, sold), robust=True)
+    transaction.on_commit(partial(record_co_purchases, [product_id for product_id, _, _ in sold]), robust=True)
+    Payment.objects.create(
+        order=order,
+        amount=sum(amount for _, _, amount in sold),
+        payment_method=payment_method,
+        status=PaymentStatus.PENDING
+    )
+    # Al final: los bloqueos de fila del UPDATE duran solo hasta el commit
+    if decrement is None:
+        decrement = [(product.id, quantity) for product, quantity, _ in lines]
+    decrease_stock(decrement)
+    return order
+
+
+def record_sales(lines, day=None):
+    """
+    Suma las líneas vendidas (product_id, quantity, amount) al contador del día
+    y a los totales móviles, con un upsert por tabla. Corre al confirmar el pedido.
+    """
+    day = day or timezone.localdate()
+    bulk_increment(ProductSalesDay, ('product_id', 'day'), [
+        ((product_id, day), {'quantity': quantity, 'revenue': amount}) for product_id, quantity, amount in lines
+    ])
+    bulk_increment(ProductSalesSummary, ('product_id',), [
+        ((product_id,), {'sold_7d': quantity, 'sold_30d': quantity, 'revenue_30d': amount})
+        for product_id, quantity, amount in lines
+    ])
+
+
+def set_orders_status(orders, status):
+    """
+    Cambia el estado de los pedidos y ajusta `delivered_365d` con un upsert:
+    suma los ítems de los que pasan a entregado y resta los de los que dejan de
+    estarlo (solo pedidos dentro de la ventana, como compact_sales). Devuelve
+    cuántos pedidos se tocaron.
+    """
+    since = timezone.now() - timedelta(days=DELIVERED_WINDOW_DAYS)
+    with transaction.atomic():
+        rows = list(orders.select_for_update().order_by('id').values_list('id', 'status', 'created_at'))
+        changed = [(order_id, created_at) for order_id, previous, created_at in rows if previous != status]
+        Order.objects.filter(id__in=[order_id for order_id, _ in changed]).update(status=status)
+        # Con el estado distinto, solo uno de los dos puede ser DELIVERED
+        previous_delivered = {order_id for order_id, previous, _ in rows if previous == OrderStatus.DELIVERED}
+        counted = [
+            order_id for order_id, created_at in changed
+            if created_at >= since and (status == OrderStatus.DELIVERED or order_id in previous_delivered)
+        ]
+        if counted:
+            sign = 1 if status == OrderStatus.DELIVERED else -1
+            items = (
+                OrderItem.objects.filter(order_id__in=counted)
+                .values('product_id')
+                .annotate(quantity=Sum('quantity'))
+                .order_by('product_id')
+            )
+            bulk_increment(ProductSalesSummary, ('product_id',), [
+                ((item['product_id'],), {'delivered_365d': sign * item['quantity']}) for item in items
+            ])
+    return len(rows)
+
+
+def create_sales_summaries(product_ids):
+    """Fila de contadores en cero para productos nuevos: los menos vendidos se leen del índice."""
+    ProductSalesSummary.objects.bulk_create(
+        [ProductSalesSummary(product_id=product_id) for product_id in product_ids],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def compact_sales(today=None, retention_days=SALES_RETENTION_DAYS):
+    """
+    Recalcula los totales de 7 y 30 días desde los contadores diarios y los
+    entregados del último año desde los pedidos, crea resúmenes vacíos para
+    productos sin ventas y elimina los días vencidos.
+    """
+    today = today or timezone.localdate()
+    window = ProductSalesDay.objects.filter(day__gt=today - timedelta(days=30))
+    totals = (
+        window.values('product_id')
+        .annotate(
+            sold_7d=Sum('quantity', filter=Q(day__gt=today - timedelta(days=7)), default=0),
+            sold_30d=Sum('quantity'),
+            revenue_30d=Sum('revenue'),
+        )
+        .order_by()
+    )
+    delivered_items = OrderItem.objects.filter(
+        order__status=OrderStatus.DELIVERED,
+        order__created_at__gte=timezone.now() - timedelta(days=DELIVERED_WINDOW_DAYS),
+    )
+    delivered = delivered_items.values('product_id').annotate(delivered_365d=Sum('quantity')).order_by()
+    rows = {}
+    for row in totals:
+        rows[row.pop('product_id')] = row
+    for row in delivered:
+        rows.setdefault(row['product_id'], {})['delivered_365d'] = row['delivered_365d']
+    summaries = [ProductSalesSummary(product_id=product_id, **values) for product_id, values in rows.items()]
+    with transaction.atomic():
+        ProductSalesSummary.objects.exclude(product_id__in=window.values('product_id')).exclude(
+            product_id__in=delivered_items.values('product_id')
+        ).filter(
+            Q(sold_7d__gt=0) | Q(sold_30d__gt=0) | ~Q(revenue_30d=0) | Q(delivered_365d__gt=0)
+        ).update(sold_7d=0, sold_30d=0, revenue_30d=0, delivered_365d=0, updated_at=timezone.now())
+        ProductSalesSummary.objects.bulk_create(
+            summaries,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['sold_7d', 'sold_30d', 'revenue_30d', 'delivered_365d', 'updated_at'],
+        )
+        create_sales_summaries(Product.objects.filter(sales_summary__isnull=True).values_list('id', flat=True).iterator())
+        deleted, _ = ProductSalesDay.objects.filter(day__lte=today - timedelta(days=retention_days)).delete()
+
+    invalidate_home_rails()
+    return len(summaries), deleted
+
+
+def rebuild_sales_days(retention_days=SALES_RETENTION_DAYS):
+    """Reconstruye los contadores diarios desde OrderItem (datos históricos o cargados en bloque)."""
+    since = timezone.now() - timedelta(days=retention_days)
+    rows = (
+        OrderItem.objects.filter(order__created_at__gte=since)
+        .annotate(day=TruncDate('order__created_at'))
+        .values('product_id', 'day')
+        .annotate(sold=Sum('quantity'), amount=Sum(F('quantity') * F('price')))
+        .order_by()
+    )
+    with transaction.atomic():
+        ProductSalesDay.objects.all().delete()
+        ProductSalesDay.objects.bulk_create(
+            (
+                ProductSalesDay(product_id=row['product_id'], day=row['day'], quantity=row['sold'], revenue=row['amount'])
+                for row in rows.iterator()
+            ),
+            batch_size=1000,
+        )
+    return compact_sales(retention_days=retention_days)
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from apps.orders.services import create_sales_summaries
+from apps.shop.models import Product
+
+
+@receiver(post_save, sender=Product)
+def create_sales_summary(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        create_sales_summaries([instance.id])
@@ -0,0 +1,27 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.search.suggest import SUGGEST_LIMITS, suggest
+
+SUGGEST_MAX_QUERY_LENGTH = 100
+
+
+class SuggestView(APIView):
+    """Autocompletado: productos, marcas y categorías que empiezan por lo escrito en `q`."""
+    # Con la caché fría se reconstruyen los índices (3 consultas)
+    query_budget = 4
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        if len(query) > SUGGEST_MAX_QUERY_LENGTH:
+            raise ValidationError({'q': f'Debe tener como máximo {SUGGEST_MAX_QUERY_LENGTH} caracteres.'})
+        limits = SUGGEST_LIMITS
+        if 'limit' in request.query_params:
+            try:
+                limit = int(request.query_params['limit'])
+            except ValueError:
+                raise ValidationError({'limit': 'Debe ser un número entero.'})
+            if not 1 <= limit <= 20:
+                raise ValidationError({'limit': 'Debe estar entre 1 y 20.'})
+            limits = dict(SUGGEST_LIMITS, products=limit)
+        return Response({'query': query, **suggest(query, limits)})
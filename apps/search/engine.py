@@ -0,0 +1,267 @@
+"""
+Índice invertido de productos.
+
+Cada producto se analiza (apps.search.text) en sus campos con distinto peso y
+se guarda una fila SearchPosting por término con un peso tipo BM25. Las
+búsquedas resuelven los términos contra un vocabulario en memoria (con
+tolerancia a errores de tipeo) y ordenan en una sola consulta agregada.
+"""
+import math
+import multiprocessing
+import time
+from collections import Counter, defaultdict
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from apps.search.models import SearchPosting, SearchTerm
+from apps.search.text import analyze, edit_distance
+from apps.shop.models import Product
+from apps.shop.services import get_category_paths
+from apps.shop.versions import PRODUCTS, touch_catalog
+
+FIELD_BOOSTS = (('name', 3.0), ('brand', 2.0), ('category', 1.5), ('description', 0.5))
+K1 = 1.2
+B = 0.75
+# Longitud ponderada (suma de boosts por token) de un producto típico del catálogo
+AVERAGE_LENGTH = 25.0
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+SEARCH_MAX_RESULTS = 500
+FUZZY_CANDIDATES = 5
+FUZZY_PENALTY = 0.6
+# Términos presentes en más de esta fracción del catálogo (y en muchos productos)
+# no discriminan y solo encarecen la agregación: se ignoran si hay otros
+COMMON_TERM_RATIO = 0.5
+COMMON_TERM_MIN_DOCUMENTS = 1000
+VOCABULARY_VERSION_KEY = 'search:vocabulary:version'
+BATCH_SIZE = 1000
+
+_vocabulary = {'version': None}
+
+
+def document_terms(product, paths):
+    """Pesos {término: peso} de un producto cargado con brand y category."""
+    category = product.category
+    fields = {
+        'name': product.name,
+        'brand': product.brand.name if product.brand else '',
+        'category': ' '.join(
+            [ancestor['name'] for ancestor in paths.get(category.id, [])] + [category.name]
+        ) if category else '',
+        'description': product.description,
+    }
+    frequencies = Counter()
+    for field, boost in FIELD_BOOSTS:
+        for term in analyze(fields[field]):
+            frequencies[term[:MAX_TERM_LENGTH]] += boost
+    length = sum(frequencies.values())
+    norm = K1 * (1 - B + B * length / AVERAGE_LENGTH)
+    return {term: tf * (K1 + 1) / (tf + norm) for term, tf in frequencies.items()}
+
+
+def analyze_products(product_ids):
+    paths = get_category_paths()
+    products = Product.objects.filter(id__in=product_ids).select_related('brand', 'category')
+    return [(product.id, document_terms(product, paths)) for product in products]
+
+
+def _adjust_document_counts(term_counts, sign):
+    by_amount = defaultdict(list)
+    for term_id, amount in term_counts.items():
+        by_amount[amount].append(term_id)
+    for amount, term_ids in by_amount.items():
+        SearchTerm.objects.filter(id__in=term_ids).update(document_count=F('document_count') + sign * amount)
+
+
+def _term_ids(terms, known):
+    """Ids de los términos, creando los que falten; actualiza `known` en el lugar."""
+    missing = set(terms) - known.keys()
+    if missing:
+        known.update(SearchTerm.objects.filter(term__in=missing).values_list('term', 'id'))
+        missing -= known.keys()
+    if missing:
+        SearchTerm.objects.bulk_create([SearchTerm(term=term) for term in missing], ignore_conflicts=True)
+        # bulk_create no devuelve ids en MySQL
+        known.update(SearchTerm.objects.filter(term__in=missing).values_list('term', 'id'))
+        invalidate_vocabulary()
+    return known
+
+
+@transaction.atomic
+def _replace_postings(product_ids, documents):
+    previous = SearchPosting.objects.filter(product_id__in=product_ids)
+    _adjust_document_counts(Counter(previous.values_list('term_id', flat=True)), -1)
+    previous.delete()
+
+    known = _term_ids({term for _, terms in documents for term in terms}, {})
+    postings = [
+        SearchPosting(term_id=known[term], product_id=product_id, weight=weight)
+        for product_id, terms in documents
+        for term, weight in terms.items()
+    ]
+    SearchPosting.objects.bulk_create(postings, batch_size=BATCH_SIZE)
+    _adjust_document_counts(Counter(posting.term_id for posting in postings), 1)
+    # Los resultados de ?search= del listado cambian
+    touch_catalog(PRODUCTS)
+
+
+def index_products(product_ids):
+    """Reindexa los productos indicados (los que ya no existan quedan fuera del índice)."""
+    product_ids = list(product_ids)
+    _replace_postings(product_ids, analyze_products(product_ids))
+
+
+def remove_products(product_ids):
+    _replace_postings(list(product_ids), [])
+
+
+def _insert_postings(rows):
+    """INSERT directo de tuplas (term_id, product_id, weight): el ORM es el cuello de botella al reconstruir."""
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}, {}, {}) VALUES (%s, %s, %s)'.format(
+        quote(SearchPosting._meta.db_table), quote('term_id'), quote('product_id'), quote('weight'),
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE * 10):
+            cursor.executemany(sql, rows[start:start + BATCH_SIZE * 10])
+
+
+def rebuild_index(workers=1, chunk_size=2000):
+    """
+    Reconstruye el índice completo. El análisis de texto se reparte entre
+    `workers` procesos; las escrituras las hace el proceso principal en una
+    transacción, así las búsquedas siguen viendo el índice anterior hasta el final.
+    """
+    ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+    chunks = [ids[start:start + chunk_size] for start in range(0, len(ids), chunk_size)]
+    pool = None
+    # SQLite bloquea las lecturas de otros procesos mientras la transacción escribe
+    if workers > 1 and len(chunks) > 1 and connection.vendor != 'sqlite':
+        # Los procesos hijos abren sus propias conexiones
+        connections.close_all()
+        pool = multiprocessing.get_context('fork').Pool(workers)
+        results = pool.imap_unordered(analyze_products, chunks)
+    else:
+        results = map(analyze_products, chunks)
+
+    known = {}
+    try:
+        with transaction.atomic():
+            SearchPosting.objects.all().delete()
+            SearchTerm.objects.all().delete()
+            for documents in results:
+                terms = {term for _, weights in documents for term in weights}
+                _term_ids(terms, known)
+                _insert_postings([
+                    (known[term], product_id, weight)
+                    for product_id, weights in documents
+                    for term, weight in weights.items()
+                ])
+            postings = (
+                SearchPosting.objects.filter(term=OuterRef('pk'))
+                .values('term').annotate(total=Count('id')).values('total')
+            )
+            SearchTerm.objects.update(document_count=Coalesce(Subquery(postings), 0))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    invalidate_vocabulary()
+    touch_catalog(PRODUCTS)
+    return len(ids), len(known)
+
+
+def invalidate_vocabulary():
+    try:
+        cache.incr(VOCABULARY_VERSION_KEY)
+    except ValueError:
+        cache.set(VOCABULARY_VERSION_KEY, time.time_ns(), None)
+
+
+def get_vocabulary():
+    """
+    Vocabulario en memoria del proceso: {término: (id, documentos)} y cubetas
+    por (primera letra, largo) para buscar candidatos con errores de tipeo.
+    Se recarga solo cuando aparecen términos nuevos (cambia la versión).
+    """
+    version = cache.get(VOCABULARY_VERSION_KEY)
+    if version is None:
+        invalidate_vocabulary()
+        version = cache.get(VOCABULARY_VERSION_KEY)
+    if _vocabulary['version'] != version:
+        terms = {}
+        buckets = defaultdict(list)
+        for term, term_id, documents in SearchTerm.objects.values_list('term', 'id', 'document_count').iterator():
+            terms[term] = (term_id, documents)
+            buckets[term[0], len(term)].append(term)
+        _vocabulary.update(
+            version=version,
+            terms=terms,
+            buckets=buckets,
+            documents=max(Product.objects.count(), 1),
+        )
+    return _vocabulary
+
+
+def fuzzy_terms(token, vocabulary):
+    """Términos del vocabulario a distancia de edición 1 (2 si el token es largo)."""
+    if len(token) < 4 or token.isdigit():
+        return []
+    limit = 1 if len(token) < 8 else 2
+    candidates = []
+    for length in range(len(token) - limit, len(token) + limit + 1):
+        for term in vocabulary['buckets'].get((token[0], length), ()):
+            distance = edit_distance(token, term, limit)
+            if distance <= limit:
+                candidates.append((distance, -vocabulary['terms'][term][1], term))
+    return [(term, FUZZY_PENALTY ** distance) for distance, _, term in sorted(candidates)[:FUZZY_CANDIDATES]]
+
+
+def search_product_ids(query, limit=SEARCH_MAX_RESULTS):
+    """
+    Ids de productos ordenados por relevancia: primero los que cubren más
+    palabras de la consulta y luego por puntaje BM25. Devuelve None si la
+    consulta no tiene términos buscables.
+    """
+    tokens = list(dict.fromkeys(analyze(query)))[:MAX_QUERY_TERMS]
+    if not tokens:
+        return None
+    vocabulary = get_vocabulary()
+    terms, total = vocabulary['terms'], vocabulary['documents']
+
+    groups = []
+    for token in tokens:
+        matches = [(token, 1.0)] if token in terms else fuzzy_terms(token, vocabulary)
+        if matches:
+            groups.append({terms[term][0]: (factor, terms[term][1]) for term, factor in matches})
+        else:
+            # Una palabra que no existe en el catálogo no puede coincidir
+            return []
+    common = max(total * COMMON_TERM_RATIO, COMMON_TERM_MIN_DOCUMENTS)
+    selective = [group for group in groups if min(df for _, df in group.values()) <= common]
+    groups = selective or groups
+
+    weights = {}
+    for group in groups:
+        for term_id, (factor, df) in group.items():
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            weights[term_id] = max(weights.get(term_id, 0), idf * factor)
+    score = Sum(
+        Case(
+            *[When(term_id=term_id, then=Value(weight)) for term_id, weight in weights.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        ) * F('weight')
+    )
+    matched = Count(
+        Case(*[When(term_id__in=list(group), then=Value(position)) for position, group in enumerate(groups)]),
+        distinct=True,
+    )
+    rows = (
+        SearchPosting.objects.filter(term_id__in=list(weights))
+        .values('product_id')
+        .annotate(matched=matched, score=score)
+        .order_by('-matched', '-score', 'product_id')[:limit]
+    )
+    return [row['product_id'] for row in rows]
@@ -0,0 +1,25 @@
+from django.db.models import Case, IntegerField, Value, When
+from rest_framework.filters import SearchFilter
+from apps.search.engine import search_product_ids
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    Búsqueda sobre el índice invertido (apps.search.engine) en lugar de icontains.
+    Los resultados quedan ordenados por relevancia salvo que se pida `ordering`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        product_ids = search_product_ids(query)
+        if product_ids is None:
+            return queryset
+        if not product_ids:
+            return queryset.none()
+        rank = Case(
+            *[When(id=product_id, then=Value(position)) for position, product_id in enumerate(product_ids)],
+            output_field=IntegerField(),
+        )
+        return queryset.filter(id__in=product_ids).annotate(search_rank=rank).order_by('search_rank')
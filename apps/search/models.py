@@ -1,3 +1,24 @@
 from django.db import models
+from apps.shop.models import Product
 
-# Create your models here.
+
+class SearchTerm(models.Model):
+    term = models.CharField(max_length=64, unique=True)
+    document_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.term
+
+class SearchPosting(models.Model):
+    # Entrada del índice invertido: peso del término en el producto (ver apps.search.engine)
+    term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE, related_name='postings')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'product'], name='unique_search_posting'),
+        ]
+        indexes = [
+            models.Index(fields=['product']),
+        ]
@@ -0,0 +1,71 @@
+from functools import partial
+from django.db import transaction
+from django.db.models import DEFERRED
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from apps.search import engine
+from apps.search.suggest import invalidate_suggestions
+from apps.shop.models import Brand, Category, Product
+
+SEARCH_FIELDS = ('name', 'description', 'category_id', 'brand_id')
+SUGGEST_FIELDS = ('name', 'slug')
+
+
+@receiver(pre_save, sender=Product)
+def detect_search_changes(sender, instance, raw=False, **kwargs):
+    # apps.shop.signals (registrado antes) ya cargó los valores previos en _loaded_values
+    previous = {} if instance._state.adding else getattr(instance, '_loaded_values', {})
+    instance._search_changed = {
+        name for name in SEARCH_FIELDS + SUGGEST_FIELDS if previous.get(name, DEFERRED) != getattr(instance, name)
+    }
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Guardar stock o precio (cada pedido) no toca los índices
+    changed = getattr(instance, '_search_changed', set(SEARCH_FIELDS + SUGGEST_FIELDS))
+    if changed.intersection(SEARCH_FIELDS):
+        transaction.on_commit(partial(engine.index_products, [instance.id]))
+    if changed.intersection(SUGGEST_FIELDS):
+        transaction.on_commit(invalidate_suggestions)
+
+
+@receiver(pre_delete, sender=Product)
+def remove_product(sender, instance, **kwargs):
+    engine.remove_products([instance.id])
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Category)
+def refresh_suggestions(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_suggestions)
+
+
+@receiver(post_save, sender=Brand)
+def reindex_brand(sender, instance, raw=False, created=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(invalidate_suggestions)
+    if created:
+        return
+    product_ids = Product.objects.filter(brand=instance).values_list('id', flat=True)
+    transaction.on_commit(lambda: engine.index_products(list(product_ids)))
+
+
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance, raw=False, created=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(invalidate_suggestions)
+    if created:
+        return
+    # Los productos del subárbol llevan el nombre de sus categorías ancestras
+    product_ids = Product.objects.filter(
+        category__tree_id=instance.tree_id,
+        category__lft__gte=instance.lft,
+        category__rght__lte=instance.rght,
+    ).values_list('id', flat=True)
+    transaction.on_commit(lambda: engine.index_products(list(product_ids)))
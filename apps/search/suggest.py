@@ -0,0 +1,113 @@
+"""
+Autocompletado por prefijo en memoria.
+
+Por cada tipo (productos, marcas, categorías) se guardan las entradas ordenadas
+por popularidad y un arreglo ordenado de (palabra, posición) sobre el que se
+busca el rango de un prefijo con bisect. Los prefijos de una o dos letras, cuyo
+rango puede abarcar medio catálogo, tienen sus mejores posiciones precalculadas.
+"""
+import time
+from bisect import bisect_left
+from django.core.cache import cache
+from django.db.models.functions import Coalesce
+from apps.search.text import STOPWORDS, TOKEN_RE, fold, tokenize
+from apps.shop.models import Brand, Category, Product
+
+SUGGEST_VERSION_KEY = 'search:suggest:version'
+# La popularidad (ventas) cambia sin tocar el catálogo: se recalcula igual cada tanto
+SUGGEST_MAX_AGE = 60 * 10
+SHORT_PREFIX_LENGTH = 2
+SHORT_PREFIX_CANDIDATES = 50
+SUGGEST_LIMITS = {'products': 6, 'brands': 3, 'categories': 3}
+
+_indexes = {'version': None, 'built_at': 0.0}
+
+
+class PrefixIndex:
+    """Entradas (id, name, slug) ya ordenadas de más a menos popular."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.entry_words = []
+        pairs = []
+        for position, (_, name, _) in enumerate(entries):
+            words = tuple(dict.fromkeys(tokenize(name)))
+            self.entry_words.append(words)
+            pairs.extend((word, position) for word in words)
+        pairs.sort()
+        self.words = [word for word, _ in pairs]
+        self.positions = [position for _, position in pairs]
+
+        self.short = {}
+        for word, position in pairs:
+            for length in range(1, min(len(word), SHORT_PREFIX_LENGTH) + 1):
+                self.short.setdefault(word[:length], set()).add(position)
+        self.short = {
+            prefix: sorted(positions)[:SHORT_PREFIX_CANDIDATES] for prefix, positions in self.short.items()
+        }
+
+    def candidates(self, prefix):
+        if len(prefix) <= SHORT_PREFIX_LENGTH:
+            return self.short.get(prefix, [])
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + '\uffff', start)
+        return sorted(set(self.positions[start:end]))
+
+    def suggest(self, tokens, limit):
+        # El token más largo es el más selectivo; el resto se verifica por entrada
+        anchor = max(tokens, key=len)
+        results = []
+        for position in self.candidates(anchor):
+            words = self.entry_words[position]
+            if all(any(word.startswith(token) for word in words) for token in tokens):
+                entry_id, name, slug = self.entries[position]
+                results.append({'id': entry_id, 'name': name, 'slug': slug})
+                if len(results) == limit:
+                    break
+        return results
+
+
+def build_indexes():
+    products = (
+        Product.objects.annotate(sold=Coalesce('sales_summary__sold_30d', 0))
+        .order_by('-sold', '-reviews_count', 'id')
+        .values_list('id', 'name', 'slug')
+    )
+    brands = Brand.objects.order_by('-product_count', 'name').values_list('id', 'name', 'slug')
+    categories = Category.objects.order_by('-product_count', 'name').values_list('id', 'name', 'slug')
+    return {
+        'products': PrefixIndex(list(products.iterator())),
+        'brands': PrefixIndex(list(brands)),
+        'categories': PrefixIndex(list(categories)),
+    }
+
+
+def invalidate_suggestions():
+    _indexes['version'] = None
+    try:
+        cache.incr(SUGGEST_VERSION_KEY)
+    except ValueError:
+        cache.set(SUGGEST_VERSION_KEY, time.time_ns(), None)
+
+
+def get_indexes():
+    version = cache.get(SUGGEST_VERSION_KEY)
+    if version is None:
+        invalidate_suggestions()
+        version = cache.get(SUGGEST_VERSION_KEY)
+    now = time.monotonic()
+    if _indexes['version'] != version or now - _indexes['built_at'] > SUGGEST_MAX_AGE:
+        _indexes.update(build_indexes(), version=version, built_at=now)
+    return _indexes
+
+
+def suggest(query, limits=SUGGEST_LIMITS):
+    """Sugerencias por tipo para un texto parcial; la última palabra puede estar incompleta."""
+    words = TOKEN_RE.findall(fold(query))
+    # La última palabra se conserva aunque sea de relleno: 'la' puede ser el inicio de 'lasaña'
+    tokens = [word for word in words[:-1] if word not in STOPWORDS] + words[-1:]
+    indexes = get_indexes()
+    return {
+        kind: indexes[kind].suggest(tokens, limit) if tokens else []
+        for kind, limit in limits.items()
+    }
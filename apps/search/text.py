@@ -0,0 +1,62 @@
+import re
+import unicodedata
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+STOPWORDS = frozenset((
+    'a', 'al', 'con', 'de', 'del', 'e', 'el', 'en', 'la', 'las', 'lo', 'los', 'o', 'para',
+    'por', 'sin', 'su', 'sus', 'u', 'un', 'una', 'unos', 'unas', 'y',
+))
+
+
+def fold(text):
+    """Minúsculas y sin tildes ni diéresis: 'MASMAÍ' -> 'masmai', 'Piña' -> 'pina'."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def stem(token):
+    """
+    Stemmer liviano para español (plurales y vocal final, al estilo de Savoy):
+    'arepas' y 'arepa' -> 'arep', 'limones' -> 'limon', 'luces' -> 'luz'.
+    """
+    if token.isdigit() or len(token) <= 3:
+        return token
+    if token.endswith('eses') and len(token) > 5:
+        token = token[:-2]
+    elif token.endswith('ces') and len(token) > 4:
+        token = token[:-3] + 'z'
+    elif token.endswith(('os', 'as', 'es')) and len(token) > 4:
+        token = token[:-2]
+    elif token.endswith('s') and len(token) > 4:
+        token = token[:-1]
+    if token.endswith(('a', 'o', 'e')) and len(token) > 3:
+        token = token[:-1]
+    return token
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(fold(text)) if token not in STOPWORDS]
+
+
+def analyze(text):
+    """Términos indexables de un texto: tokens normalizados y reducidos a su raíz."""
+    return [stem(token) for token in tokenize(text)]
+
+
+def edit_distance(a, b, limit):
+    """Distancia Damerau-Levenshtein (transposiciones adyacentes), cortando al superar `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
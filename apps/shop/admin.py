@@ -1,6 +1,11 @@
 from django.contrib import admin
+from django.db.models import F
 from django.utils.html import format_html
-from .models import Brand, Category, Product, Wishlist, ProductImage
+from django.utils import timezone
+from .models import Brand, Category, PricingCampaign, Product, Wishlist, ProductImage
+from .home import invalidate_home_rails
+from .pricing import apply_campaign, revert_campaign
+from .versions import PRODUCTS, touch_catalog
 
 
 class ProductImageInline(admin.TabularInline):
@@ -81,16 +86,22 @@ class ProductAdmin(admin.ModelAdmin):
     
     def mark_as_featured(self, request, queryset):
         updated = queryset.update(is_featured=True)
+        invalidate_home_rails()
+        touch_catalog(PRODUCTS)
         self.message_user(request, f'{updated} productos marcados como destacados.')
     mark_as_featured.short_description = 'Marcar como destacado'
     
     def mark_as_new(self, request, queryset):
         updated = queryset.update(is_new=True)
+        invalidate_home_rails()
+        touch_catalog(PRODUCTS)
         self.message_user(request, f'{updated} productos marcados como nuevos.')
     mark_as_new.short_description = 'Marcar como nuevo'
     
     def remove_discount(self, request, queryset):
-        updated = queryset.update(discount=0)
+        updated = queryset.update(discount=0, effective_price=F('price'))
+        invalidate_home_rails()
+        touch_catalog(PRODUCTS)
         self.message_user(request, f'Descuento eliminado de {updated} productos.')
     remove_discount.short_description = 'Eliminar descuento'
 
@@ -98,12 +109,13 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'parent', 'product_count')
+    list_select_related = ('parent',)
     search_fields = ('name', 'slug')
     prepopulated_fields = {'slug': ('name',)}
     mptt_level_indent = 20
     
     def product_count(self, obj):
-        count = obj.products.count()
+        count = obj.product_count
         return format_html(
             '<span style="background: #17a2b8; color: white; padding: 2px 8px; border-radius: 10px;">{}</span>',
             count
@@ -118,7 +130,7 @@ class BrandAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     
     def product_count(self, obj):
-        count = obj.products.count()
+        count = obj.product_count
         return format_html(
             '<span style="background: #6c757d; color: white; padding: 2px 8px; border-radius: 10px;">{}</span>',
             count
@@ -141,3 +153,37 @@ class WishlistAdmin(admin.ModelAdmin):
             count
         )
     product_count.short_description = 'Productos'
+
+
+@admin.register(PricingCampaign)
+class PricingCampaignAdmin(admin.ModelAdmin):
+    list_display = ('name', 'discount', 'starts_at', 'ends_at', 'target', 'status', 'applied_count')
+    list_filter = ('status',)
+    search_fields = ('name',)
+    autocomplete_fields = ('category', 'brand')
+    filter_horizontal = ('products',)
+    readonly_fields = ('status', 'applied_count', 'created_at')
+    actions = ['start_now', 'end_now']
+
+    def target(self, obj):
+        if obj.category_id:
+            return f'Categoría: {obj.category}'
+        if obj.brand_id:
+            return f'Marca: {obj.brand}'
+        return 'Productos seleccionados'
+    target.short_description = 'Destino'
+
+    def start_now(self, request, queryset):
+        now = timezone.now()
+        # La ventana empieza ahora; sync_campaigns la revierte al llegar ends_at
+        queryset.filter(status=PricingCampaign.Status.SCHEDULED, ends_at__gt=now).update(starts_at=now)
+        updated = sum(apply_campaign(campaign, now) for campaign in queryset.filter(status=PricingCampaign.Status.SCHEDULED, ends_at__gt=now))
+        self.message_user(request, f'Descuento aplicado a {updated} productos.')
+    start_now.short_description = 'Aplicar ahora'
+
+    def end_now(self, request, queryset):
+        now = timezone.now()
+        updated = sum(revert_campaign(campaign, now) for campaign in queryset.filter(status=PricingCampaign.Status.ACTIVE))
+        self.message_user(request, f'Descuento revertido en {updated} productos.')
+    end_now.short_description = 'Finalizar ahora'
+
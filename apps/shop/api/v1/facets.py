@@ -0,0 +1,101 @@
+"""
+Conteos por faceta del listado de productos (?facets=true).
+
+Se calculan sobre el resultado ya filtrado, sin paginar: una consulta agrupada
+por (categoría, marca) con banderas y precios, las referencias de categorías y
+marcas, y los rangos de precio.
+"""
+import math
+from collections import Counter
+from decimal import Decimal
+from django.db.models import Count, Max, Min, Q
+from apps.shop.models import Brand, Category, current_price_expression, lapsed_discount_q
+from apps.shop.services import get_category_paths
+
+PRICE_BUCKETS = 5
+CENTS = Decimal('0.01')
+FLAGS = ('is_new', 'is_top', 'is_featured')
+
+
+def price_step(low, high, buckets=PRICE_BUCKETS):
+    """Ancho 'redondo' (1, 2 o 5 × 10^n, mínimo 1) para cubrir [low, high] en `buckets` rangos."""
+    span = max((high - low) / buckets, 1)
+    magnitude = Decimal(10) ** math.floor(math.log10(span))
+    for factor in (1, 2, 5, 10):
+        if factor * magnitude >= span:
+            return factor * magnitude
+
+
+def price_buckets(queryset, low, high):
+    step = price_step(low, high)
+    start = (low // step * step).quantize(CENTS)
+    edges = []
+    while start <= high:
+        edges.append((start, (start + step).quantize(CENTS)))
+        start = edges[-1][1]
+    # Como los filtros de precio: sobre effective_price, o el precio base si el descuento venció sin barrer
+    lapsed = lapsed_discount_q()
+    counts = queryset.aggregate(**{
+        f'bucket_{position}': Count('id', filter=(
+            ~lapsed & Q(effective_price__gte=lower, effective_price__lt=upper)
+            | lapsed & Q(price__gte=lower, price__lt=upper)
+        ))
+        for position, (lower, upper) in enumerate(edges)
+    })
+    return [
+        {'min': str(lower), 'max': str(upper), 'count': counts[f'bucket_{position}']}
+        for position, (lower, upper) in enumerate(edges)
+    ]
+
+
+def product_facets(queryset):
+    queryset = queryset.order_by().prefetch_related(None)
+    groups = queryset.values('category_id', 'brand_id').annotate(
+        total=Count('id'),
+        is_new=Count('id', filter=Q(is_new=True)),
+        is_top=Count('id', filter=Q(is_top=True)),
+        is_featured=Count('id', filter=Q(is_featured=True)),
+        # Igual que los filtros de precio: un descuento vencido sin barrer vale por su precio base
+        min_price=Min(current_price_expression()),
+        max_price=Max(current_price_expression()),
+    )
+
+    categories, brands, flags = Counter(), Counter(), Counter()
+    prices = []
+    paths = get_category_paths()
+    for group in groups:
+        category_id, brand_id, total = group['category_id'], group['brand_id'], group['total']
+        if category_id is not None:
+            # Cada producto cuenta en su categoría y en todos sus ancestros
+            categories[category_id] += total
+            for ancestor in paths.get(category_id, []):
+                categories[ancestor['id']] += total
+        if brand_id is not None:
+            brands[brand_id] += total
+        flags.update({flag: group[flag] for flag in FLAGS})
+        prices += [group['min_price'], group['max_price']]
+
+    category_references = Category.objects.filter(id__in=categories).values('id', 'name', 'slug', 'parent_id')
+    brand_references = Brand.objects.filter(id__in=brands).values('id', 'name', 'slug')
+    low, high = (min(prices).quantize(CENTS), max(prices).quantize(CENTS)) if prices else (None, None)
+    return {
+        'categories': sorted(
+            (
+                {'id': category['id'], 'name': category['name'], 'slug': category['slug'],
+                 'parent': category['parent_id'], 'count': categories[category['id']]}
+                for category in category_references
+            ),
+            key=lambda category: (-category['count'], category['name']),
+        ),
+        'brands': sorted(
+            ({**brand, 'count': brands[brand['id']]} for brand in brand_references),
+            key=lambda brand: (-brand['count'], brand['name']),
+        ),
+        'flags': {flag: flags[flag] for flag in FLAGS},
+        'price': {
+            # Como cadenas, igual que los campos decimales de los serializers
+            'min': str(low) if prices else None,
+            'max': str(high) if prices else None,
+            'buckets': price_buckets(queryset, low, high) if prices else [],
+        },
+    }
@@ -1,12 +1,10 @@
 # import django_filters
-from apps.shop.models import Product, Category
+from apps.shop.models import Product, Category, current_price_expression, lapsed_discount_q
+from apps.shop.pricing import discounts_pending_sweep
+from django.db.models import F, Q
 from django.shortcuts import get_object_or_404
 from django_filters import rest_framework as filters
-from django.db.models import F, ExpressionWrapper, DecimalField, Func
-
-class Ceil(Func):
-    function = 'CEIL'
-    arity = 1
+from rest_framework.filters import OrderingFilter
 
 class ProductFilter(filters.FilterSet):
     category = filters.CharFilter(field_name='category__slug', method='filter_by_category')
@@ -27,20 +25,37 @@ class ProductFilter(filters.FilterSet):
         brands = value.split(',')
         return queryset.filter(brand__slug__in=brands)
     
+    # Sobre el índice de effective_price; un descuento vencido que el barrido aún no devolvió
+    # vale por su precio base (effective_price nunca supera a price)
     def filter_by_min_price(self, queryset, name, value):
-        queryset = queryset.annotate(
-            discount_price=ExpressionWrapper(
-                Ceil((F('price') - (F('price') * F('discount') / 100)) / 50) * 50,
-                output_field=DecimalField()
-            )
-        )
-        return queryset.filter(discount_price__gte=value)
+        return queryset.filter(Q(effective_price__gte=value) | lapsed_discount_q() & Q(price__gte=value))
 
     def filter_by_max_price(self, queryset, name, value):
-        queryset = queryset.annotate(
-            discount_price=ExpressionWrapper(
-                Ceil((F('price') - (F('price') * F('discount') / 100)) / 50) * 50,
-                output_field=DecimalField()
-            )
-        )
-        return queryset.filter(discount_price__lte=value)
\ No newline at end of file
+        return queryset.filter(effective_price__lte=value).exclude(lapsed_discount_q() & Q(price__gt=value))
+
+
+class ProductOrderingFilter(OrderingFilter):
+    # `price` ordena por el precio que ve el cliente: effective_price (índice effective_price, id)
+    # salvo mientras haya descuentos vencidos sin barrer, igual que los filtros de precio
+    aliases = {'price': 'current_price'}
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if ordering and any(term.lstrip('-') == 'current_price' for term in ordering):
+            price = current_price_expression() if discounts_pending_sweep() else F('effective_price')
+            queryset = queryset.annotate(current_price=price)
+        return super().filter_queryset(request, queryset, view)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        ordering = [self.resolve(term) for term in ordering]
+        # Desempate único para que el orden sea estable entre páginas
+        direction = '-' if ordering[-1].startswith('-') else ''
+        return ordering + [f'{direction}id']
+
+    def resolve(self, term):
+        descending = term.startswith('-')
+        field = self.aliases.get(term.lstrip('-'), term.lstrip('-'))
+        return f'-{field}' if descending else field
\ No newline at end of file
@@ -1,7 +1,10 @@
 # Serializer for the Shop model
 
+from django.db.models import Prefetch
 from rest_framework import serializers
 from apps.shop.models import Product, Category, Brand, ProductImage, Wishlist
+from apps.shop.services import get_category_paths
+from apps.shop.wishlist import wishlist_product_ids
 
 
 class BrandSerializer(serializers.ModelSerializer):
@@ -18,12 +21,28 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'slug', 'image', 'parent', 'count', 'children')
 
     def get_children(self, obj):
-        children = obj.get_children()
-        return [CategorySerializer(children, many=True).data]
+        # Los nodos armados por build_category_tree ya traen sus hijos en memoria
+        children = getattr(obj, '_children', None)
+        if children is None:
+            children = obj.get_children()
+        # Los hijos se serializan con la misma clase que el padre (p. ej. CategoryTreeSerializer)
+        return type(self)(children, many=True, context=self.context).data
     
     def get_count(self, obj):
-        subcategories = obj.get_descendants(include_self=True)
-        return Product.objects.filter(category__in=subcategories).count()
+        return obj.product_count
+
+
+class CategoryTreeSerializer(CategorySerializer):
+    ancestors = serializers.SerializerMethodField()
+
+    class Meta(CategorySerializer.Meta):
+        fields = CategorySerializer.Meta.fields + ('ancestors',)
+
+    def get_ancestors(self, obj):
+        return [
+            {'id': ancestor.id, 'name': ancestor.name, 'slug': ancestor.slug}
+            for ancestor in getattr(obj, '_ancestors', [])
+        ]
 
     
 class ProductImageSerializer(serializers.ModelSerializer):
@@ -33,7 +52,7 @@ class ProductImageSerializer(serializers.ModelSerializer):
 
 class ProductSerializer(serializers.ModelSerializer):
     large_pictures = ProductImageSerializer(many=True, read_only=True)
-    category = CategorySerializer()
+    category = serializers.SerializerMethodField()
     brand = BrandSerializer()
     display_price = serializers.SerializerMethodField()
     pictures = serializers.SerializerMethodField()
@@ -42,28 +61,118 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         fields = '__all__'
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('category', 'brand').prefetch_related(
+            Prefetch('large_pictures', queryset=ProductImage.objects.order_by('id'))
+        )
+
+    def get_category(self, obj):
+        return category_reference(obj.category, self.context)
+
     def get_display_price(self, obj):
         return obj.get_display_price()
     
     def get_pictures(self, obj):
-        return [{'url': obj.large_pictures.first().url, 'width': 150, 'height': 150}]
+        return primary_picture(obj)
     
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         representation['stock'] = str(representation['stock'])
         return representation
 
-class HomeSerializer(serializers.Serializer):
-    best_selling = ProductSerializer(many=True)
-    featured = ProductSerializer(many=True)
-    latest = ProductSerializer(many=True)
-    on_sale = ProductSerializer(many=True)
 
+def primary_picture(product):
+    # Recorre .all() para aprovechar el prefetch ordenado de setup_eager_loading
+    picture = next(iter(product.large_pictures.all()), None)
+    if picture is None:
+        return []
+    return [{'url': picture.url, 'width': 150, 'height': 150}]
+
+
+def category_reference(category, context):
+    # Categoría plana con su ruta de ancestros: sin consultas por nivel del árbol
+    if category is None:
+        return None
+    # Un solo acceso a la caché de rutas por respuesta, compartido por los serializers anidados
+    paths = context.get('category_paths')
+    if paths is None:
+        paths = context['category_paths'] = get_category_paths()
+    return {
+        'id': category.id,
+        'slug': category.slug,
+        'name': category.name,
+        'path': paths.get(category.id, []),
+    }
+
+
+class BrandReferenceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Brand
+        fields = ('id', 'name', 'slug')
+
+
+class ProductListSerializer(serializers.ModelSerializer):
+    """
+    Proyección liviana para listados: categoría y marca planas y una sola imagen.
+    Usar con setup_eager_loading para mantener constante el número de consultas.
+    """
+    category = serializers.SerializerMethodField()
+    brand = BrandReferenceSerializer(read_only=True)
+    display_price = serializers.SerializerMethodField()
+    pictures = serializers.SerializerMethodField()
+    in_wishlist = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = (
+            'id', 'name', 'slug', 'price', 'display_price', 'discount', 'discount_end_date', 'stock',
+            'is_new', 'is_top', 'is_featured', 'ratings', 'reviews_count', 'category', 'brand',
+            'pictures', 'created_at', 'in_wishlist',
+        )
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('category', 'brand').prefetch_related(
+            Prefetch('large_pictures', queryset=ProductImage.objects.order_by('id'))
+        )
+
+    def get_category(self, obj):
+        return category_reference(obj.category, self.context)
+
+    def get_display_price(self, obj):
+        return obj.get_display_price()
+
+    def get_pictures(self, obj):
+        return primary_picture(obj)
+
+    def get_in_wishlist(self, obj):
+        # Igual que las rutas: un solo conjunto de ids por respuesta (sin request, como en el home, es False)
+        ids = self.context.get('wishlist_ids')
+        if ids is None:
+            request = self.context.get('request')
+            ids = self.context['wishlist_ids'] = wishlist_product_ids(request.user) if request else frozenset()
+        return obj.id in ids
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        if 'stock' in representation:
+            representation['stock'] = str(representation['stock'])
+        return representation
+
+
+class HomeProductSerializer(ProductListSerializer):
+    # Sin stock: los rieles se cachean y cada venta los invalidaría
+    class Meta(ProductListSerializer.Meta):
+        fields = tuple(field for field in ProductListSerializer.Meta.fields if field != 'stock')
+
+
+class HomeSerializer(serializers.Serializer):
+    best_selling = HomeProductSerializer(many=True)
+    featured = HomeProductSerializer(many=True)
+    latest = HomeProductSerializer(many=True)
+    on_sale = HomeProductSerializer(many=True)
 
 
-# class WishlistSerializer(serializers.ModelSerializer):
-#     user = UserSerializer()
-#     products = ProductSerializer(many=True, read_only=True)
-#     class Meta:
-#         model = Wishlist
-#         fields = '__all__'
\ No newline at end of file
+class WishlistItemSerializer(serializers.Serializer):
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all())
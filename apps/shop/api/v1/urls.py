@@ -1,6 +1,6 @@
 # shop app urls.py
 from django.urls import path, include
-from apps.shop.api.v1.views import ProductViewSet, CategoryViewSet, BrandViewSet, HomeListView
+from apps.shop.api.v1.views import ProductViewSet, CategoryViewSet, BrandViewSet, HomeListView, WishlistViewSet
 from rest_framework.routers import DefaultRouter
 
 
@@ -8,6 +8,7 @@ router = DefaultRouter()
 router.register('products', ProductViewSet)
 router.register('categories', CategoryViewSet)
 router.register('brands', BrandViewSet)
+router.register('wishlist', WishlistViewSet, basename='wishlist')
 urlpatterns = [
     path('', include(router.urls)),
     path('home/', HomeListView.as_view(), name='home'),
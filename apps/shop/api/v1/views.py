@@ -1,50 +1,102 @@
 # Views for the shop app
 # https://www.django-rest-framework.org/api-guide/filtering/  reference for filtering ✏
 
-from apps.shop.api.v1.serializers import ProductSerializer, CategorySerializer, BrandSerializer, HomeSerializer
-from apps.shop.models import Product, Category, Brand, Wishlist
-from rest_framework import viewsets, generics  
-from .filters import ProductFilter
+from apps.shop.api.v1.serializers import ProductSerializer, ProductListSerializer, CategorySerializer, CategoryTreeSerializer, BrandSerializer, HomeSerializer, WishlistItemSerializer
+from apps.shop.models import Product, ProductImage, Category, Brand, Wishlist
+from apps.shop.services import build_category_tree, category_subtree_queryset
+from apps.shop.home import HOME_RAILS_MAX_LIMIT, get_home_rails
+from apps.shop.pricing import products_version
+from apps.shop.exports import PRODUCT_EXPORT_COLUMNS, product_rows
+from apps.shop.related import get_neighbors
+from apps.shop.wishlist import add_to_wishlist, mark_wishlist, remove_from_wishlist, wishlist_state, wishlist_stamp
+from .facets import product_facets
+from django.db.models import Prefetch
+from django.http import Http404
+from functools import partial
+from rest_framework import viewsets, generics, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from .filters import ProductFilter, ProductOrderingFilter
+from django_filters.rest_framework import DjangoFilterBackend
+from apps.search.filters import ProductSearchFilter
+from apps.shop.versions import BRANDS, CATEGORIES, catalog_version
+from common.conditional import conditional_get, conditional_response, user_variant
+from common.exports import export_output, export_response
+from common.pagination import KeysetPagination
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
 class HomeListView(generics.GenericAPIView):
     serializer_class = HomeSerializer
+    # Máximo de consultas por request, con la caché fría (common/instrumentation.py)
+    query_budget = 10
 
     def get(self, request, *args, **kwargs):
-        limit = int(request.query_params.get('limit', 5))
-        best_selling = Product.objects.filter(is_top=True).order_by('-discount')[:limit] # luego cambiar por los productos mas vendidos en una semana
-        featured = Product.objects.filter(is_featured=True).order_by('-discount')[:limit]
-        latest = Product.objects.order_by('-created_at')[:limit]
-        on_sale = Product.objects.filter(discount__gt=0).order_by('-discount')[:limit]
-
-        data = {
-            'best_selling': best_selling,
-            'featured': featured,
-            'latest': latest,
-            'on_sale': on_sale
-        }
-
-        serializer = self.get_serializer(data)
-        return Response(serializer.data)
+        try:
+            limit = int(request.query_params.get('limit', 5))
+        except ValueError:
+            raise ValidationError({'limit': 'Debe ser un número entero.'})
+        if not 1 <= limit <= HOME_RAILS_MAX_LIMIT:
+            raise ValidationError({'limit': f'Debe estar entre 1 y {HOME_RAILS_MAX_LIMIT}.'})
+        # Payload precalculado por limit; ver apps.shop.home
+        rails = get_home_rails(limit)
+        own, variant = user_variant(request, wishlist_stamp)
+        return conditional_response(
+            request, max(rails['built_at'], own), lambda: Response(self.personalize(rails['payload'])), variant
+        )
+
+    def personalize(self, payload):
+        # El payload cacheado es compartido: in_wishlist se marca sobre una copia
+        ids = wishlist_state(self.request.user)['ids']
+        if not ids:
+            return payload
+        return {name: mark_wishlist(products, ids) for name, products in payload.items()}
 
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     lookup_field = 'slug'
     filterset_class = ProductFilter
-    search_fields = ['name', 'description']
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, ProductOrderingFilter]
     ordering_fields = ['price', 'created_at']
-
+    pagination_class = KeysetPagination
+    query_budget = {'list': 12, 'retrieve': 7}
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ProductListSerializer
+        return ProductSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            queryset = self.get_serializer_class().setup_eager_loading(queryset)
+        return queryset
+
+    @conditional_get(products_version, wishlist_stamp)
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # Conteos para los filtros laterales sobre el mismo resultado filtrado
+        if request.query_params.get('facets') == 'true':
+            response.data['facets'] = product_facets(self.filter_queryset(self.get_queryset()))
+        return response
+
+    @conditional_get(products_version, wishlist_stamp)
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        previous = Product.objects.filter(id__lt=instance.id).order_by('-id').first()
-        next = Product.objects.filter(id__gt=instance.id).order_by('id').first()
-        related = Product.objects.filter(category=instance.category).exclude(id=instance.id).order_by('?')[:4]
-
+        # Vecinos y relacionados precalculados: una búsqueda por clave y una carga en bloque
+        neighbors = get_neighbors(instance)
+        ids = [neighbors.previous_id, neighbors.next_id, *neighbors.related_ids]
+        products = ProductListSerializer.setup_eager_loading(Product.objects.all()).in_bulk([i for i in ids if i])
+        previous = products.get(neighbors.previous_id)
+        next = products.get(neighbors.next_id)
+        related = [products[i] for i in neighbors.related_ids if i in products]
+
+        context = self.get_serializer_context()
         serializer = self.get_serializer(instance)
-        previous_serializer = self.get_serializer(previous) if previous else None
-        next_serializer = self.get_serializer(next) if next else None
-        related_serializer = self.get_serializer(related, many=True)
+        previous_serializer = ProductListSerializer(previous, context=context) if previous else None
+        next_serializer = ProductListSerializer(next, context=context) if next else None
+        related_serializer = ProductListSerializer(related, many=True, context=context)
         
         return Response({
             'product': serializer.data,
@@ -53,21 +105,119 @@ class ProductViewSet(viewsets.ModelViewSet):
             'related': related_serializer.data if related_serializer else None
         })
 
+    @action(detail=False, permission_classes=[IsAdminUser])
+    def export(self, request, *args, **kwargs):
+        """Catálogo completo (o filtrado como el listado) en NDJSON o CSV, en streaming."""
+        output = export_output(request)
+        filterset = ProductFilter(request.query_params, queryset=Product.objects.all(), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return export_response(product_rows(filterset.qs), output, PRODUCT_EXPORT_COLUMNS, 'products')
+
 class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.filter(parent=None)
+    queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    query_budget = {'list': 2, 'retrieve': 2}
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'retrieve'):
+            return CategoryTreeSerializer
+        return CategorySerializer
+
+    def get_depth(self):
+        depth = self.request.query_params.get('depth')
+        if depth is None:
+            return None
+        try:
+            depth = int(depth)
+        except ValueError:
+            raise ValidationError({'depth': 'Debe ser un número entero.'})
+        if depth < 0:
+            raise ValidationError({'depth': 'Debe ser mayor o igual a 0.'})
+        return depth
+
+    def get_subtree(self, field, value):
+        # Una sola consulta: el subárbol pedido más sus ancestros (breadcrumbs)
+        depth = self.get_depth()
+        try:
+            nodes = list(category_subtree_queryset(depth, **{field: value}))
+        except (TypeError, ValueError):
+            raise Http404
+        build_category_tree(nodes)
+        for node in nodes:
+            if str(getattr(node, field)) == str(value):
+                return node
+        raise Http404
+
+    @conditional_get(partial(catalog_version, CATEGORIES))
+    def list(self, request, *args, **kwargs):
+        slug = request.query_params.get('slug')
+        if slug:
+            roots = [self.get_subtree('slug', slug)]
+        else:
+            depth = self.get_depth()
+            queryset = Category.objects.order_by('tree_id', 'lft')
+            if depth is not None:
+                queryset = queryset.filter(level__lte=depth)
+            roots = build_category_tree(queryset)
+
+        page = self.paginate_queryset(roots)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(roots, many=True)
+        return Response(serializer.data)
+
+    @conditional_get(partial(catalog_version, CATEGORIES))
+    def retrieve(self, request, *args, **kwargs):
+        node = self.get_subtree('pk', kwargs[self.lookup_url_kwarg or self.lookup_field])
+        serializer = self.get_serializer(node)
+        return Response(serializer.data)
 
 class BrandViewSet(viewsets.ModelViewSet):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
+    query_budget = {'list': 2, 'retrieve': 2}
 
-# class WishlistViewSet(viewsets.ModelViewSet):
-#     queryset = Wishlist.objects.all()
-#     serializer_class = WishlistSerializer
-
-#     def get_queryset(self):
-#         return Wishlist.objects.filter(user=self.kwargs['user_id'])
-
-
-
+    @conditional_get(partial(catalog_version, BRANDS))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
+    @conditional_get(partial(catalog_version, BRANDS))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+class WishlistViewSet(viewsets.GenericViewSet):
+    """Lista de deseos del usuario: los productos más recientes primero."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = WishlistItemSerializer
+    pagination_class = KeysetPagination
+    lookup_field = 'product_id'
+    lookup_value_regex = r'\d+'
+    query_budget = {'list': 6, 'create': 6, 'destroy': 3}
+
+    def get_queryset(self):
+        # Se pagina la tabla intermedia: su id da el orden en que se agregaron
+        return Wishlist.products.through.objects.filter(wishlist__user=self.request.user).select_related(
+            'product__category', 'product__brand',
+        ).prefetch_related(
+            Prefetch('product__large_pictures', queryset=ProductImage.objects.order_by('id'))
+        ).order_by('-id')
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        products = [entry.product for entry in page]
+        context = {**self.get_serializer_context(), 'wishlist_ids': frozenset(product.id for product in products)}
+        serializer = ProductListSerializer(products, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        add_to_wishlist(request.user, serializer.validated_data['product'])
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def destroy(self, request, *args, **kwargs):
+        if not remove_from_wishlist(request.user, kwargs['product_id']):
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,56 @@
+"""Exportación del catálogo: un registro por producto con su categoría (y ruta), marca e imágenes."""
+from django.db.models import Prefetch
+from apps.shop.models import Product, ProductImage
+from apps.shop.services import get_category_paths
+from common.exports import EXPORT_CHUNK_SIZE, iterate_chunks
+
+PRODUCT_EXPORT_COLUMNS = [
+    'id', 'name', 'slug', 'description', 'price', 'effective_price', 'discount', 'discount_end_date', 'stock',
+    'is_new', 'is_top', 'is_featured', 'ratings', 'reviews_count',
+    'category_id', 'category_name', 'category_slug', 'category_path',
+    'brand_id', 'brand_name', 'brand_slug', 'images', 'created_at', 'updated_at',
+]
+
+
+def product_export_queryset(queryset=None):
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.select_related('category', 'brand').prefetch_related(
+        Prefetch('large_pictures', queryset=ProductImage.objects.order_by('id'))
+    )
+
+
+def product_row(product, paths):
+    category, brand = product.category, product.brand
+    return {
+        'id': product.id,
+        'name': product.name,
+        'slug': product.slug,
+        'description': product.description,
+        'price': product.price,
+        'effective_price': product.effective_price,
+        'discount': product.discount,
+        'discount_end_date': product.discount_end_date,
+        'stock': product.stock,
+        'is_new': product.is_new,
+        'is_top': product.is_top,
+        'is_featured': product.is_featured,
+        'ratings': product.ratings,
+        'reviews_count': product.reviews_count,
+        'category': category and {
+            'id': category.id,
+            'name': category.name,
+            'slug': category.slug,
+            'path': [node['slug'] for node in paths.get(category.id, [])] + [category.slug],
+        },
+        'brand': brand and {'id': brand.id, 'name': brand.name, 'slug': brand.slug},
+        'images': [picture.url for picture in product.large_pictures.all()],
+        'created_at': product.created_at,
+        'updated_at': product.updated_at,
+    }
+
+
+def product_rows(queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Bloques de registros; las rutas de categoría se leen una vez para toda la exportación."""
+    paths = get_category_paths()
+    for products in iterate_chunks(product_export_queryset(queryset), chunk_size):
+        yield [product_row(product, paths) for product in products]
@@ -0,0 +1,84 @@
+import json
+import math
+import time
+from django.core.cache import cache
+from django.utils import timezone
+from apps.shop.api.v1.serializers import HomeSerializer, ProductListSerializer
+from apps.shop.models import Product
+from common.renderers import ORJSONRenderer
+
+HOME_RAILS_VERSION_KEY = 'shop:home-rails:version'
+HOME_RAILS_TIMEOUT = 60 * 15
+HOME_RAILS_MAX_LIMIT = 24
+
+# Campos de Product que se muestran en los rieles o deciden qué productos aparecen
+HOME_RAILS_FIELDS = (
+    'name', 'slug', 'price', 'discount', 'discount_end_date', 'is_new', 'is_top',
+    'is_featured', 'ratings', 'reviews_count', 'category_id', 'brand_id', 'created_at',
+)
+
+
+def home_rails_version():
+    version = cache.get(HOME_RAILS_VERSION_KEY)
+    if version is None:
+        # Arranca desde el reloj para no reutilizar versiones si la clave fue desalojada
+        cache.add(HOME_RAILS_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(HOME_RAILS_VERSION_KEY)
+    return version
+
+
+def invalidate_home_rails():
+    try:
+        cache.incr(HOME_RAILS_VERSION_KEY)
+    except ValueError:
+        cache.set(HOME_RAILS_VERSION_KEY, time.time_ns(), None)
+
+
+def best_selling(products, limit):
+    # Top-K por ventas de los últimos 7 días; se completa con los marcados como top
+    ranked = list(products.filter(sales_summary__sold_7d__gt=0).order_by('-sales_summary__sold_7d', 'id')[:limit])
+    if len(ranked) < limit:
+        ids = [product.id for product in ranked]
+        ranked += products.filter(is_top=True).exclude(id__in=ids).order_by('-discount', 'id')[:limit - len(ranked)]
+    return ranked
+
+
+def build_home_rails(limit):
+    """
+    Calcula los rieles del home. Devuelve el payload listo para servir y la
+    fecha del próximo descuento en vencer entre los productos mostrados.
+    """
+    now = timezone.now()
+    products = ProductListSerializer.setup_eager_loading(Product.objects.all())
+    rails = {
+        'best_selling': best_selling(products, limit),
+        'featured': products.filter(is_featured=True).order_by('-discount', 'id')[:limit],
+        'latest': products.order_by('-created_at', '-id')[:limit],
+        # Mismo criterio que check_discount y effective_price_expression: sin fecha de fin no hay descuento
+        'on_sale': products.filter(discount__gt=0, discount_end_date__gt=now).order_by('-discount', 'id')[:limit],
+    }
+    rails = {name: list(queryset) for name, queryset in rails.items()}
+    payload = json.loads(ORJSONRenderer().render(HomeSerializer(rails).data))
+    # Descuentos de otros productos no cambian el payload: al terminar expire_discounts invalida los rieles
+    expiries = [
+        product.discount_end_date
+        for products in rails.values() for product in products
+        if product.discount > 0 and product.discount_end_date and product.discount_end_date > now
+    ]
+    return payload, min(expiries, default=None)
+
+
+def get_home_rails(limit):
+    """{'payload': ..., 'built_at': ns} desde la caché; built_at sirve de sello para ETag."""
+    key = f'shop:home-rails:{home_rails_version()}:{limit}'
+    rails = cache.get(key)
+    if rails is None:
+        payload, expires_at = build_home_rails(limit)
+        rails = {'payload': payload, 'built_at': time.time_ns()}
+        timeout = HOME_RAILS_TIMEOUT
+        if expires_at is not None:
+            # Vence junto con el próximo descuento, así nunca se sirve un descuento expirado
+            remaining = (expires_at - timezone.now()).total_seconds()
+            timeout = max(1, min(timeout, math.ceil(remaining)))
+        cache.set(key, rails, timeout)
+    return rails
@@ -0,0 +1,224 @@
+"""
+Importador del catálogo desde CSV (separado por ';', columnas de data/products.csv).
+
+Lee el archivo por bloques con pandas, normaliza precios y slugs con
+operaciones vectorizadas y hace upsert por slug con bulk_create/bulk_update,
+así la memoria depende del tamaño del bloque y no del archivo. Las categorías
+nuevas se crean sin actualizar el árbol MPTT, que se reconstruye una vez al final.
+"""
+import time
+from decimal import Decimal
+from dataclasses import dataclass, field
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+from apps.orders.services import create_sales_summaries
+from apps.search.suggest import invalidate_suggestions
+from apps.shop import services
+from apps.shop.home import invalidate_home_rails
+from apps.shop.models import Brand, Category, Product, ProductImage
+from apps.shop.related import build_related_index
+from apps.shop.versions import BRANDS, CATEGORIES, PRODUCTS, touch_catalog
+
+CHUNK_SIZE = 5000
+BATCH_SIZE = 1000
+COLUMNS = {
+    'producto': 'name',
+    'precio': 'price',
+    'subcategoria': 'subcategory',
+    'categoria': 'category',
+    'imagen': 'image',
+    'marca': 'brand',
+}
+# Campos que el CSV define; el resto (stock, descuentos, banderas) se administra en la tienda
+IMPORTED_FIELDS = ('name', 'price', 'category_id', 'brand_id')
+
+
+@dataclass
+class ChunkResult:
+    rows: int = 0
+    created: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    unchanged: int = 0
+    skipped: int = 0
+    seconds: float = 0.0
+
+
+def slugify_series(names):
+    # Misma regla que populate_shop, para que el upsert encuentre los productos ya cargados
+    return names.str.lower().str.replace(' ', '-').str.replace('/', '-').str.replace('.', '')
+
+
+def normalize(chunk):
+    """
+    Renombra columnas, limpia textos, convierte '$ 4.190' en 4190 (redondeado a 50)
+    y arma slugs. Devuelve el bloque y cuántas filas se descartaron (inválidas o
+    con slug repetido en el bloque).
+    """
+    frame = chunk.rename(columns=COLUMNS)
+    for column in ('subcategory', 'image'):
+        if column not in frame:
+            frame[column] = None
+    for column in ('name', 'category', 'subcategory', 'image', 'brand'):
+        if column in frame:
+            frame[column] = frame[column].str.strip().replace({'': None})
+    # Sin subcategoría el producto queda en la categoría raíz
+    frame['subcategory'] = frame['subcategory'].fillna(frame['category'])
+    digits = frame['price'].str.replace(r'[^\d,]', '', regex=True).str.replace(',', '.')
+    frame['price'] = (pd.to_numeric(digits, errors='coerce') / 50).round() * 50
+    valid = frame['name'].notna() & frame['price'].notna() & frame['category'].notna()
+    frame = frame[valid].copy()
+    frame['slug'] = slugify_series(frame['name'])
+    frame['category_slug'] = slugify_series(frame['category'])
+    frame['subcategory_slug'] = slugify_series(frame['subcategory'])
+    # Dentro del archivo gana la última fila de cada slug, como entre bloques
+    unique = frame.drop_duplicates(subset='slug', keep='last')
+    return unique, int((~valid).sum()) + len(frame) - len(unique)
+
+
+class CatalogImporter:
+    def __init__(self, diff=False, chunk_size=CHUNK_SIZE):
+        self.diff = diff
+        self.chunk_size = chunk_size
+        self.categories = dict(Category.objects.values_list('slug', 'id'))
+        self.brands = dict(Brand.objects.values_list('slug', 'id'))
+        self.new_categories = False
+        self.created = False
+
+    def run(self, path):
+        """Procesa el archivo bloque a bloque y entrega un ChunkResult por bloque."""
+        try:
+            reader = pd.read_csv(path, sep=';', encoding='utf-8-sig', dtype=str, chunksize=self.chunk_size)
+            for chunk in reader:
+                start = time.perf_counter()
+                frame, skipped = normalize(chunk)
+                with transaction.atomic():
+                    result = self.import_chunk(frame)
+                result.rows, result.skipped = len(chunk), skipped
+                result.seconds = time.perf_counter() - start
+                yield result
+        finally:
+            self.finish()
+
+    def ensure_categories(self, frame):
+        pairs = frame[['category_slug', 'category', 'subcategory_slug', 'subcategory']].drop_duplicates()
+        roots = [
+            Category(name=name, slug=slug, lft=0, rght=0, tree_id=0, level=0)
+            for slug, name in pairs[['category_slug', 'category']].drop_duplicates('category_slug').itertuples(index=False)
+            if slug not in self.categories
+        ]
+        self._create_categories(roots)
+        children = [
+            Category(name=name, slug=slug, parent_id=self.categories[parent], lft=0, rght=0, tree_id=0, level=0)
+            for parent, _, slug, name in pairs.drop_duplicates('subcategory_slug').itertuples(index=False)
+            if slug not in self.categories
+        ]
+        self._create_categories(children)
+
+    def _create_categories(self, categories):
+        if not categories:
+            return
+        # bulk_create no toca lft/rght del resto del árbol: Category.objects.rebuild() al terminar
+        Category.objects.bulk_create(categories)
+        self.categories.update(
+            Category.objects.filter(slug__in=[category.slug for category in categories]).values_list('slug', 'id')
+        )
+        self.new_categories = True
+
+    def ensure_brands(self, frame):
+        if 'brand' not in frame:
+            return
+        names = frame['brand'].dropna().drop_duplicates()
+        missing = [
+            Brand(name=name, slug=slug)
+            for name, slug in zip(names, slugify_series(names))
+            if slug not in self.brands
+        ]
+        if missing:
+            Brand.objects.bulk_create(missing, ignore_conflicts=True)
+            self.brands.update(Brand.objects.filter(slug__in=[brand.slug for brand in missing]).values_list('slug', 'id'))
+
+    def import_chunk(self, frame):
+        result = ChunkResult()
+        self.ensure_categories(frame)
+        self.ensure_brands(frame)
+        has_brand = 'brand' in frame
+        frame['category_id'] = frame['subcategory_slug'].map(self.categories)
+        frame['brand_id'] = slugify_series(frame['brand']).map(self.brands) if has_brand else None
+
+        existing = {
+            product.slug: product
+            for product in Product.objects.filter(slug__in=frame['slug'].tolist()).only(
+                'id', 'slug', 'name', 'price', 'discount', 'discount_end_date', 'category_id', 'brand_id',
+            )
+        }
+        now = timezone.now()
+        created, updated, images = [], [], {}
+        for row in frame.itertuples(index=False):
+            values = {
+                'name': row.name,
+                'price': Decimal(f'{row.price:.2f}'),
+                'category_id': int(row.category_id),
+            }
+            if has_brand and pd.notna(row.brand_id):
+                values['brand_id'] = int(row.brand_id)
+            if isinstance(row.image, str):
+                images[row.slug] = row.image
+            product = existing.get(row.slug)
+            if product is None:
+                product = Product(slug=row.slug, description=f'Descripción de {row.name}', **values)
+                product.effective_price = product.price
+                created.append(product)
+                continue
+            if self.diff and all(getattr(product, name) == value for name, value in values.items()):
+                result.unchanged += 1
+                continue
+            for name, value in values.items():
+                setattr(product, name, value)
+            product.effective_price = product.compute_effective_price()
+            product.updated_at = now
+            updated.append(product)
+
+        Product.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        Product.objects.bulk_update(
+            updated, [*IMPORTED_FIELDS, 'effective_price', 'updated_at'], batch_size=BATCH_SIZE
+        )
+        # bulk_create no devuelve ids en MySQL
+        ids = dict(Product.objects.filter(slug__in=[product.slug for product in created]).values_list('slug', 'id'))
+        # Las imágenes se comparan también en productos sin cambios de datos
+        ids.update((slug, product.id) for slug, product in existing.items())
+        self.sync_images({ids[slug]: url for slug, url in images.items() if slug in ids})
+        result.created = [ids[product.slug] for product in created]
+        result.updated = [product.id for product in updated]
+        create_sales_summaries(result.created)
+        self.created = self.created or bool(created)
+        return result
+
+    def sync_images(self, urls):
+        """Primera imagen de cada producto: se crea si falta y se corrige si cambió la URL."""
+        current = {}
+        for image in ProductImage.objects.filter(product_id__in=urls).order_by('-id').only('id', 'product_id', 'url'):
+            current[image.product_id] = image
+        missing, changed = [], []
+        for product_id, url in urls.items():
+            image = current.get(product_id)
+            if image is None:
+                missing.append(ProductImage(product_id=product_id, url=url, width=600, height=600))
+            elif image.url != url:
+                image.url = url
+                changed.append(image)
+        ProductImage.objects.bulk_create(missing, batch_size=BATCH_SIZE)
+        ProductImage.objects.bulk_update(changed, ['url'], batch_size=BATCH_SIZE)
+
+    def finish(self):
+        # bulk_create/bulk_update no disparan señales: se hace una vez lo que harían por fila
+        if self.new_categories:
+            Category.objects.rebuild()
+        services.rebuild_product_counts()
+        services.invalidate_category_paths()
+        if self.created:
+            # Vecinos de los nuevos y el puntero next del último producto previo
+            build_related_index()
+        invalidate_home_rails()
+        invalidate_suggestions()
+        touch_catalog(PRODUCTS, CATEGORIES, BRANDS)
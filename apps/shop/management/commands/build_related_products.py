@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from apps.shop.related import build_related_index
+import time
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the co-purchase related products index and the previous/next neighbors"
+
+    def handle(self, *args, **kwargs):
+        start = time.monotonic()
+        pairs, products = build_related_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Related index built: {pairs} co-purchased pairs, {products} products in {time.monotonic() - start:.1f}s"
+        ))
+
+# python manage.py build_related_products
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from apps.shop.pricing import SWEEP_BATCH_SIZE, expire_discounts
+
+
+class Command(BaseCommand):
+    help = "Resets the effective price of products whose discount has ended (run every minute from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        expired = expire_discounts(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{expired} expired discounts swept"))
+
+# * * * * * python manage.py expire_discounts
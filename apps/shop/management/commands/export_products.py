@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from apps.shop.exports import PRODUCT_EXPORT_COLUMNS, product_rows
+from common.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_stream, write_export
+
+
+class Command(BaseCommand):
+    help = "Exports the catalog (category path, brand and images) as NDJSON or CSV, streaming it in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Destination file, or - for stdout")
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunks = export_stream(product_rows(chunk_size=options['chunk_size']), options['format'], PRODUCT_EXPORT_COLUMNS)
+        written = write_export(chunks, options['output'])
+        if options['output'] != '-':
+            self.stdout.write(self.style.SUCCESS(f"{written} bytes written to {options['output']}"))
+
+# python manage.py export_products products.csv --format csv
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.search.engine import index_products
+from apps.shop.importer import CHUNK_SIZE, CatalogImporter
+
+
+class Command(BaseCommand):
+    help = "Imports (upserts by slug) products from a CSV file in chunks, without clearing the shop"
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', type=str, help='Path to the CSV file with product data')
+        parser.add_argument('--diff', action='store_true', help='Only write rows whose data changed')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        importer = CatalogImporter(diff=options['diff'], chunk_size=options['chunk_size'])
+        totals = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'seconds': 0.0}
+        try:
+            for result in importer.run(options['csv_file']):
+                # El índice de búsqueda se actualiza por señales en save(); bulk no las dispara
+                index_products(result.created + result.updated)
+                for key in ('rows', 'unchanged', 'skipped', 'seconds'):
+                    totals[key] += getattr(result, key)
+                totals['created'] += len(result.created)
+                totals['updated'] += len(result.updated)
+                self.stdout.write(
+                    f"{totals['rows']} rows: +{len(result.created)} created, {len(result.updated)} updated, "
+                    f"{result.unchanged} unchanged ({result.rows / max(result.seconds, 1e-6):.0f} rows/s)"
+                )
+        except FileNotFoundError:
+            raise CommandError(f"File not found: {options['csv_file']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['rows']} rows in {totals['seconds']:.1f}s "
+            f"({totals['rows'] / max(totals['seconds'], 1e-6):.0f} rows/s): "
+            f"{totals['created']} created, {totals['updated']} updated, "
+            f"{totals['unchanged']} unchanged, {totals['skipped']} skipped"
+        ))
+
+# python manage.py import_products data/products.csv --diff
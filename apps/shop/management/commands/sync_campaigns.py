@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from apps.shop.pricing import sync_campaigns
+
+
+class Command(BaseCommand):
+    help = "Applies pricing campaigns whose window started and reverts those that ended (run every minute from cron)"
+
+    def handle(self, *args, **options):
+        applied, reverted = sync_campaigns()
+        self.stdout.write(self.style.SUCCESS(f"{applied} campaigns applied, {reverted} reverted"))
+
+# * * * * * python manage.py sync_campaigns
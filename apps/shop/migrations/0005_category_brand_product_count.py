@@ -0,0 +1,51 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:24
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_product_counts(apps, schema_editor):
+    Category = apps.get_model('shop', 'Category')
+    Brand = apps.get_model('shop', 'Brand')
+    Product = apps.get_model('shop', 'Product')
+
+    direct = dict(
+        Product.objects.filter(category__isnull=False)
+        .values_list('category_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    categories = list(Category.objects.order_by('tree_id', 'lft'))
+    totals = {category.id: direct.get(category.id, 0) for category in categories}
+    for category in reversed(categories):
+        if category.parent_id is not None:
+            totals[category.parent_id] += totals[category.id]
+    for category in categories:
+        category.product_count = totals[category.id]
+    Category.objects.bulk_update(categories, ['product_count'], batch_size=500)
+
+    brands = list(Brand.objects.annotate(total=Count('products')))
+    for brand in brands:
+        brand.product_count = brand.total
+    Brand.objects.bulk_update(brands, ['product_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_rename_until_discount_product_discount_end_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brand',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_product_counts, migrations.RunPython.noop),
+    ]
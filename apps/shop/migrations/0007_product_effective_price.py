@@ -0,0 +1,39 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:31
+
+from django.db import migrations, models
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Ceil
+from django.utils import timezone
+
+
+def populate_effective_price(apps, schema_editor):
+    Product = apps.get_model('shop', 'Product')
+    Product.objects.update(effective_price=Case(
+        When(
+            discount__gt=0,
+            discount_end_date__gt=timezone.now(),
+            then=Ceil(F('price') * (100 - F('discount')) / Value(5000.0)) * 50,
+        ),
+        default=F('price'),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0006_related_products_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(populate_effective_price, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['effective_price', 'id'], name='product_effective_price_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:30
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_product_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('discount', models.IntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(100)])),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('S', 'Programada'), ('A', 'Activa'), ('E', 'Finalizada')], default='S', editable=False, max_length=1)),
+                ('applied_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('brand', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shop.brand')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shop.category')),
+                ('products', models.ManyToManyField(blank=True, related_name='+', to='shop.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CampaignProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_discount', models.IntegerField()),
+                ('previous_discount_end_date', models.DateTimeField(null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='campaign_entries', to='shop.product')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='shop.pricingcampaign')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='pricingcampaign',
+            index=models.Index(fields=['status', 'starts_at'], name='shop_pricin_status_3cded9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pricingcampaign',
+            index=models.Index(fields=['status', 'ends_at'], name='shop_pricin_status_581382_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='campaignproduct',
+            constraint=models.UniqueConstraint(fields=('campaign', 'product'), name='unique_campaign_product'),
+        ),
+    ]
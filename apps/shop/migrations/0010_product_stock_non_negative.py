@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+def clamp_negative_stock(apps, schema_editor):
+    # Filas que quedaron en negativo por la carrera del descuento anterior
+    Product = apps.get_model('shop', 'Product')
+    Product.objects.filter(stock__lt=0).update(stock=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0009_pricing_campaign'),
+    ]
+
+    operations = [
+        migrations.RunPython(clamp_negative_stock, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(check=models.Q(('stock__gte', 0)), name='product_stock_non_negative'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0010_product_stock_non_negative'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['discount_end_date'], name='product_discount_end_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import Ceil
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User
 from mptt.models import MPTTModel, TreeForeignKey
@@ -11,17 +13,27 @@ class Category(MPTTModel):
     slug = models.SlugField(unique=True)
     image = models.URLField(max_length=1024, blank=True)
     parent = TreeForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
+    # Productos de toda la subcategoría (nodo + descendientes), mantenido por apps.shop.signals
+    product_count = models.PositiveIntegerField(default=0, editable=False)
 
     class MPTTMeta:
         order_insertion_by = ['name']
         verbose_name_plural = 'categories'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Como en Product: las señales solo recalculan conteos si cambió el padre
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return self.name
 
 class Brand(models.Model):
     name = models.CharField(max_length=255)
     slug = models.SlugField(unique=True)
+    product_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
@@ -41,22 +53,53 @@ class Product(models.Model):
     reviews_count = models.IntegerField(default=0)
     category = models.ForeignKey(Category, related_name='products', on_delete=models.SET_NULL, null=True)
     brand = models.ForeignKey(Brand, on_delete=models.SET_NULL, null=True, related_name='products')
+    # Precio que ve el cliente (con descuento vigente, redondeado a 50). Se recalcula en save()
+    # y las expiraciones se barren con `manage.py expire_discounts`
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['effective_price', 'id'], name='product_effective_price_idx'),
+            models.Index(fields=['created_at', 'id'], name='product_created_idx'),
+            models.Index(fields=['discount_end_date'], name='product_discount_end_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=models.Q(stock__gte=0), name='product_stock_non_negative'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores cargados de la base de datos, usados por las señales para detectar cambios
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def decrease_stock(self, quantity):
-        if self.stock < quantity:
+        # UPDATE condicional: el stock leído antes puede estar viejo (ver apps.shop.stock)
+        if not Product.objects.filter(pk=self.pk, stock__gte=quantity).update(stock=F('stock') - quantity):
             raise ValidationError(f"Stock insuficiente para el producto {self.name}")
-        self.stock -= quantity
-        self.save()
+        self.refresh_from_db(fields=['stock'])
 
-    def get_display_price(self):
+    def compute_effective_price(self):
         if self.check_discount():
             discounted_price = self.price - (self.price * self.discount / 100)
-            rounded_discounted_price = math.ceil(discounted_price / 50) * 50
-            return [rounded_discounted_price, self.price]
+            return math.ceil(discounted_price / 50) * 50
+        return self.price
+
+    def get_display_price(self):
+        if self.check_discount():
+            return [self.effective_price, self.price]
         return [self.price, self.price]
 
+    def save(self, *args, **kwargs):
+        self.effective_price = self.compute_effective_price()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'price', 'discount', 'discount_end_date'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'effective_price'}
+        super().save(*args, **kwargs)
+
     def check_discount(self):
         if self.discount > 0 and self.discount_end_date:
             return self.discount_end_date > timezone.now()
@@ -65,6 +108,48 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+def discounted_price_expression(discount=F('discount')):
+    """Precio con `discount` % redondeado hacia arriba a 50, como compute_effective_price."""
+    return ExpressionWrapper(
+        Ceil(F('price') * (100 - discount) / Value(5000.0)) * 50,
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+def effective_price_expression(now=None):
+    """Equivalente SQL de Product.compute_effective_price, para UPDATEs por conjunto."""
+    now = now or timezone.now()
+    return Case(
+        When(
+            discount__gt=0,
+            discount_end_date__gt=now,
+            then=discounted_price_expression(),
+        ),
+        default=F('price'),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+def lapsed_discount_q(now=None):
+    """Descuentos vencidos: su effective_price sigue rebajado hasta que expire_discounts los barre."""
+    return Q(discount__gt=0, discount_end_date__lte=now or timezone.now())
+
+def current_price_expression(now=None):
+    """Precio que ve el cliente desde las columnas guardadas, sin esperar al barrido."""
+    return Case(
+        When(lapsed_discount_q(now), then=F('price')),
+        default=F('effective_price'),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+def next_discount_expiry(now=None):
+    """Fecha del próximo descuento vigente en vencer, o None si no hay ninguno."""
+    now = now or timezone.now()
+    return (
+        Product.objects.filter(discount__gt=0, discount_end_date__gt=now)
+        .order_by('discount_end_date')
+        .values_list('discount_end_date', flat=True)
+        .first()
+    )
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='large_pictures')
     url = models.URLField(max_length=1024)
@@ -81,3 +166,89 @@ class Wishlist(models.Model):
 
     def __str__(self):
         return f"Wishlist of {self.user.username}"
+
+class CoPurchase(models.Model):
+    # Número de pedidos en los que `product` y `other` se compraron juntos (ver apps.shop.related)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    orders_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'other'], name='unique_co_purchase'),
+        ]
+        indexes = [
+            models.Index(fields=['product', '-orders_count']),
+        ]
+
+class ProductNeighbors(models.Model):
+    # Anterior/siguiente y relacionados precalculados para el detalle del producto
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='neighbors')
+    previous = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='+')
+    next = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='+')
+    related_ids = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class PricingCampaign(models.Model):
+    """
+    Descuento por ventana de tiempo sobre un subárbol de categorías, una marca o
+    un conjunto de productos. Se aplica y se revierte con UPDATEs por conjunto
+    (ver apps.shop.pricing.sync_campaigns).
+    """
+    class Status(models.TextChoices):
+        SCHEDULED = 'S', 'Programada'
+        ACTIVE = 'A', 'Activa'
+        ENDED = 'E', 'Finalizada'
+
+    name = models.CharField(max_length=255)
+    discount = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(100)])
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    # Un solo destino: la categoría incluye todo su subárbol
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    brand = models.ForeignKey(Brand, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    products = models.ManyToManyField(Product, blank=True, related_name='+')
+    status = models.CharField(max_length=1, choices=Status.choices, default=Status.SCHEDULED, editable=False)
+    applied_count = models.PositiveIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'starts_at']),
+            models.Index(fields=['status', 'ends_at']),
+        ]
+
+    def clean(self):
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError({'ends_at': 'Debe ser posterior al inicio.'})
+        if self.category_id and self.brand_id:
+            raise ValidationError('Elegir una categoría o una marca, no ambas (o ninguna, con productos).')
+
+    def target_products(self):
+        """Productos alcanzados, como consulta sin joins sobre shop_product."""
+        if self.category_id is not None:
+            category = self.category
+            subtree = Category.objects.filter(
+                tree_id=category.tree_id, lft__gte=category.lft, rght__lte=category.rght,
+            ).values('id')
+            return Product.objects.filter(category_id__in=subtree)
+        if self.brand_id is not None:
+            return Product.objects.filter(brand_id=self.brand_id)
+        return Product.objects.filter(id__in=self.products.through.objects.filter(
+            pricingcampaign_id=self.pk).values('product_id'))
+
+    def __str__(self):
+        return self.name
+
+class CampaignProduct(models.Model):
+    # Productos que tomó la campaña y su descuento anterior, para revertir por conjunto
+    campaign = models.ForeignKey(PricingCampaign, on_delete=models.CASCADE, related_name='entries')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='campaign_entries')
+    previous_discount = models.IntegerField()
+    previous_discount_end_date = models.DateTimeField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'product'], name='unique_campaign_product'),
+        ]
+
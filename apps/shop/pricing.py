@@ -0,0 +1,172 @@
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+from apps.shop.home import invalidate_home_rails
+from apps.shop.models import (
+    CampaignProduct, PricingCampaign, Product, discounted_price_expression, effective_price_expression,
+    next_discount_expiry,
+)
+from apps.shop.versions import PRODUCTS, catalog_version, touch_catalog
+
+SWEEP_BATCH_SIZE = 1000
+DISCOUNT_EXPIRY_CACHE_KEY = 'shop:discounts:next-expiry'
+LAPSED_DISCOUNTS_CACHE_KEY = 'shop:discounts:lapsed'
+
+
+def products_version():
+    """
+    Sello de PRODUCTS para los GET condicionales que además cambia cuando vence
+    un descuento, aunque expire_discounts todavía no lo haya barrido. El próximo
+    vencimiento se consulta una vez por sello, a partir del último instante revisado.
+    """
+    stamp = catalog_version(PRODUCTS)
+    state = cache.get(DISCOUNT_EXPIRY_CACHE_KEY)
+    if state is None or state['stamp'] != stamp:
+        checked = state['checked'] if state else timezone.now()
+        state = {'stamp': stamp, 'checked': checked, 'next': next_discount_expiry(checked)}
+        cache.set(DISCOUNT_EXPIRY_CACHE_KEY, state, None)
+    now = timezone.now()
+    if state['next'] is not None and state['next'] <= now:
+        # Su effective_price queda rebajado hasta el próximo barrido (ver discounts_pending_sweep)
+        cache.set(LAPSED_DISCOUNTS_CACHE_KEY, True, None)
+        cache.set(DISCOUNT_EXPIRY_CACHE_KEY, {**state, 'checked': now}, None)
+        touch_catalog(PRODUCTS)
+        return products_version()
+    return stamp
+
+
+def discounts_pending_sweep():
+    """True si venció algún descuento después del último barrido de expire_discounts."""
+    return cache.get(LAPSED_DISCOUNTS_CACHE_KEY, False)
+
+
+def expire_discounts(batch_size=SWEEP_BATCH_SIZE):
+    """
+    Devuelve al precio base los productos cuyo descuento ya venció, en lotes
+    por id para no bloquear la tabla completa.
+    """
+    # Antes de fijar `now`: lo que venza después vuelve a marcarse en products_version
+    cache.delete(LAPSED_DISCOUNTS_CACHE_KEY)
+    now = timezone.now()
+    expired = Product.objects.filter(discount_end_date__lte=now).exclude(effective_price=F('price'))
+    total = 0
+    while True:
+        ids = list(expired.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        total += Product.objects.filter(id__in=ids).update(effective_price=F('price'), updated_at=now)
+    if total:
+        invalidate_home_rails()
+        touch_catalog(PRODUCTS)
+    return total
+
+
+def _claim_products(campaign, now):
+    """
+    INSERT ... SELECT de los productos del destino con su descuento actual. Se
+    saltan los que ya están en otra campaña activa y los que tienen un descuento
+    vigente igual o mayor: gana siempre el mejor precio para el cliente.
+    """
+    claimed = CampaignProduct.objects.filter(campaign__status=PricingCampaign.Status.ACTIVE).values('product_id')
+    candidates = (
+        campaign.target_products()
+        .exclude(id__in=claimed)
+        .exclude(discount__gte=campaign.discount, discount_end_date__gt=now)
+        .order_by()
+        .values_list('id', 'discount', 'discount_end_date')
+    )
+    select, params = candidates.query.sql_with_params()
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(CampaignProduct._meta.get_field(name).column) for name in (
+        'campaign', 'product', 'previous_discount', 'previous_discount_end_date',
+    ))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(CampaignProduct._meta.db_table)} ({columns}) SELECT %s, candidates.* FROM ({select}) candidates',
+            [campaign.pk, *params],
+        )
+
+
+def apply_campaign(campaign, now=None):
+    """Pone el descuento de la campaña a todo su destino con dos sentencias; devuelve los productos alcanzados."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        # Cambio de estado condicional: dos barridos simultáneos no aplican la misma campaña
+        if not PricingCampaign.objects.filter(pk=campaign.pk, status=PricingCampaign.Status.SCHEDULED).update(
+            status=PricingCampaign.Status.ACTIVE
+        ):
+            return 0
+        _claim_products(campaign, now)
+        entries = CampaignProduct.objects.filter(campaign=campaign).values('product_id')
+        # El precio se calcula con el descuento literal: MySQL evalúa el SET de izquierda a derecha
+        count = Product.objects.filter(id__in=entries).update(
+            discount=campaign.discount,
+            discount_end_date=campaign.ends_at,
+            effective_price=discounted_price_expression(campaign.discount),
+            updated_at=now,
+        )
+        PricingCampaign.objects.filter(pk=campaign.pk).update(applied_count=count)
+    campaign.status, campaign.applied_count = PricingCampaign.Status.ACTIVE, count
+    if count:
+        invalidate_home_rails()
+        touch_catalog(PRODUCTS)
+    return count
+
+
+def revert_campaign(campaign, now=None):
+    """
+    Devuelve a cada producto el descuento que tenía antes de la campaña. Los que
+    se editaron a mano mientras duraba (otro descuento o vencimiento) se dejan igual.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        if not PricingCampaign.objects.filter(pk=campaign.pk, status=PricingCampaign.Status.ACTIVE).update(
+            status=PricingCampaign.Status.ENDED
+        ):
+            return 0
+        entries = CampaignProduct.objects.filter(campaign=campaign)
+        previous = entries.filter(product_id=OuterRef('pk'))
+        count = Product.objects.filter(
+            id__in=entries.values('product_id'), discount=campaign.discount, discount_end_date=campaign.ends_at,
+        ).update(
+            discount=Subquery(previous.values('previous_discount')[:1]),
+            discount_end_date=Subquery(previous.values('previous_discount_end_date')[:1]),
+            updated_at=now,
+        )
+        # Segunda sentencia: el precio se recalcula sobre el descuento ya restaurado
+        Product.objects.filter(id__in=entries.values('product_id')).update(
+            effective_price=effective_price_expression(now),
+        )
+    campaign.status = PricingCampaign.Status.ENDED
+    if count:
+        invalidate_home_rails()
+        touch_catalog(PRODUCTS)
+    return count
+
+
+def sync_campaigns(now=None):
+    """
+    Aplica o revierte las campañas cuya ventana empezó o terminó. Primero
+    termina las vencidas, así una campaña que empieza justo cuando otra termina
+    puede tomar sus productos. Devuelve (aplicadas, revertidas).
+    """
+    now = now or timezone.now()
+    ended = PricingCampaign.objects.filter(status=PricingCampaign.Status.ACTIVE, ends_at__lte=now).order_by('ends_at', 'id')
+    reverted = 0
+    for campaign in ended:
+        revert_campaign(campaign, now)
+        reverted += 1
+    # Programadas cuya ventana ya pasó entera (p. ej. el barrido no corrió): no se aplican
+    PricingCampaign.objects.filter(status=PricingCampaign.Status.SCHEDULED, ends_at__lte=now).update(
+        status=PricingCampaign.Status.ENDED
+    )
+    started = PricingCampaign.objects.filter(status=PricingCampaign.Status.SCHEDULED, starts_at__lte=now).order_by(
+        'starts_at', 'id'
+    )
+    applied = 0
+    for campaign in started:
+        apply_campaign(campaign, now)
+        applied += 1
+    return applied, reverted
+
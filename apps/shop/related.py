@@ -0,0 +1,149 @@
+from collections import Counter, defaultdict
+from itertools import combinations
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from common.helpers import bulk_increment
+from apps.orders.models import OrderItem
+from apps.shop.models import CoPurchase, Product, ProductNeighbors
+from apps.shop.versions import PRODUCTS, touch_catalog
+
+RELATED_LIMIT = 4
+BATCH_SIZE = 1000
+
+
+def _by_sales(queryset):
+    return queryset.order_by(F('sales_summary__sold_30d').desc(nulls_last=True), 'id')
+
+
+def compute_related(product_id, category_id, limit=RELATED_LIMIT):
+    """Comprados juntos primero; se completa con los más vendidos de la misma categoría."""
+    related = list(
+        CoPurchase.objects.filter(product_id=product_id)
+        .order_by('-orders_count', 'other_id')
+        .values_list('other_id', flat=True)[:limit]
+    )
+    if len(related) < limit and category_id is not None:
+        fallback = _by_sales(Product.objects.filter(category_id=category_id)).exclude(id__in=related + [product_id])
+        related += fallback.values_list('id', flat=True)[:limit - len(related)]
+    return related
+
+
+def compute_neighbors(product):
+    """Fila de vecinos del producto, sin guardarla."""
+    return ProductNeighbors(
+        product_id=product.id,
+        previous_id=Product.objects.filter(id__lt=product.id).order_by('-id').values_list('id', flat=True).first(),
+        next_id=Product.objects.filter(id__gt=product.id).order_by('id').values_list('id', flat=True).first(),
+        related_ids=compute_related(product.id, product.category_id),
+    )
+
+
+def refresh_neighbors(product_ids):
+    """Recalcula la fila de vecinos de los productos indicados."""
+    rows = [compute_neighbors(product) for product in Product.objects.filter(id__in=product_ids).only('id', 'category_id')]
+    ProductNeighbors.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=['previous', 'next', 'related_ids', 'updated_at'],
+    )
+    return rows
+
+
+def get_neighbors(product):
+    neighbors = ProductNeighbors.objects.filter(product_id=product.id).first()
+    if neighbors is None:
+        # Producto creado después del último build: se calcula sin escribir desde un GET
+        neighbors = compute_neighbors(product)
+    return neighbors
+
+
+def record_co_purchases(product_ids):
+    """Suma un pedido a cada par de productos comprados juntos y refresca sus relacionados."""
+    product_ids = sorted(set(product_ids))
+    if len(product_ids) < 2:
+        return
+    pairs = [
+        (pair, {'orders_count': 1})
+        for product_id, other_id in combinations(product_ids, 2)
+        for pair in ((product_id, other_id), (other_id, product_id))
+    ]
+    bulk_increment(CoPurchase, ('product_id', 'other_id'), pairs)
+    now = timezone.now()
+    rows = list(ProductNeighbors.objects.filter(product_id__in=product_ids).select_related('product'))
+    for neighbors in rows:
+        neighbors.related_ids = compute_related(neighbors.product_id, neighbors.product.category_id)
+        neighbors.updated_at = now
+    ProductNeighbors.objects.bulk_update(rows, ['related_ids', 'updated_at'])
+
+
+def link_new_product(product):
+    previous_id = Product.objects.filter(id__lt=product.id).order_by('-id').values_list('id', flat=True).first()
+    ProductNeighbors.objects.filter(product_id=previous_id).update(next_id=product.id)
+    refresh_neighbors([product.id])
+
+
+def unlink_product(product_id):
+    neighbors = ProductNeighbors.objects.filter(product_id=product_id).first()
+    if neighbors is None:
+        return
+    ProductNeighbors.objects.filter(product_id=neighbors.previous_id).update(next_id=neighbors.next_id)
+    ProductNeighbors.objects.filter(product_id=neighbors.next_id).update(previous_id=neighbors.previous_id)
+
+
+def build_related_index(limit=RELATED_LIMIT):
+    """Reconstruye desde cero los pares comprados juntos y la tabla de vecinos."""
+    pairs = Counter()
+    current_order, basket = None, set()
+    items = OrderItem.objects.order_by('order_id').values_list('order_id', 'product_id')
+    for order_id, product_id in items.iterator(chunk_size=5000):
+        if order_id != current_order:
+            pairs.update(combinations(sorted(basket), 2))
+            current_order, basket = order_id, set()
+        basket.add(product_id)
+    pairs.update(combinations(sorted(basket), 2))
+
+    bought_with = defaultdict(list)
+    for (product_id, other_id), count in pairs.items():
+        bought_with[product_id].append((-count, other_id))
+        bought_with[other_id].append((-count, product_id))
+
+    products = list(_by_sales(Product.objects.all()).values_list('id', 'category_id'))
+    by_category = defaultdict(list)
+    for product_id, category_id in products:
+        if len(by_category[category_id]) <= limit:
+            by_category[category_id].append(product_id)
+    ordered_ids = sorted(product_id for product_id, _ in products)
+    position = {product_id: index for index, product_id in enumerate(ordered_ids)}
+
+    rows = []
+    for product_id, category_id in products:
+        related = [other_id for _, other_id in sorted(bought_with.get(product_id, []))[:limit]]
+        if category_id is not None:
+            for other_id in by_category[category_id]:
+                if len(related) >= limit:
+                    break
+                if other_id != product_id and other_id not in related:
+                    related.append(other_id)
+        index = position[product_id]
+        rows.append(ProductNeighbors(
+            product_id=product_id,
+            previous_id=ordered_ids[index - 1] if index > 0 else None,
+            next_id=ordered_ids[index + 1] if index + 1 < len(ordered_ids) else None,
+            related_ids=related,
+        ))
+
+    co_purchases = (
+        CoPurchase(product_id=a, other_id=b, orders_count=count)
+        for (product_id, other_id), count in pairs.items()
+        for a, b in ((product_id, other_id), (other_id, product_id))
+    )
+    with transaction.atomic():
+        CoPurchase.objects.all().delete()
+        CoPurchase.objects.bulk_create(co_purchases, batch_size=BATCH_SIZE)
+        ProductNeighbors.objects.all().delete()
+        ProductNeighbors.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    # Cambian vecinos y relacionados del detalle de producto
+    touch_catalog(PRODUCTS)
+    return len(pairs), len(rows)
@@ -0,0 +1,114 @@
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Subquery
+from django.db.models.functions import Greatest
+from apps.shop.models import Brand, Category, Product
+from apps.shop.versions import BRANDS, CATEGORIES, touch_catalog
+
+
+def adjust_category_count(category_id, delta):
+    """Suma `delta` al conteo de la categoría y de todos sus ancestros."""
+    node = Category.objects.filter(pk=category_id).values('tree_id', 'lft', 'rght').first()
+    if node is None:
+        return
+    Category.objects.filter(
+        tree_id=node['tree_id'], lft__lte=node['lft'], rght__gte=node['rght']
+    ).update(product_count=Greatest(F('product_count') + delta, 0))
+    touch_catalog(CATEGORIES)
+
+
+def adjust_brand_count(brand_id, delta):
+    # Acotado en 0: un conteo desfasado no debe romper el UPDATE (columna sin signo)
+    Brand.objects.filter(pk=brand_id).update(product_count=Greatest(F('product_count') + delta, 0))
+    touch_catalog(BRANDS)
+
+
+def rebuild_product_counts():
+    """Recalcula todos los conteos desde cero (cargas masivas, movimientos de árbol)."""
+    direct = dict(
+        Product.objects.filter(category__isnull=False)
+        .values_list('category_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    categories = list(Category.objects.order_by('tree_id', 'lft').only('id', 'parent_id', 'product_count'))
+    totals = {category.id: direct.get(category.id, 0) for category in categories}
+    # Los hijos siempre aparecen después del padre en orden (tree_id, lft)
+    for category in reversed(categories):
+        if category.parent_id is not None:
+            totals[category.parent_id] += totals[category.id]
+    changed = []
+    for category in categories:
+        if category.product_count != totals[category.id]:
+            category.product_count = totals[category.id]
+            changed.append(category)
+    Category.objects.bulk_update(changed, ['product_count'], batch_size=500)
+
+    brands = Brand.objects.annotate(total=Count('products')).only('id', 'product_count')
+    changed = []
+    for brand in brands:
+        if brand.product_count != brand.total:
+            brand.product_count = brand.total
+            changed.append(brand)
+    Brand.objects.bulk_update(changed, ['product_count'], batch_size=500)
+    touch_catalog(CATEGORIES, BRANDS)
+
+
+def build_category_tree(categories):
+    """
+    Arma el árbol en memoria a partir de nodos ordenados por (tree_id, lft).
+    Cada nodo recibe `_children` y `_ancestors`; devuelve los nodos sin padre
+    dentro del conjunto cargado.
+    """
+    nodes = {}
+    roots = []
+    for category in categories:
+        category._children = []
+        parent = nodes.get(category.parent_id)
+        if parent is None:
+            category._ancestors = []
+            roots.append(category)
+        else:
+            category._ancestors = parent._ancestors + [parent]
+            parent._children.append(category)
+        nodes[category.id] = category
+    return roots
+
+
+def category_subtree_queryset(depth=None, **lookup):
+    """
+    Subárbol de la categoría indicada por `lookup` junto con sus ancestros,
+    en una sola consulta ordenada por (tree_id, lft).
+    """
+    node = Category.objects.filter(**lookup)
+    lft, rght = Subquery(node.values('lft')), Subquery(node.values('rght'))
+    queryset = Category.objects.filter(tree_id=Subquery(node.values('tree_id'))).filter(
+        Q(lft__gte=lft, rght__lte=rght) | Q(lft__lt=lft, rght__gt=rght)
+    )
+    if depth is not None:
+        queryset = queryset.filter(level__lte=Subquery(node.values('level')) + depth)
+    return queryset.order_by('tree_id', 'lft')
+
+
+
+CATEGORY_PATHS_CACHE_KEY = 'shop:category-paths'
+CATEGORY_PATHS_TIMEOUT = 60 * 10
+
+
+def get_category_paths():
+    """Ancestros (raíz primero) de cada categoría, indexados por id de categoría."""
+    paths = cache.get(CATEGORY_PATHS_CACHE_KEY)
+    if paths is None:
+        paths = {}
+        refs = {}
+        for category in Category.objects.order_by('tree_id', 'lft').only('id', 'parent_id', 'name', 'slug'):
+            if category.parent_id in refs:
+                paths[category.id] = paths[category.parent_id] + [refs[category.parent_id]]
+            else:
+                paths[category.id] = []
+            refs[category.id] = {'id': category.id, 'slug': category.slug, 'name': category.name}
+        cache.set(CATEGORY_PATHS_CACHE_KEY, paths, CATEGORY_PATHS_TIMEOUT)
+    return paths
+
+
+def invalidate_category_paths():
+    cache.delete(CATEGORY_PATHS_CACHE_KEY)
@@ -0,0 +1,132 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.db.models import DEFERRED
+from apps.shop.models import Brand, Category, Product, ProductImage, Wishlist
+from apps.shop import related, services
+from apps.shop.home import HOME_RAILS_FIELDS, invalidate_home_rails
+from apps.shop.versions import BRANDS, CATEGORIES, PRODUCTS, touch_catalog
+from apps.shop.wishlist import invalidate_wishlist
+
+
+def _attnames(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _remember_loaded_values(instance):
+    instance._loaded_values = {name: getattr(instance, name) for name in _attnames(Product)}
+
+
+def _changed_fields(instance, previous):
+    changed = set()
+    for name in _attnames(Product):
+        old = previous.get(name, DEFERRED)
+        if old is DEFERRED or old != getattr(instance, name):
+            changed.add(name)
+    return changed
+
+
+@receiver(pre_save, sender=Product)
+def load_previous_values(sender, instance, raw=False, **kwargs):
+    # Instancias que no vienen de from_db (p. ej. construidas con pk) o cargadas con
+    # campos diferidos no traen todos sus valores previos
+    loaded = getattr(instance, '_loaded_values', None)
+    if raw or instance._state.adding or (loaded is not None and DEFERRED not in loaded.values()):
+        return
+    previous = Product.objects.filter(pk=instance.pk).values(*_attnames(Product)).first()
+    instance._loaded_values = previous or {}
+
+
+@receiver(post_save, sender=Product)
+def sync_product_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = {} if created else getattr(instance, '_loaded_values', {})
+    changed = _changed_fields(instance, previous)
+    touch_catalog(PRODUCTS)
+    if created or changed.intersection(HOME_RAILS_FIELDS):
+        invalidate_home_rails()
+    if created:
+        related.link_new_product(instance)
+
+    old_category, old_brand = previous.get('category_id'), previous.get('brand_id')
+    if old_category != instance.category_id:
+        if old_category is not None:
+            services.adjust_category_count(old_category, -1)
+        if instance.category_id is not None:
+            services.adjust_category_count(instance.category_id, 1)
+    if old_brand != instance.brand_id:
+        if old_brand is not None:
+            services.adjust_brand_count(old_brand, -1)
+        if instance.brand_id is not None:
+            services.adjust_brand_count(instance.brand_id, 1)
+    _remember_loaded_values(instance)
+
+
+@receiver(pre_delete, sender=Product)
+def unlink_product_neighbors(sender, instance, **kwargs):
+    related.unlink_product(instance.id)
+
+
+@receiver(post_delete, sender=Product)
+def sync_product_on_delete(sender, instance, **kwargs):
+    invalidate_home_rails()
+    touch_catalog(PRODUCTS)
+    if instance.category_id is not None:
+        services.adjust_category_count(instance.category_id, -1)
+    if instance.brand_id is not None:
+        services.adjust_brand_count(instance.brand_id, -1)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def sync_category_tree(sender, instance, raw=False, created=False, **kwargs):
+    services.invalidate_category_paths()
+    transaction.on_commit(services.invalidate_category_paths)
+    invalidate_home_rails()
+    # Las rutas de categoría van en cada producto del listado
+    touch_catalog(PRODUCTS, CATEGORIES)
+    # Una categoría nueva no tiene productos y renombrarla no cambia los acumulados:
+    # solo mover (save() o move_to(), que también guarda) o borrar nodos obliga a recalcular
+    if raw or created:
+        return
+    loaded = getattr(instance, '_loaded_values', None)
+    moved = loaded is None or loaded.get('parent_id', DEFERRED) != instance.parent_id
+    if kwargs['signal'] is post_delete or moved:
+        transaction.on_commit(services.rebuild_product_counts)
+    if loaded is not None:
+        loaded['parent_id'] = instance.parent_id
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def sync_home_rails(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_home_rails()
+        touch_catalog(PRODUCTS)
+        if sender is Brand:
+            touch_catalog(BRANDS)
+
+
+@receiver(m2m_changed, sender=Wishlist.products.through)
+def sync_wishlist_products(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate_wishlist(instance.user_id)
+        return
+    # Desde el producto (product.wishlists...): los dueños de las listas afectadas
+    if action == 'pre_clear':
+        wishlists = instance.wishlists.all()
+    elif action in ('post_add', 'post_remove'):
+        wishlists = Wishlist.objects.filter(pk__in=pk_set)
+    else:
+        return
+    for user_id in wishlists.values_list('user_id', flat=True).distinct():
+        invalidate_wishlist(user_id)
+
+
+@receiver(post_delete, sender=Wishlist)
+def sync_wishlist_on_delete(sender, instance, **kwargs):
+    invalidate_wishlist(instance.user_id)
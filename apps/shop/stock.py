@@ -0,0 +1,77 @@
+"""
+Descuentos de stock sin leer-modificar-escribir.
+
+Cada descuento es un UPDATE condicional (`stock >= cantidad`) respaldado por el
+CHECK `product_stock_non_negative`: dos pedidos simultáneos solo se esperan si
+tocan los mismos productos, y nunca dejan el stock en negativo. Los bloqueos de
+fila duran lo que resta de la transacción, así que el descuento va al final,
+después del trabajo en Python.
+"""
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.core.exceptions import ValidationError
+from apps.shop.models import Product
+from apps.shop.versions import PRODUCTS, touch_catalog
+
+
+class InsufficientStock(ValidationError):
+    def __init__(self, products):
+        self.products = products
+        super().__init__([f"Stock insuficiente para el producto {product.name}" for product in products])
+
+
+def merge_quantities(lines):
+    """[(product_id, cantidad), ...] -> {product_id: cantidad total}, ordenado por id."""
+    quantities = {}
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return dict(sorted(quantities.items()))
+
+
+def _per_product(quantities):
+    return Case(
+        *[When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def decrease_stock(lines):
+    """
+    Descuenta las líneas (product_id, cantidad) con un solo UPDATE: o alcanza el
+    stock de todos o no se descuenta ninguno (InsufficientStock con los que
+    faltan). Va al final de la transacción que lo llama.
+    """
+    quantities = merge_quantities(lines)
+    if not quantities:
+        return
+    needed = _per_product(quantities)
+    targets = Product.objects.filter(id__in=list(quantities))
+    if connection.features.update_can_self_select:
+        # PostgreSQL: la subconsulta bloquea las filas en orden de id antes de actualizarlas;
+        # dos pedidos con los mismos productos se esperan en vez de bloquearse en cruz
+        targets = Product.objects.filter(
+            id__in=targets.order_by('id').select_for_update(no_key=True).values('id')
+        )
+    # MySQL respeta el ORDER BY del UPDATE (no admite la subconsulta sobre la misma tabla)
+    decrement = targets.filter(stock__gte=needed).order_by('id')
+    if len(quantities) == 1:
+        updated = decrement.update(stock=F('stock') - needed)
+    else:
+        # Con varios productos el UPDATE puede aplicar solo a algunos: el savepoint lo deshace
+        with transaction.atomic():
+            updated = decrement.update(stock=F('stock') - needed)
+            if updated != len(quantities):
+                transaction.set_rollback(True)
+    if updated != len(quantities):
+        products = Product.objects.filter(id__in=list(quantities)).only('id', 'name', 'stock').order_by('id')
+        raise InsufficientStock([product for product in products if product.stock < quantities[product.id]])
+    touch_catalog(PRODUCTS)
+
+
+def increase_stock(lines):
+    """Devuelve las líneas (product_id, cantidad) al stock, p. ej. reservas de carrito vencidas."""
+    quantities = merge_quantities(lines)
+    if not quantities:
+        return
+    Product.objects.filter(id__in=list(quantities)).order_by('id').update(stock=F('stock') + _per_product(quantities))
+    touch_catalog(PRODUCTS)
@@ -0,0 +1,35 @@
+"""
+Sellos de versión del catálogo para GET condicionales (ETag / Last-Modified).
+
+Cada sello es el instante (ns) del último cambio del recurso y vive en la caché
+sin vencimiento; si se desaloja vuelve a arrancar desde el reloj, lo que solo
+invalida los ETag que tengan los clientes.
+"""
+import time
+from django.core.cache import cache
+from django.db import transaction
+
+PRODUCTS = 'products'
+CATEGORIES = 'categories'
+BRANDS = 'brands'
+
+
+def _key(name):
+    return f'shop:version:{name}'
+
+
+def catalog_version(name):
+    stamp = cache.get(_key(name))
+    if stamp is None:
+        cache.add(_key(name), time.time_ns(), None)
+        stamp = cache.get(_key(name))
+    return stamp
+
+
+def touch_catalog(*names):
+    def touch():
+        cache.set_many({_key(name): time.time_ns() for name in names}, None)
+
+    touch()
+    # Y de nuevo al confirmar: una lectura entre ambos momentos vio datos viejos con el sello nuevo
+    transaction.on_commit(touch)
@@ -0,0 +1,66 @@
+"""
+Lista de deseos por usuario.
+
+Los listados marcan `in_wishlist` en cada producto con un solo conjunto de ids
+por usuario, cacheado junto con el instante de su último cambio; ese sello se
+combina con el del catálogo para que el ETag cambie al agregar o quitar.
+"""
+import time
+from django.core.cache import cache
+from django.db import transaction
+from apps.shop.models import Wishlist
+
+WISHLIST_TIMEOUT = 60 * 60
+
+
+def _key(user_id):
+    return f'shop:wishlist:{user_id}'
+
+
+def wishlist_state(user):
+    """{'ids': frozenset de product_id, 'stamp': ns} del usuario; vacío para anónimos."""
+    if not user.is_authenticated:
+        return {'ids': frozenset(), 'stamp': 0}
+    state = cache.get(_key(user.pk))
+    if state is None:
+        ids = Wishlist.products.through.objects.filter(wishlist__user=user).values_list('product_id', flat=True)
+        # Sin sello guardado no se sabe cuándo cambió: el reloj invalida los ETag anteriores
+        state = {'ids': frozenset(ids), 'stamp': time.time_ns()}
+        cache.add(_key(user.pk), state, WISHLIST_TIMEOUT)
+    return state
+
+
+def wishlist_product_ids(user):
+    return wishlist_state(user)['ids']
+
+
+def wishlist_stamp(user):
+    return wishlist_state(user)['stamp']
+
+
+def invalidate_wishlist(user_id):
+    cache.delete(_key(user_id))
+    # Y de nuevo al confirmar, como touch_catalog
+    transaction.on_commit(lambda: cache.delete(_key(user_id)))
+
+
+def get_wishlist(user):
+    # El modelo admite varias listas por usuario; la API usa siempre la primera
+    wishlist = Wishlist.objects.filter(user=user).order_by('id').first()
+    return wishlist or Wishlist.objects.create(user=user)
+
+
+def add_to_wishlist(user, product):
+    get_wishlist(user).products.add(product)
+
+
+def remove_from_wishlist(user, product_id):
+    """Quita el producto de todas las listas del usuario; devuelve si estaba."""
+    deleted, _ = Wishlist.products.through.objects.filter(wishlist__user=user, product_id=product_id).delete()
+    invalidate_wishlist(user.pk)
+    return bool(deleted)
+
+
+def mark_wishlist(products, ids):
+    """Copia de los productos serializados (p. ej. del payload cacheado del home) con `in_wishlist`."""
+    return [{**product, 'in_wishlist': product['id'] in ids} for product in products]
@@ -3,10 +3,12 @@ from django.db.models import Sum, Count, F, ExpressionWrapper, DecimalField
 from django.db.models.functions import TruncMonth, TruncYear, TruncDay, ExtractWeekDay
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
-from apps.orders.models import Order, OrderItem, Payment
+from apps.orders.models import Order, OrderItem, Payment, ProductSalesSummary
 from apps.shop.models import Product
 from apps.orders.choices import OrderStatus, PaymentStatus
+from common.instrumentation import query_budget
 
+@query_budget(15)
 def get_admin_overview(request):
     # Obtener la fecha actual y la fecha de hace un año
     now = timezone.now()
@@ -48,12 +50,13 @@ def get_admin_overview(request):
             count=Count('id')
         ).order_by('year', 'payment_method')),
 
-        # Top 5 productos más vendidos
-        'best_selling': list(OrderItem.objects.filter(
-            order__in=completed_orders
-        ).values('product__name').annotate(
-            total_sold=Sum('quantity')
-        ).order_by('-total_sold')[:5]),
+        # Top 5 productos más vendidos (los contadores de ventas incluyen pedidos no entregados)
+        # (contadores de pedidos entregados del último año, ver set_orders_status)
+        'best_selling': list(ProductSalesSummary.objects.filter(
+            delivered_365d__gt=0
+        ).order_by('-delivered_365d', 'product_id').values(
+            'product__name', total_sold=F('delivered_365d')
+        )[:5]),
 
         # Top 5 productos más rentables
         'most_profitable': list(OrderItem.objects.filter(
@@ -67,10 +70,10 @@ def get_admin_overview(request):
             total_profit=Sum('profit')
         ).order_by('-total_profit')[:5]),
 
-        # Top 5 productos menos vendidos
-        'least_selling': list(Product.objects.annotate(
-            total_sold=Sum('orderitem__quantity')
-        ).order_by('total_sold')[:5].values('name', 'total_sold')),
+        # Top 5 productos menos vendidos, incluidos los que no tienen ventas
+        'least_selling': list(ProductSalesSummary.objects.order_by(
+            'delivered_365d', 'product_id'
+        ).values(name=F('product__name'), total_sold=F('delivered_365d'))[:5]),
 
         # Top 5 productos menos rentables
         'least_profitable': list(OrderItem.objects.filter(
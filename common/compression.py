@@ -0,0 +1,179 @@
+"""
+Compresión de respuestas negociada con Accept-Encoding.
+
+Codificaciones en orden de preferencia del servidor: brotli y zstd si sus
+paquetes están instalados, gzip siempre. El cliente decide con sus q-values; a
+igual q gana la preferencia del servidor.
+
+- Cuerpos menores a COMPRESSION_MIN_SIZE o de tipos no textuales se dejan igual.
+- Las respuestas en streaming se comprimen bloque a bloque sin acumularlas.
+- Una respuesta con ETag (GET condicional, ver common/conditional.py) guarda su
+  versión comprimida en la caché con el mismo ETag: el siguiente request igual
+  no vuelve a comprimir. Largo y crc32 del cuerpo original evitan servir una copia vieja.
+- Solo GET/HEAD: los POST (login, pedidos) pueden mezclar secretos con datos
+  del cliente en el mismo cuerpo (BREACH).
+"""
+import gzip
+import hashlib
+import re
+import zlib
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Niveles pensados para contenido dinámico: buena relación sin gastar mucha CPU por request
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/x-ndjson', 'application/msgpack',
+    'application/javascript', 'application/xml', 'application/vnd.oai.openapi',
+)
+
+accept_encoding_re = re.compile(r'^\s*([^\s;]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+class GzipStream:
+    def __init__(self):
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class ZstdStream:
+    def __init__(self):
+        self.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def available_codecs():
+    """{codificación: (comprimir bytes, clase de stream)} en orden de preferencia."""
+    codecs = {}
+    if brotli is not None:
+        codecs['br'] = (lambda data: brotli.compress(data, quality=BROTLI_QUALITY), BrotliStream)
+    if zstandard is not None:
+        codecs['zstd'] = (lambda data: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), ZstdStream)
+    codecs['gzip'] = (lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0), GzipStream)
+    return codecs
+
+
+CODECS = available_codecs()
+
+
+def negotiate(header, codecs=CODECS):
+    """Codificación elegida para el Accept-Encoding `header`, o None."""
+    weights = {}
+    for item in header.split(','):
+        match = accept_encoding_re.match(item)
+        if match is None:
+            continue
+        try:
+            weights[match[1].lower()] = float(match[2]) if match[2] is not None else 1.0
+        except ValueError:
+            continue
+    wildcard = weights.get('*', 0.0)
+    best, best_weight = None, 0.0
+    # Recorre en orden de preferencia: solo un q estrictamente mayor desplaza al anterior
+    for name in codecs:
+        weight = weights.get(name, wildcard)
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+def compress_stream(iterator, stream_class):
+    stream = stream_class()
+    for chunk in iterator:
+        data = stream.compress(chunk)
+        if data:
+            yield data
+    yield stream.finish()
+
+
+def compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """Va arriba de la lista, antes de todo lo que mire el cuerpo (después de WhiteNoise)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Content-Encoding') or not compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if request.method not in ('GET', 'HEAD') or getattr(response, 'is_async', False):
+            return response
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compress, stream_class = CODECS[encoding]
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content, stream_class)
+            del response['Content-Length']
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+            content = self.cached_compress(request, response, encoding, compress)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        # Los bytes cambian: como GZipMiddleware, el ETag fuerte pasa a débil
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def cached_compress(self, request, response, encoding, compress):
+        etag = response.get('ETag')
+        if not etag or response.status_code != 200 or not settings.COMPRESSION_CACHE_TIMEOUT:
+            return compress(response.content)
+        # Los enlaces de paginación son absolutos: el host forma parte de la clave
+        digest = hashlib.md5(f'{request.get_host()}:{etag}'.encode()).hexdigest()
+        key = f'compression:{encoding}:{digest}'
+        checksum = (len(response.content), zlib.crc32(response.content))
+        cached = cache.get(key)
+        if cached is not None and cached[0] == checksum:
+            return cached[1]
+        content = compress(response.content)
+        cache.set(key, (checksum, content), settings.COMPRESSION_CACHE_TIMEOUT)
+        return content
@@ -0,0 +1,54 @@
+import hashlib
+from functools import wraps
+from django.utils.cache import get_conditional_response, patch_vary_headers, quote_etag
+from django.utils.http import http_date
+
+
+def conditional_response(request, stamp, handler, variant=None):
+    """
+    ETag fuerte y Last-Modified a partir de un sello de versión barato (instante
+    en ns del último cambio), evaluados antes de llamar a `handler`: si el
+    cliente ya tiene esa versión responde 304 sin consultar ni serializar.
+    Con `variant` (p. ej. el id del usuario) la respuesta depende además de quién pide.
+    """
+    # La misma versión se sirve distinta según la URL y el formato negociado
+    renderer = getattr(request, 'accepted_renderer', None)
+    source = f'{stamp}:{variant or ""}:{getattr(renderer, "format", "")}:{request.get_full_path()}'
+    etag = quote_etag(hashlib.md5(source.encode()).hexdigest())
+    last_modified = stamp // 10 ** 9
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = handler()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+    if variant is not None:
+        patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def user_variant(request, user_stamp):
+    """(sello, variante) por usuario autenticado; los anónimos comparten la variante ''."""
+    user = request.user
+    if not user.is_authenticated:
+        return 0, ''
+    return user_stamp(user), str(user.pk)
+
+
+def conditional_get(version_stamp, user_stamp=None):
+    """
+    Decorador de métodos de vista; `version_stamp()` devuelve el sello del recurso.
+    Con `user_stamp(user)` la respuesta es por usuario y cambia con cualquiera de los dos sellos.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            stamp, variant = version_stamp(), None
+            if user_stamp is not None:
+                own, variant = user_variant(request, user_stamp)
+                stamp = max(stamp, own)
+            return conditional_response(
+                request, stamp, lambda: method(self, request, *args, **kwargs), variant
+            )
+        return wrapper
+    return decorator
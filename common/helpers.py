@@ -0,0 +1,41 @@
+import operator
+from functools import reduce
+from django.db import connection, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+
+
+def bulk_increment(model, keys, rows):
+    """
+    Suma cantidades a un conjunto de filas con un UPDATE atómico, creándolas si
+    todavía no existen. `rows` son pares (valores de `keys`, {campo: cantidad}),
+    todos con los mismos campos; las claves repetidas se suman. Las filas que
+    faltan se insertan ignorando conflictos y luego un solo UPDATE con un CASE
+    por campo suma todo, bloqueando en orden de clave. Las restas se acotan en 0.
+    """
+    totals = {}
+    for key, amounts in rows:
+        current = totals.setdefault(tuple(key), dict.fromkeys(amounts, 0))
+        for field, amount in amounts.items():
+            current[field] += amount
+    if not totals:
+        return
+    lookups = {key: Q(**dict(zip(keys, key))) for key in sorted(totals)}
+    fields = next(iter(totals.values()))
+    increments = {
+        field: Greatest(
+            F(field) + Case(*[When(lookup, then=Value(totals[key][field])) for key, lookup in lookups.items()]), 0,
+            output_field=model._meta.get_field(field),
+        )
+        for field in fields
+    }
+    with transaction.atomic():
+        model.objects.bulk_create([model(**dict(zip(keys, key))) for key in lookups], ignore_conflicts=True)
+        targets = model.objects.filter(reduce(operator.or_, lookups.values()))
+        if connection.features.update_can_self_select:
+            # Como apps.shop.stock: la subconsulta bloquea las filas en orden antes del UPDATE
+            targets = model.objects.filter(
+                pk__in=targets.order_by(*keys).select_for_update(no_key=True).values('pk')
+            )
+        # MySQL respeta el ORDER BY del UPDATE
+        targets.order_by(*keys).update(**increments)
@@ -0,0 +1,115 @@
+"""
+Instrumentación SQL por request.
+
+El middleware envuelve las conexiones con `execute_wrapper` (funciona sin
+DEBUG) y cuenta consultas, tiempo de base de datos y repeticiones de la misma
+sentencia: una plantilla SQL que se ejecuta muchas veces en un request es el
+síntoma típico de un N+1. El resumen va en cabeceras para staff o requests
+muestreados y en un log JSON; las vistas pueden declarar `query_budget`.
+"""
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    """execute_wrapper que acumula conteo, duración y repeticiones por plantilla SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Plantilla con %s, sin parámetros: el mismo N+1 comparte la plantilla
+        self.patterns = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            self.patterns[sql] += 1
+
+    def repeated(self, threshold):
+        return [(sql, count) for sql, count in self.patterns.most_common() if count >= threshold]
+
+
+def query_budget(budget):
+    """Declara el máximo de consultas de una vista función (en clases: atributo `query_budget`)."""
+    def decorator(view):
+        view.query_budget = budget
+        return view
+    return decorator
+
+
+def describe_view(view_func, method):
+    """(nombre, presupuesto) de la vista: get_admin_overview, HomeListView, ProductViewSet.list."""
+    # Las vistas de clase exponen .cls y los viewsets además .actions ({'get': 'list'})
+    owner = getattr(view_func, 'cls', view_func)
+    action = (getattr(view_func, 'actions', None) or {}).get(method.lower())
+    name = owner.__qualname__ + (f'.{action}' if action else '')
+    budget = getattr(owner, 'query_budget', None)
+    if isinstance(budget, dict):
+        budget = budget.get(action)
+    return name, budget
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        request.query_stats = stats
+
+        budget = getattr(request, 'query_budget', None)
+        over_budget = budget is not None and stats.count > budget
+        if over_budget and settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(
+                f'{request.method} {request.path}: {stats.count} consultas (presupuesto {budget})'
+            )
+
+        repeated = stats.repeated(settings.QUERY_REPEAT_THRESHOLD)
+        # DRF copia el usuario autenticado (JWT) al HttpRequest original
+        user = getattr(request, 'user', None)
+        exposed = (user is not None and user.is_staff) or random.random() < settings.QUERY_INSTRUMENTATION_SAMPLE_RATE
+        if exposed:
+            response['X-DB-Queries'] = str(stats.count)
+            response['X-DB-Time'] = f'{stats.seconds * 1000:.1f}'
+            response['X-DB-Repeated'] = str(len(repeated))
+            response['Server-Timing'] = f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"'
+
+        if exposed or repeated or over_budget:
+            level = logging.WARNING if repeated or over_budget else logging.INFO
+            logger.log(level, json.dumps({
+                'event': 'request_queries',
+                'method': request.method,
+                'path': request.path,
+                'view': getattr(request, 'view_name', None),
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - start) * 1000, 1),
+                'queries': stats.count,
+                'db_ms': round(stats.seconds * 1000, 1),
+                'budget': budget,
+                'repeated': [{'sql': sql[:500], 'count': count} for sql, count in repeated],
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_name, request.query_budget = describe_view(view_func, request.method)
@@ -0,0 +1,248 @@
+"""
+Métricas por vista en formato de texto de Prometheus.
+
+Cada proceso acumula en memoria contadores e histogramas etiquetados por vista
+(`ProductViewSet.list`, `get_admin_overview`), método y código de estado. Con
+varios workers de gunicorn cada uno vuelca su registro a METRICS_DIR
+(`<pid>-<id>.json`, desde un hilo cada METRICS_FLUSH_INTERVAL segundos) y el
+endpoint suma todos los archivos; gunicorn.conf.py archiva los de los workers
+que terminan para que los contadores no retrocedan.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from functools import wraps
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ARCHIVE_FILE = 'archive.json'
+
+COUNTERS = {
+    'http_requests_total': 'Requests atendidos.',
+    'http_request_db_queries_total': 'Consultas SQL ejecutadas.',
+    'http_request_db_seconds_total': 'Tiempo en la base de datos.',
+    'http_request_serializer_seconds_total': 'Tiempo en serializers de DRF.',
+}
+HISTOGRAMS = {
+    'http_request_duration_seconds': 'Duración del request.',
+    'http_request_db_duration_seconds': 'Tiempo en la base de datos por request.',
+}
+
+# Tiempo de serialización del request en curso (lo suma el parche de BaseSerializer.data)
+_serializer_seconds = contextvars.ContextVar('serializer_seconds', default=None)
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # Nombre único por proceso: un pid reutilizado no pisa el archivo de un worker anterior
+        self.name = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self.flusher = None
+        self.dirty = False
+        self.counters = defaultdict(float)
+        # [conteo por bucket..., +Inf, suma]
+        self.histograms = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1) + [0.0])
+
+    def increment(self, name, labels, value=1):
+        self.counters[(name, labels)] += value
+
+    def observe(self, name, labels, value):
+        histogram = self.histograms[(name, labels)]
+        for position, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                histogram[position] += 1
+                break
+        else:
+            histogram[len(LATENCY_BUCKETS)] += 1
+        histogram[-1] += value
+
+    def record(self, labels, duration, queries, db_seconds, serializer_seconds):
+        view, method, status = labels
+        with self.lock:
+            self.increment('http_requests_total', labels)
+            self.increment('http_request_db_queries_total', (view, method), queries)
+            self.increment('http_request_db_seconds_total', (view, method), db_seconds)
+            self.increment('http_request_serializer_seconds_total', (view, method), serializer_seconds)
+            self.observe('http_request_duration_seconds', (view, method), duration)
+            self.observe('http_request_db_duration_seconds', (view, method), db_seconds)
+            self.dirty = True
+        if settings.METRICS_DIR and self.flusher is None:
+            self.start_flusher()
+
+    def start_flusher(self):
+        # Un hilo por proceso vuelca el registro si cambió; el request nunca escribe a disco
+        def run():
+            while True:
+                time.sleep(settings.METRICS_FLUSH_INTERVAL)
+                if self.dirty:
+                    self.flush()
+
+        with self.lock:
+            if self.flusher is None:
+                self.flusher = threading.Thread(target=run, name='metrics-flusher', daemon=True)
+                self.flusher.start()
+
+    def dump(self):
+        with self.lock:
+            self.dirty = False
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(values)] for (name, labels), values in self.histograms.items()],
+            }
+
+    def flush(self):
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f'{self.name}.json')
+        # Escritura atómica: quien lee nunca ve un archivo a medias
+        with open(f'{path}.tmp', 'w') as file:
+            json.dump(self.dump(), file)
+        os.replace(f'{path}.tmp', path)
+
+
+registry = Registry()
+# Con --preload los workers nacen con una copia del registro del master
+os.register_at_fork(after_in_child=registry.reset)
+
+
+def merge(documents):
+    counters, histograms = defaultdict(float), {}
+    for document in documents:
+        for name, labels, value in document['counters']:
+            counters[(name, tuple(labels))] += value
+        for name, labels, values in document['histograms']:
+            key = (name, tuple(labels))
+            current = histograms.setdefault(key, [0] * len(values))
+            histograms[key] = [total + value for total, value in zip(current, values)]
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), values] for (name, labels), values in histograms.items()],
+    }
+
+
+def read_documents(directory, names=None):
+    documents = []
+    for filename in os.listdir(directory) if names is None else names:
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as file:
+                documents.append(json.load(file))
+        except (OSError, ValueError):
+            # Archivada o reemplazada entre el listado y la lectura
+            continue
+    return documents
+
+
+def collect():
+    """Registro agregado de todos los procesos (o solo de este, sin METRICS_DIR)."""
+    if not settings.METRICS_DIR:
+        return registry.dump()
+    registry.flush()
+    return merge(read_documents(settings.METRICS_DIR))
+
+
+def archive_worker(directory, pid):
+    """Suma los archivos del worker `pid` terminado al archivo histórico (hook child_exit de gunicorn)."""
+    names = [name for name in os.listdir(directory) if name.startswith(f'{pid}-') and name.endswith('.json')]
+    if not names:
+        return
+    archive = os.path.join(directory, ARCHIVE_FILE)
+    documents = read_documents(directory, names + ([ARCHIVE_FILE] if os.path.exists(archive) else []))
+    with open(f'{archive}.tmp', 'w') as file:
+        json.dump(merge(documents), file)
+    os.replace(f'{archive}.tmp', archive)
+    for name in names:
+        os.remove(os.path.join(directory, name))
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def render(document):
+    """Formato de exposición de texto de Prometheus (version 0.0.4)."""
+    counters, histograms = defaultdict(list), defaultdict(list)
+    for name, labels, value in document['counters']:
+        counters[name].append((labels, value))
+    for name, labels, values in document['histograms']:
+        histograms[name].append((labels, values))
+
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        label_names = ('view', 'method', 'status') if name == 'http_requests_total' else ('view', 'method')
+        for labels, value in sorted(counters[name]):
+            lines.append(f'{name}{format_labels(label_names, labels)} {value!r}')
+    for name, help_text in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for labels, values in sorted(histograms[name]):
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, '+Inf'), values[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{format_labels(("view", "method"), labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(("view", "method"), labels)} {float(values[-1])!r}')
+            lines.append(f'{name}_count{format_labels(("view", "method"), labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def install_serializer_timer():
+    """Envuelve BaseSerializer.data para sumar el tiempo del serializer más externo al request en curso."""
+    from rest_framework.serializers import BaseSerializer
+
+    original = BaseSerializer.data
+    if getattr(original.fget, 'timed', False):
+        return
+
+    @wraps(original.fget)
+    def data(serializer):
+        state = _serializer_seconds.get()
+        # Fuera de un request, o dentro de otro .data ya medido
+        if state is None or state['depth']:
+            return original.fget(serializer)
+        state['depth'] += 1
+        start = time.perf_counter()
+        try:
+            return original.fget(serializer)
+        finally:
+            state['seconds'] += time.perf_counter() - start
+            state['depth'] -= 1
+
+    data.timed = True
+    BaseSerializer.data = property(data)
+
+
+class MetricsMiddleware:
+    """Debe ir antes de QueryInstrumentationMiddleware: toma de él la vista y las consultas."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        serializer_state = {'seconds': 0.0, 'depth': 0}
+        token = _serializer_seconds.set(serializer_state)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _serializer_seconds.reset(token)
+        duration = time.perf_counter() - start
+
+        stats = getattr(request, 'query_stats', None)
+        view = getattr(request, 'view_name', None) or 'unmatched'
+        registry.record(
+            (view, request.method, str(response.status_code)), duration,
+            stats.count if stats else 0, stats.seconds if stats else 0.0, serializer_state['seconds'],
+        )
+        return response
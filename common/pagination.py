@@ -0,0 +1,192 @@
+import base64
+import binascii
+import datetime
+import decimal
+import hashlib
+import json
+import uuid
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _encode_value(value):
+    # Precisión completa: DjangoJSONEncoder recorta microsegundos y rompería la igualdad
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} no es serializable en un cursor')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por clave (keyset): el cursor guarda los valores de orden del
+    último elemento y la página siguiente se pide con WHERE (orden) > (valores),
+    así la página 1000 cuesta lo mismo que la primera. La clave primaria se
+    agrega siempre como desempate para que el orden sea total y estable.
+
+    No cuenta por defecto; con `?count=true` agrega el total, cacheado por consulta.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    count_cache_timeout = 60
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.count = self.get_count(queryset) if request.query_params.get(self.count_query_param) == 'true' else None
+
+        cursor = self.decode_cursor(request)
+        backwards = cursor is not None and cursor['backwards']
+        ordering = [(field, descending != backwards) for field, descending in self.ordering]
+        if cursor is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, cursor['values']))
+        queryset = queryset.order_by(*[f'-{field}' if descending else field for field, descending in ordering])
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if backwards:
+            results.reverse()
+            self.has_next, self.has_previous = bool(results), has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        if not all(isinstance(term, str) for term in ordering):
+            raise ImproperlyConfigured('KeysetPagination solo admite ordenamientos por nombre de campo.')
+        model = queryset.model
+        pk = model._meta.pk.attname
+        fields = []
+        for term in ordering:
+            name = term.lstrip('-')
+            fields.append((pk if name == 'pk' else self.attname(model, name), term.startswith('-')))
+        if not any(field == pk for field, _ in fields):
+            fields.append((pk, fields[-1][1] if fields else False))
+        return fields
+
+    @staticmethod
+    def attname(model, name):
+        try:
+            return model._meta.get_field(name).attname
+        except FieldDoesNotExist:
+            # Anotaciones (p. ej. search_rank)
+            return name
+
+    @staticmethod
+    def keyset_filter(ordering, values):
+        """(a, b, id) > (x, y, z) expandido en OR de prefijos iguales, respetando la dirección de cada campo."""
+        condition, equal = Q(), Q()
+        for (field, descending), value in zip(ordering, values):
+            condition |= equal & Q(**{f'{field}__{"lt" if descending else "gt"}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def get_count(self, queryset):
+        queryset = queryset.order_by()
+        key = 'pagination:count:' + hashlib.md5(str(queryset.query).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def signature(self):
+        return ','.join(f'-{field}' if descending else field for field, descending in self.ordering)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values, backwards, signature = cursor['v'], bool(cursor['b']), cursor['o']
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        # Un cursor de otro orden (cambió ?ordering=) no sirve para esta consulta
+        if signature != self.signature() or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return {'values': values, 'backwards': backwards}
+
+    def encode_cursor(self, instance, backwards):
+        values = [getattr(instance, field) for field, _ in self.ordering]
+        payload = json.dumps({'v': values, 'b': int(backwards), 'o': self.signature()}, default=_encode_value)
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, base64.urlsafe_b64encode(payload.encode()).decode())
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], backwards=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], backwards=True)
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link(), 'previous': self.get_previous_link()}
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer', 'description': 'Solo con ?count=true'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor de la página (tomado de next/previous).',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Resultados por página (máximo {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'true para incluir el total de resultados.',
+                'schema': {'type': 'boolean'},
+            },
+        ]
@@ -0,0 +1,172 @@
+"""
+Perfilado bajo demanda de un request (solo staff).
+
+Con la cabecera `X-Profile: 1` o `?profile=true` el middleware muestrea la pila
+del hilo que atiende el request desde un hilo aparte y toma una instantánea de
+tracemalloc al terminar. Escribe en PROFILING_DIR:
+
+- `<id>.folded`: pilas colapsadas ("a;b;c N"), el formato de flamegraph.pl y speedscope.
+- `<id>.memory.txt`: memoria pico y los mayores asignadores por línea.
+
+tracemalloc multiplica el tiempo de las vistas que asignan mucho; con el valor
+`cpu` (o `memory`) se toma solo una de las dos mediciones.
+
+Sin la bandera el costo es buscar una cabecera y un parámetro.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = 'profile'
+TOP_ALLOCATIONS = 30
+TRACEMALLOC_FRAMES = 10
+
+# tracemalloc es global al proceso: un request perfilado a la vez
+_lock = threading.Lock()
+
+
+class StackSampler(threading.Thread):
+    """Toma la pila de `thread_id` cada `interval` segundos y cuenta las pilas colapsadas."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._names = {}
+        self._done = threading.Event()
+
+    def frame_name(self, code):
+        name = self._names.get(code)
+        if name is None:
+            path = os.path.relpath(code.co_filename, settings.BASE_DIR)
+            if path.startswith('..'):
+                # Librerías: desde site-packages/ o el nombre del archivo
+                path = code.co_filename.rsplit('site-packages' + os.sep, 1)[-1]
+            # co_qualname existe desde Python 3.11
+            function = getattr(code, 'co_qualname', code.co_name)
+            name = self._names[code] = f'{function} ({path}:{code.co_firstlineno})'.replace(';', ',')
+        return name
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                names.append(self.frame_name(frame.f_code))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+PROFILE_MODES = {'1': ('cpu', 'memory'), 'true': ('cpu', 'memory'), 'cpu': ('cpu',), 'memory': ('memory',)}
+
+
+def requested_modes(request):
+    return PROFILE_MODES.get(request.META.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM))
+
+
+def request_user(request):
+    """Usuario de la sesión o del token JWT; DRF autentica recién en la vista."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return result[0] if result else None
+
+
+def write_stacks(path, sampler):
+    with open(path, 'w') as file:
+        for stack, count in sampler.stacks.most_common():
+            file.write(f'{stack} {count}\n')
+
+
+def write_allocations(path, request, snapshot, peak, elapsed):
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ])
+    statistics = snapshot.statistics('lineno')
+    with open(path, 'w') as file:
+        file.write(f'{request.method} {request.get_full_path()}\n')
+        file.write(f'elapsed: {elapsed * 1000:.1f} ms\n')
+        file.write(f'peak traced memory: {peak / 1024:.1f} KiB\n')
+        file.write(f'retained at end: {sum(stat.size for stat in statistics) / 1024:.1f} KiB\n\n')
+        file.write(f'Top {TOP_ALLOCATIONS} allocators (by line):\n')
+        for stat in statistics[:TOP_ALLOCATIONS]:
+            file.write(f'{stat}\n')
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        modes = requested_modes(request)
+        if modes is None:
+            return self.get_response(request)
+        user = request_user(request)
+        if user is None or not user.is_staff or not _lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self.profile(request, modes)
+        finally:
+            _lock.release()
+
+    def profile(self, request, modes):
+        slug = re.sub(r'[^\w]+', '-', request.path).strip('-') or 'root'
+        profile_id = f'profile-{timezone.now():%Y%m%d-%H%M%S-%f}-{slug}'
+        path = os.path.join(settings.PROFILING_DIR, profile_id)
+        sampler = StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL) if 'cpu' in modes else None
+        # Si ya estaba activo (PYTHONTRACEMALLOC) se deja como estaba
+        tracing = 'memory' in modes and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        if 'memory' in modes:
+            tracemalloc.reset_peak()
+        switch_interval = sys.getswitchinterval()
+        start = time.perf_counter()
+        if sampler is not None:
+            # El muestreador necesita el GIL: con el intervalo por defecto (5 ms) perdería muestras
+            sys.setswitchinterval(min(switch_interval, settings.PROFILING_INTERVAL))
+            sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - start
+            if sampler is not None:
+                sampler.stop()
+                sys.setswitchinterval(switch_interval)
+            if 'memory' in modes:
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+            if tracing:
+                tracemalloc.stop()
+
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        if sampler is not None:
+            write_stacks(f'{path}.folded', sampler)
+        if 'memory' in modes:
+            write_allocations(f'{path}.memory.txt', request, snapshot, peak, elapsed)
+        response['X-Profile-Id'] = profile_id
+        return response
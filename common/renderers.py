@@ -0,0 +1,56 @@
+"""
+Renderers rápidos para las respuestas de la API.
+
+ORJSONRenderer produce los mismos bytes que el JSONRenderer de DRF para lo que
+devuelven los serializers: Decimal como número, fechas con el formato de DRF
+(se delegan a su JSONEncoder), unicode sin escapar y \\u2028/\\u2029 escapados.
+Lo que orjson no admite (enteros de más de 64 bits, `?indent=`/BrowsableAPI)
+pasa por el renderer de DRF. Diferencias: NaN/Infinity se escriben como null
+en vez de fallar y los exponentes van sin signo (1e16 en vez de 1e+16).
+
+MessagePackRenderer (`Accept: application/msgpack` o `?format=msgpack`) solo se
+registra si el paquete msgpack está instalado.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Tipos que orjson no conoce (Decimal, lazy strings, timedelta, sets...) y fechas, como DRF
+_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    if orjson is not None:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=_default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
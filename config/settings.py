@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
 from pathlib import Path
+from importlib.util import find_spec
 import dj_database_url
 from datetime import timedelta
 import os
@@ -76,6 +77,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "common.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -83,6 +85,9 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "common.metrics.MetricsMiddleware",
+    "common.instrumentation.QueryInstrumentationMiddleware",
+    "common.profiling.ProfilingMiddleware",
 ]
 
 
@@ -115,6 +120,56 @@ DATABASES = {
     'default': dj_database_url.config(default=os.environ.get('DB_URL'))
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Con varios workers de gunicorn usar un backend compartido (DatabaseCache, Redis, ...)
+# para que las invalidaciones lleguen a todos los procesos.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'la-fortaleza'),
+    }
+}
+
+# Instrumentación SQL por request (common/instrumentation.py)
+# Fracción de requests anónimos con cabeceras X-DB-*; staff las recibe siempre
+QUERY_INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get('QUERY_INSTRUMENTATION_SAMPLE_RATE', 0))
+# Veces que una misma sentencia puede repetirse en un request antes de reportarla como N+1
+QUERY_REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 5))
+# true: superar el query_budget de una vista lanza QueryBudgetExceeded (para correr los tests)
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', '').lower() == 'true'
+
+# Perfilado bajo demanda (staff, X-Profile: 1 o ?profile=true; common/profiling.py)
+PROFILING_DIR = os.environ.get('PROFILING_DIR', os.path.join(BASE_DIR, 'logs'))
+PROFILING_INTERVAL = float(os.environ.get('PROFILING_INTERVAL', 0.001))
+
+# Métricas Prometheus en /metrics/ (common/metrics.py). Con varios workers de gunicorn,
+# METRICS_DIR es el directorio compartido donde cada uno vuelca sus contadores.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Compresión de respuestas (common/compression.py): tamaño mínimo y segundos que se
+# guarda el cuerpo comprimido de una respuesta con ETag (0 para no guardarlo)
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_CACHE_TIMEOUT = int(os.environ.get('COMPRESSION_CACHE_TIMEOUT', 300))
+
+# Segundos que el carrito reserva stock con POST /api/v1/cart/hold/ (0 deshabilita las reservas);
+# las vencidas las devuelve `manage.py release_cart_holds`
+CART_HOLD_SECONDS = int(os.environ.get('CART_HOLD_SECONDS', 900))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'common.instrumentation': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -135,7 +190,20 @@ AUTH_PASSWORD_VALIDATORS = [
 
 
 
+# JSON con orjson (common/renderers.py); MessagePack solo si el paquete está instalado
+RENDERER_CLASSES = ['common.renderers.ORJSONRenderer', 'rest_framework.renderers.BrowsableAPIRenderer']
+PARSER_CLASSES = [
+    'common.parsers.ORJSONParser',
+    'rest_framework.parsers.FormParser',
+    'rest_framework.parsers.MultiPartParser',
+]
+if find_spec('msgpack') is not None:
+    RENDERER_CLASSES.append('common.renderers.MessagePackRenderer')
+    PARSER_CLASSES.append('common.parsers.MessagePackParser')
+
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': RENDERER_CLASSES,
+    'DEFAULT_PARSER_CLASSES': PARSER_CLASSES,
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
@@ -0,0 +1,23 @@
+# Configuración de gunicorn (se carga sola desde el directorio de trabajo)
+import os
+import shutil
+
+# Directorio compartido de métricas; los workers lo leen de settings.METRICS_DIR
+metrics_dir = os.environ.setdefault('METRICS_DIR', '/tmp/la-fortaleza-metrics')
+
+
+def on_starting(server):
+    # Servidor nuevo, contadores nuevos: Prometheus lo trata como un reinicio
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from common.metrics import archive_worker
+    archive_worker(metrics_dir, worker.pid)
+
+
+def worker_exit(server, worker):
+    # Lo acumulado desde el último volcado, antes de que child_exit lo archive
+    from common.metrics import registry
+    registry.flush()
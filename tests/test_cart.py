@@ -0,0 +1,134 @@
+from rest_framework.test import APITestCase
+from rest_framework import status
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from apps.cart.models import CartItem
+from apps.cart.services import release_expired_holds
+from apps.orders.choices import PaymentMethod
+from apps.orders.models import Order
+from apps.shop.models import Category, Product
+
+User = get_user_model()
+
+
+class CartTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.cart_url = '/api/v1/cart/'
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpassword123')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Alimentos', slug='alimentos')
+        self.arepa = Product.objects.create(name='Arepa', slug='arepa', category=category, price=1000, stock=5)
+        self.harina = Product.objects.create(
+            name='Harina', slug='harina', category=category, price=2000, stock=10,
+            discount=10, discount_end_date=timezone.now() + timedelta(days=1),
+        )
+        self.checkout_payload = {
+            'address': {
+                'first_name': 'Test', 'last_name': 'User', 'email': 'test@example.com', 'phone': '1234567890',
+                'locality': 'CHA', 'street_type': 'CL', 'street_value': '79a', 'number': '123', 'complement': 'Apt 401',
+            },
+            'payment_method': PaymentMethod.CASH_ON_DELIVERY,
+        }
+
+    def add(self, product, quantity):
+        return self.client.post(f'{self.cart_url}items/', {'product': product.id, 'quantity': quantity}, format='json')
+
+    def stock(self, product):
+        return Product.objects.values_list('stock', flat=True).get(pk=product.pk)
+
+    def test_add_update_remove(self):
+        """Ensure lines are added, updated and removed with a snapshot of the display price."""
+        self.assertEqual(self.add(self.harina, 2).data['price'], '1800.00')
+        response = self.add(self.harina, 1)
+        self.assertEqual((response.data['quantity'], response.data['original_price']), (3, '2000.00'))
+        self.add(self.arepa, 1)
+
+        response = self.client.patch(f'{self.cart_url}items/{self.arepa.id}/', {'quantity': 4}, format='json')
+        self.assertEqual(response.data['subtotal'], '4000.00')
+        response = self.client.get(self.cart_url)
+        self.assertEqual([item['product']['slug'] for item in response.data['items']], ['harina', 'arepa'])
+        self.assertEqual((response.data['items_count'], response.data['total']), (7, 9400))
+
+        self.assertEqual(self.client.delete(f'{self.cart_url}items/{self.arepa.id}/').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.delete(f'{self.cart_url}items/{self.arepa.id}/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.patch(f'{self.cart_url}items/{self.arepa.id}/', {'quantity': 1}, format='json').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.add(self.arepa, 0).status_code, status.HTTP_400_BAD_REQUEST)
+        # Sin reserva el stock no se toca
+        self.assertEqual(self.stock(self.harina), 10)
+
+    def test_hold(self):
+        """Ensure holds take stock for every line or none, follow quantity changes and return on removal."""
+        self.add(self.arepa, 6)
+        self.add(self.harina, 2)
+        response = self.client.post(f'{self.cart_url}hold/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual((self.stock(self.arepa), self.stock(self.harina)), (5, 10))
+
+        self.client.patch(f'{self.cart_url}items/{self.arepa.id}/', {'quantity': 3}, format='json')
+        response = self.client.post(f'{self.cart_url}hold/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(response.data['items'][0]['held_until'])
+        self.assertEqual((self.stock(self.arepa), self.stock(self.harina)), (2, 8))
+
+        self.client.patch(f'{self.cart_url}items/{self.arepa.id}/', {'quantity': 5}, format='json')
+        self.assertEqual(self.stock(self.arepa), 0)
+        response = self.client.patch(f'{self.cart_url}items/{self.arepa.id}/', {'quantity': 6}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.delete(f'{self.cart_url}items/{self.arepa.id}/')
+        self.assertEqual(self.stock(self.arepa), 5)
+        self.client.delete(self.cart_url)
+        self.assertEqual(self.stock(self.harina), 10)
+
+    @override_settings(CART_HOLD_SECONDS=0)
+    def test_holds_disabled(self):
+        """Ensure holds can be turned off."""
+        self.add(self.arepa, 1)
+        self.assertEqual(self.client.post(f'{self.cart_url}hold/').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_release_expired_holds(self):
+        """Ensure the sweep returns expired holds to stock in batches and leaves active ones."""
+        self.add(self.arepa, 2)
+        self.add(self.harina, 3)
+        self.client.post(f'{self.cart_url}hold/')
+        self.assertEqual(release_expired_holds(), 0)
+
+        CartItem.objects.filter(product=self.arepa).update(held_until=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('release_cart_holds', '--batch-size', '1', stdout=out)
+        self.assertIn('1 expired cart holds released', out.getvalue())
+        self.assertEqual((self.stock(self.arepa), self.stock(self.harina)), (5, 7))
+
+        self.assertEqual(release_expired_holds(batch_size=1, now=timezone.now() + timedelta(days=1)), 1)
+        self.assertEqual(self.stock(self.harina), 10)
+        self.assertFalse(CartItem.objects.filter(held_quantity__gt=0).exists())
+
+    def test_checkout(self):
+        """Ensure checkout keeps held stock and prices, decrements the rest and empties the cart."""
+        self.assertEqual(self.client.post(f'{self.cart_url}checkout/', self.checkout_payload, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.add(self.harina, 2)
+        self.client.post(f'{self.cart_url}hold/')
+        self.add(self.arepa, 1)
+        # La reserva conserva el precio aunque el descuento cambie después
+        Product.objects.filter(pk=self.harina.pk).update(effective_price=1000, discount=50)
+
+        response = self.client.post(f'{self.cart_url}checkout/', self.checkout_payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['total'], 4600)
+        self.assertEqual((self.stock(self.arepa), self.stock(self.harina)), (4, 8))
+        self.assertEqual(Order.objects.get().orderitem_set.count(), 2)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_checkout_insufficient_stock(self):
+        """Ensure a checkout without enough stock fails and keeps the cart."""
+        self.add(self.arepa, 2)
+        Product.objects.filter(pk=self.arepa.pk).update(stock=1)
+        response = self.client.post(f'{self.cart_url}checkout/', self.checkout_payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual(CartItem.objects.get().quantity, 2)
@@ -0,0 +1,276 @@
+import datetime
+import decimal
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from apps.core.benchmarks import budget_violations, compare, run_benchmarks
+from apps.core.dataset import generate
+from apps.orders.models import Order, OrderItem, Payment, ProductSalesSummary
+from apps.shop.api.v1.views import ProductViewSet
+from apps.shop.models import Category, Product, Wishlist
+from common.compression import CompressionMiddleware, negotiate
+from common.instrumentation import QueryBudgetExceeded, QueryStats
+from common.metrics import LATENCY_BUCKETS, Registry, archive_worker, collect
+from common.renderers import ORJSONRenderer, msgpack
+
+
+class DatasetTests(APITestCase):
+    def snapshot(self):
+        return (
+            list(Product.objects.order_by('id').values_list('name', 'price', 'category__slug', 'brand__slug')),
+            list(OrderItem.objects.order_by('id').values_list('order_id', 'product_id', 'quantity', 'price')),
+            list(Wishlist.products.through.objects.order_by('id').values_list('wishlist_id', 'product_id')),
+        )
+
+    def test_generate(self):
+        """Ensure the generator creates the requested rows with consistent totals and derived data."""
+        generate(seed=7, products=300, users=40, orders=120, brands=10, build_indexes=False, report=lambda message: None)
+        self.assertEqual(Product.objects.count(), 300)
+        self.assertEqual(get_user_model().objects.count(), 40)
+        self.assertEqual(Order.objects.count(), 120)
+        self.assertEqual(Category.objects.filter(parent__isnull=True).count(), 12)
+        # Los contadores que mantienen las señales se recalculan al final
+        root = Category.objects.filter(parent__isnull=True).order_by('-product_count').first()
+        self.assertEqual(root.product_count, Product.objects.filter(category__tree_id=root.tree_id).count())
+        self.assertTrue(ProductSalesSummary.objects.exists())
+        for payment in Payment.objects.select_related('order')[:20]:
+            subtotal = sum(item.subtotal for item in payment.order.orderitem_set.all())
+            self.assertEqual(payment.amount, subtotal + payment.shipping_cost)
+
+    def test_deterministic(self):
+        """Ensure the same seed produces the same data regardless of the batch size."""
+        options = {'seed': 3, 'products': 1500, 'users': 20, 'orders': 50, 'brands': 5, 'build_indexes': False, 'report': lambda message: None}
+        generate(batch_size=1000, **options)
+        first = self.snapshot()
+        Product.objects.all().delete()
+        get_user_model().objects.all().delete()
+        Category.objects.all().delete()
+        generate(batch_size=5000, **options)
+        second = self.snapshot()
+        self.assertEqual(first, second)
+
+
+class BenchmarkTests(APITestCase):
+    def test_endpoints_within_budget(self):
+        """Ensure every benchmarked endpoint answers successfully within its query budget."""
+        generate(seed=1, products=80, users=10, orders=40, brands=6, build_indexes=True, report=lambda message: None)
+        document = run_benchmarks(iterations=1, warmup=0, report=lambda name, result: None)
+        self.assertIn('orders.create', document['results'])
+        self.assertEqual(budget_violations(document), [])
+
+    def test_compare(self):
+        """Ensure a comparison flags extra queries and large latency increases only."""
+        before = {'results': {'home': {'queries': 1, 'p90_ms': 10.0}, 'brands.list': {'queries': 2, 'p90_ms': 5.0}}}
+        after = {'results': {'home': {'queries': 2, 'p90_ms': 10.5}, 'brands.list': {'queries': 2, 'p90_ms': 9.0}}}
+        self.assertEqual(compare(before, after), (['home: queries 1 -> 2'], ['brands.list: p90 5.0ms -> 9.0ms']))
+
+
+class InstrumentationTests(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Granos', slug='granos')
+        Product.objects.create(name='Arroz', slug='arroz', price=100, stock=5, category=category)
+
+    def test_headers_for_staff(self):
+        """Ensure query counts are exposed to staff users only."""
+        url = reverse('product-list')
+        self.assertNotIn('X-DB-Queries', self.client.get(url))
+        staff = get_user_model().objects.create_user(username='staff', password='x', is_staff=True)
+        self.client.force_authenticate(user=staff)
+        with self.assertLogs('common.instrumentation', 'INFO') as logs:
+            response = self.client.get(url)
+        self.assertGreater(int(response['X-DB-Queries']), 0)
+        self.assertIn('Server-Timing', response)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'ProductViewSet.list')
+        self.assertEqual(record['queries'], int(response['X-DB-Queries']))
+
+    def test_repeated_queries(self):
+        """Ensure the same statement executed in a loop is reported as a repeated pattern."""
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            for product_id in range(6):
+                Product.objects.filter(id=product_id).exists()
+            Category.objects.count()
+        self.assertEqual(stats.count, 7)
+        [(sql, count)] = stats.repeated(threshold=5)
+        self.assertEqual(count, 6)
+        self.assertIn('shop_product', sql)
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_strict_budget(self):
+        """Ensure strict mode fails a request over its view's query budget."""
+        with mock.patch.object(ProductViewSet, 'query_budget', {'list': 0}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('product-list'))
+
+
+class ProfilingTests(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.url = reverse('product-list')
+
+    def test_staff_profile(self):
+        """Ensure a staff request with the profile flag writes folded stacks and an allocation report."""
+        staff = get_user_model().objects.create_user(username='staff', password='x', is_staff=True)
+        token = RefreshToken.for_user(staff).access_token
+        with override_settings(PROFILING_DIR=self.directory, PROFILING_INTERVAL=0.0001), self.assertLogs('common.instrumentation'):
+            response = self.client.get(self.url, HTTP_X_PROFILE='1', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile-Id']
+        self.assertEqual(sorted(os.listdir(self.directory)), [f'{profile_id}.folded', f'{profile_id}.memory.txt'])
+        with open(os.path.join(self.directory, f'{profile_id}.folded')) as file:
+            for line in file:
+                stack, count = line.rsplit(' ', 1)
+                self.assertGreater(int(count), 0)
+        with open(os.path.join(self.directory, f'{profile_id}.memory.txt')) as file:
+            self.assertIn('allocators', file.read())
+
+    def test_ignored_for_customers(self):
+        """Ensure the profile flag is ignored for anonymous and non-staff users."""
+        user = get_user_model().objects.create_user(username='cliente', password='x')
+        with override_settings(PROFILING_DIR=self.directory):
+            response = self.client.get(self.url, {'profile': 'true'})
+            self.client.force_authenticate(user=user)
+            self.client.get(self.url, {'profile': 'true'})
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class MetricsTests(APITestCase):
+    def test_endpoint(self):
+        """Ensure the metrics endpoint requires the token and exposes per-view series in Prometheus format."""
+        self.client.get(reverse('product-list'))
+        url = reverse('core:metrics')
+        with override_settings(METRICS_TOKEN='secreto'):
+            self.assertEqual(self.client.get(url).status_code, 401)
+            response = self.client.get(url, HTTP_AUTHORIZATION='Token secreto')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_requests_total{view="ProductViewSet.list",method="GET",status="200"}', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="ProductViewSet.list",method="GET",le="+Inf"}', body)
+        serializer_seconds = [
+            line for line in body.splitlines()
+            if line.startswith('http_request_serializer_seconds_total{view="ProductViewSet.list"')
+        ]
+        self.assertGreater(float(serializer_seconds[0].rsplit(' ', 1)[1]), 0)
+
+    def test_worker_aggregation(self):
+        """Ensure series from every worker file, including archived workers, are summed."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        workers = [Registry() for _ in range(3)]
+        for position, worker in enumerate(workers):
+            worker.name = f'{100 + position}-test'
+            worker.record(('WorkerTestView', 'GET', '200'), 0.02, 2, 0.004, 0.001)
+        with override_settings(METRICS_DIR=directory):
+            for worker in workers:
+                worker.flush()
+            archive_worker(directory, 100)
+            document = collect()
+        self.assertIn('archive.json', os.listdir(directory))
+        [total] = [value for name, labels, value in document['counters'] if name == 'http_requests_total' and labels[0] == 'WorkerTestView']
+        self.assertEqual(total, 3)
+        [histogram] = [values for name, labels, values in document['histograms'] if name == 'http_request_duration_seconds' and labels[0] == 'WorkerTestView']
+        self.assertEqual(histogram[LATENCY_BUCKETS.index(0.025)], 3)
+
+
+class RendererTests(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Alimentos', slug='alimentos')
+        for i in range(3):
+            Product.objects.create(name=f'Café ñ {i}', slug=f'cafe-{i}', category=category, price=1000 + i, stock=5, discount=10)
+
+    def test_same_output_as_drf(self):
+        """Ensure the orjson renderer produces DRF's bytes for decimals, dates and unicode."""
+        data = {
+            'price': decimal.Decimal('12.50'),
+            'created_at': timezone.now(),
+            'day': datetime.date(2024, 1, 2),
+            'text': 'ñ \u2028',
+            'keys': {1: 'uno'},
+            'big': 2 ** 70,
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        response = self.client.get('/api/v1/shop/products/')
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        self.assertEqual(ORJSONRenderer().render(data, 'application/json; indent=2'), JSONRenderer().render(data, 'application/json; indent=2'))
+
+        response = self.client.post('/api/v1/auth/login/', '{"username": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.data['detail'])
+
+    @unittest.skipIf(msgpack is None, 'msgpack no está instalado')
+    def test_msgpack_negotiation(self):
+        """Ensure clients can ask for MessagePack and get the same data as JSON."""
+        response = self.client.get('/api/v1/shop/products/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), json.loads(self.client.get('/api/v1/shop/products/').content))
+        response = self.client.post(
+            '/api/v1/auth/login/', msgpack.packb({'username': 'x', 'password': 'y'}), content_type='application/msgpack',
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+class CompressionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Alimentos', slug='alimentos')
+        for i in range(20):
+            Product.objects.create(name=f'Producto {i}', slug=f'producto-{i}', category=category, price=1000 + i, stock=5)
+
+    def test_negotiate(self):
+        """Ensure Accept-Encoding q-values pick the codec, with server preference on ties."""
+        codecs = {'br': None, 'zstd': None, 'gzip': None}
+        self.assertEqual(negotiate('gzip, deflate, br', codecs), 'br')
+        self.assertEqual(negotiate('br;q=0.5, gzip', codecs), 'gzip')
+        self.assertEqual(negotiate('*', codecs), 'br')
+        self.assertEqual(negotiate('*;q=0.5, br;q=0', codecs), 'zstd')
+        self.assertEqual(negotiate('br', {'gzip': None}), None)
+        self.assertIsNone(negotiate('identity', codecs))
+        self.assertIsNone(negotiate('', codecs))
+
+    def test_compressed_responses(self):
+        """Ensure large GET bodies are compressed once per ETag and small or unsafe ones are left alone."""
+        plain = self.client.get('/api/v1/shop/products/')
+        with mock.patch('common.compression.gzip.compress', wraps=gzip.compress) as compress:
+            response = self.client.get('/api/v1/shop/products/', HTTP_ACCEPT_ENCODING='gzip')
+            again = self.client.get('/api/v1/shop/products/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(again.content, response.content)
+        self.assertEqual(response['ETag'], f'W/{plain["ETag"]}')
+        revalidated = self.client.get('/api/v1/shop/products/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+        small = self.client.get('/api/v1/shop/brands/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+        login = self.client.post('/api/v1/auth/login/', {'username': 'x' * 2000, 'password': 'y'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(login.has_header('Content-Encoding'))
+
+    def test_streaming(self):
+        """Ensure streaming responses are compressed chunk by chunk."""
+        lines = [json.dumps({'id': i}).encode() + b'\n' for i in range(1000)]
+        middleware = CompressionMiddleware(lambda request: StreamingHttpResponse(iter(lines), content_type='application/x-ndjson'))
+        response = middleware(RequestFactory().get('/export/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b''.join(lines))
+
@@ -2,8 +2,16 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from apps.shop.models import Product, Category, ProductImage
-from apps.orders.models import Order
-from apps.orders.choices import PaymentMethod
+from apps.orders.models import Order, ProductSalesDay, ProductSalesSummary
+from apps.orders.services import compact_sales, record_sales, set_orders_status
+from datetime import timedelta
+from django.utils import timezone
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from apps.orders.choices import OrderStatus, PaymentMethod
+import csv
+import io
+import json
 
 User = get_user_model()
 
@@ -71,3 +79,121 @@ class OrderTests(APITestCase):
         # Verify Stock Deducted
         self.product.refresh_from_db()
         self.assertEqual(self.product.stock, 8) # 10 - 2 = 8
+
+    def test_insufficient_stock(self):
+        """
+        Ensure a multi-item order decrements all products or none, and stock can never go negative.
+        """
+        other = Product.objects.create(name='Other Product', slug='other-product', category=self.category, price=50, stock=1)
+        payload = {
+            'address': self.address_data,
+            'products': [
+                {'product_id': self.product.id, 'qty': 9},
+                {'product_id': other.id, 'qty': 1},
+                {'product_id': other.id, 'qty': 1},
+            ],
+            'payment_method': PaymentMethod.CASH_ON_DELIVERY,
+        }
+        response = self.client.post(self.orders_url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Stock insuficiente para el producto Other Product', response.data['error'])
+        self.assertNotIn('Test Product', response.data['error'])
+        self.assertEqual(Order.objects.count(), 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
+
+        payload['products'].pop()
+        response = self.client.post(self.orders_url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(list(Product.objects.order_by('id').values_list('stock', flat=True)), [1, 0])
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Product.objects.filter(pk=other.pk).update(stock=F('stock') - 1)
+
+    def test_sales_counters(self):
+        """
+        Ensure orders feed the daily counters and compaction rolls old days out of the window.
+        """
+        payload = {
+            'address': self.address_data,
+            'products': [{'product_id': self.product.id, 'qty': 3}],
+            'payment_method': PaymentMethod.CASH_ON_DELIVERY,
+        }
+        # Los contadores se suman al confirmar el pedido
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.orders_url, payload, format='json')
+        summary = ProductSalesSummary.objects.get(product=self.product)
+        self.assertEqual((summary.sold_7d, summary.sold_30d), (3, 3))
+        # Por tabla: savepoint + filas faltantes + UPDATE + release; las líneas repetidas se suman
+        with self.assertNumQueries(8):
+            record_sales([(self.product.id, 1, 100), (self.product.id, 2, 200)])
+        summary.refresh_from_db()
+        self.assertEqual((summary.sold_7d, summary.sold_30d, summary.revenue_30d), (6, 6, 600))
+
+        ProductSalesDay.objects.create(
+            product=self.product, day=timezone.localdate() - timedelta(days=10), quantity=4, revenue=400
+        )
+        compact_sales()
+        summary.refresh_from_db()
+        self.assertEqual((summary.sold_7d, summary.sold_30d), (6, 10))
+
+    def test_admin_rankings(self):
+        """
+        Ensure the admin rankings only count delivered orders and list unsold products as least selling.
+        """
+        unsold = Product.objects.create(name='Unsold Product', slug='unsold-product', category=self.category, price=10, stock=5)
+        payload = {
+            'address': self.address_data,
+            'products': [{'product_id': self.product.id, 'qty': 3}],
+            'payment_method': PaymentMethod.CASH_ON_DELIVERY,
+        }
+        self.client.post(self.orders_url, payload, format='json')
+        data = self.client.get('/api/v1/admin/home/').json()
+        self.assertEqual(data['best_selling'], [])
+        self.assertEqual(data['least_selling'], [
+            {'name': 'Test Product', 'total_sold': 0}, {'name': unsold.name, 'total_sold': 0},
+        ])
+
+        set_orders_status(Order.objects.all(), OrderStatus.DELIVERED)
+        set_orders_status(Order.objects.all(), OrderStatus.DELIVERED)
+        data = self.client.get('/api/v1/admin/home/').json()
+        self.assertEqual(data['best_selling'], [{'product__name': 'Test Product', 'total_sold': 3}])
+        self.assertEqual(data['least_selling'][0], {'name': unsold.name, 'total_sold': 0})
+
+        ProductSalesSummary.objects.update(delivered_365d=0)
+        compact_sales()
+        self.assertEqual(ProductSalesSummary.objects.get(product=self.product).delivered_365d, 3)
+
+        set_orders_status(Order.objects.all(), OrderStatus.REJECTED)
+        data = self.client.get('/api/v1/admin/home/').json()
+        self.assertEqual(data['best_selling'], [])
+
+    def test_export(self):
+        """
+        Ensure users stream their own order history as NDJSON or CSV with items and payments.
+        """
+        payload = {
+            'address': self.address_data,
+            'products': [{'product_id': self.product.id, 'qty': 2}],
+            'payment_method': PaymentMethod.CASH_ON_DELIVERY,
+            'notes': 'Export',
+        }
+        for _ in range(3):
+            self.client.post(self.orders_url, payload, format='json')
+        other = User.objects.create_user(username='other', password='x')
+        Order.objects.create(user=other, status=Order.objects.first().status)
+
+        response = self.client.get(f'{self.orders_url}export/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['items'][0]['product_slug'], 'test-product')
+        self.assertEqual(rows[0]['items'][0]['subtotal'], '200.00')
+        self.assertEqual(rows[0]['shipping_address']['street_value'], '79a')
+        self.assertEqual(len(rows[0]['payments']), 1)
+
+        response = self.client.get(f'{self.orders_url}export/', {'output': 'csv'})
+        reader = csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode()))
+        self.assertEqual([row['user_username'] for row in reader], ['testuser'] * 3)
+        self.assertEqual(self.client.get(f'{self.orders_url}export/', {'output': 'xml'}).status_code, status.HTTP_400_BAD_REQUEST)
+
@@ -0,0 +1,107 @@
+from rest_framework.test import APITestCase
+from io import StringIO
+from django.core.management import call_command
+from django.core.cache import cache
+from apps.search.engine import index_products, search_product_ids
+from apps.search.models import SearchTerm
+from apps.shop.models import Product, Category, Brand
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = '/api/v1/shop/products/'
+        category = Category.objects.create(name='Panadería', slug='panaderia')
+        brand = Brand.objects.create(name='Masmaí', slug='masmai')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.arepa = Product.objects.create(
+                name='AREPA DE YUCA MASMAÍ 4 UND - 240 G', slug='arepa-yuca', category=category,
+                brand=brand, price=5000, stock=10,
+            )
+            self.arepas = Product.objects.create(
+                name='Arepas de maíz', slug='arepas-maiz', category=category, price=4000, stock=10,
+                description='Arepa tradicional',
+            )
+            self.limon = Product.objects.create(
+                name='Limones Tahití', slug='limones', price=3000, stock=10,
+            )
+
+    def search(self, query):
+        response = self.client.get(self.url, {'search': query})
+        return [product['slug'] for product in response.data['results']]
+
+    def test_accents_plurals_and_ranking(self):
+        """
+        Ensure search folds accents and plurals and ranks by relevance.
+        """
+        self.assertEqual(self.search('masmai'), ['arepa-yuca'])
+        self.assertEqual(self.search('limón'), ['limones'])
+        self.assertEqual(self.search('arepa yuca'), ['arepa-yuca', 'arepas-maiz'])
+        self.assertCountEqual(self.search('panaderia'), ['arepa-yuca', 'arepas-maiz'])
+        self.assertEqual(self.search('chocolate'), [])
+
+    def test_typo_tolerance(self):
+        """
+        Ensure misspelled words still match close terms of the catalog.
+        """
+        self.assertEqual(self.search('tahiti'), ['limones'])
+        self.assertEqual(self.search('tahitu'), ['limones'])
+        self.assertEqual(self.search('masnai'), ['arepa-yuca'])
+
+    def test_incremental_updates_and_rebuild(self):
+        """
+        Ensure the index follows product saves and deletes and can be rebuilt.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.limon.name = 'Naranja Tangelo'
+            self.limon.save()
+        self.assertEqual(search_product_ids('naranjas'), [self.limon.id])
+        self.assertEqual(search_product_ids('tahiti'), [])
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.arepa.decrease_stock(1)
+        self.assertNotIn(index_products, [getattr(callback, 'func', None) for callback in callbacks])
+        self.arepas.delete()
+        self.assertEqual(SearchTerm.objects.get(term='maiz').document_count, 0)
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertFalse(SearchTerm.objects.filter(term='maiz').exists())
+        self.assertEqual(search_product_ids('arepa'), [self.arepa.id])
+
+
+class SuggestTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = '/api/v1/search/suggest/'
+        category = Category.objects.create(name='Lácteos', slug='lacteos')
+        brand = Brand.objects.create(name='Alquería', slug='alqueria')
+        self.leche = Product.objects.create(
+            name='Leche Entera Alquería', slug='leche-entera', category=category, brand=brand,
+            price=4000, stock=10,
+        )
+        self.lechuga = Product.objects.create(
+            name='Lechuga Batavia', slug='lechuga', price=2000, stock=10, reviews_count=5,
+        )
+
+    def test_prefix_suggestions(self):
+        """
+        Ensure suggestions match word prefixes ranked by popularity across products, brands and categories.
+        """
+        response = self.client.get(self.url, {'q': 'Lec'})
+        self.assertEqual([product['slug'] for product in response.data['products']], ['lechuga', 'leche-entera'])
+        self.assertEqual(self.client.get(self.url, {'q': 'leche alq'}).data['products'][0]['slug'], 'leche-entera')
+        response = self.client.get(self.url, {'q': 'alque'})
+        self.assertEqual(response.data['brands'], [{'id': self.leche.brand_id, 'name': 'Alquería', 'slug': 'alqueria'}])
+        self.assertEqual(response.data['categories'], [])
+        self.assertEqual(self.client.get(self.url, {'q': 'lá'}).data['categories'][0]['slug'], 'lacteos')
+
+    def test_refresh_on_catalog_change(self):
+        """
+        Ensure the prefix index is rebuilt when product names change.
+        """
+        self.assertEqual(self.client.get(self.url, {'q': 'kumis'}).data['products'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lechuga.name = 'Kumis Alpina'
+            self.lechuga.save()
+        self.assertEqual(self.client.get(self.url, {'q': 'kumis'}).data['products'][0]['slug'], 'lechuga')
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {'q': 'kum'})
@@ -1,9 +1,30 @@
 from rest_framework.test import APITestCase
 from rest_framework import status
-from apps.shop.models import Product, Category, ProductImage
+from datetime import timedelta
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.core.cache import cache
+from django.utils import timezone
+from apps.shop.home import build_home_rails
+from apps.shop.related import get_neighbors, record_co_purchases
+from apps.shop.services import rebuild_product_counts
+from apps.shop.stock import decrease_stock
+from apps.shop.pricing import apply_campaign, expire_discounts, revert_campaign, sync_campaigns
+from apps.search.engine import index_products
+from apps.shop.models import Product, Category, Brand, CoPurchase, PricingCampaign, ProductImage, ProductNeighbors
+from apps.orders.models import ProductSalesSummary
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import csv
+from unittest import mock
+import json
 
 class ShopTests(APITestCase):
     def setUp(self):
+        cache.clear()
         self.home_url = '/api/v1/shop/home/'
         
         # Create Category
@@ -40,7 +61,8 @@ class ShopTests(APITestCase):
             category=self.category,
             price=150.00,
             stock=20,
-            discount=20
+            discount=20,
+            discount_end_date=timezone.now() + timedelta(days=1)
         )
         ProductImage.objects.create(product=p3, url='http://example.com/img3.jpg')
 
@@ -68,3 +90,607 @@ class ShopTests(APITestCase):
         
         # On sale should contain the product with discount
         self.assertTrue(any(p['slug'] == 'sale-product' for p in data['on_sale']))
+
+    def test_home_rails_are_precomputed(self):
+        """
+        Ensure rails are served from the cache and refreshed when a product changes.
+        """
+        self.client.get(self.home_url)
+        with self.assertNumQueries(0):
+            self.client.get(self.home_url)
+
+        product = Product.objects.get(slug='featured-product')
+        product.is_featured = False
+        product.save()
+        response = self.client.get(self.home_url)
+        self.assertFalse(any(p['slug'] == 'featured-product' for p in response.data['featured']))
+
+    def test_home_rails_expire_with_discounts(self):
+        """
+        Ensure expired discounts are left out and the payload expires with the first shown discount.
+        """
+        ends = timezone.now() + timedelta(hours=1)
+        Product.objects.filter(slug='sale-product').update(discount_end_date=ends)
+        Product.objects.filter(slug='best-seller').update(discount_end_date=timezone.now() - timedelta(hours=1))
+        payload, expires_at = build_home_rails(5)
+        self.assertEqual(expires_at, ends)
+        self.assertEqual([p['slug'] for p in payload['on_sale']], ['sale-product'])
+
+        # Un descuento que vence antes en un producto fuera de los rieles no adelanta el vencimiento
+        hidden = Product.objects.create(
+            name='Hidden Product', slug='hidden-product', category=self.category, price=100, stock=1,
+            discount=5, discount_end_date=timezone.now() + timedelta(minutes=5),
+        )
+        Product.objects.filter(pk=hidden.pk).update(created_at=timezone.now() - timedelta(days=1))
+        payload, expires_at = build_home_rails(1)
+        self.assertNotIn('hidden-product', [p['slug'] for rail in payload.values() for p in rail])
+        self.assertEqual(expires_at, ends)
+
+    def test_home_rails_survive_sales(self):
+        """
+        Ensure stock changes leave the cached rails alone and a discount without end date is not on sale.
+        """
+        Product.objects.filter(slug='sale-product').update(discount_end_date=None)
+        response = self.client.get(self.home_url)
+        self.assertEqual(response.data['on_sale'], [])
+        self.assertNotIn('stock', response.data['featured'][0])
+
+        decrease_stock([(Product.objects.get(slug='featured-product').id, 1)])
+        with self.assertNumQueries(0):
+            self.client.get(self.home_url)
+
+
+class CategoryCountTests(APITestCase):
+    def setUp(self):
+        self.root = Category.objects.create(name='Alimentos', slug='alimentos')
+        self.child = Category.objects.create(name='Arepas', slug='arepas', parent=self.root)
+        self.other = Category.objects.create(name='Aseo', slug='aseo')
+
+    def refresh(self):
+        for category in (self.root, self.child, self.other):
+            category.refresh_from_db()
+
+    def test_counts_follow_product_changes(self):
+        """
+        Ensure subtree counts are kept in sync on create, move and delete.
+        """
+        product = Product.objects.create(name='Arepa', slug='arepa', category=self.child, price=100)
+        Product.objects.create(name='Harina', slug='harina', category=self.root, price=100)
+        self.refresh()
+        self.assertEqual((self.root.product_count, self.child.product_count), (2, 1))
+
+        product.category = self.other
+        product.save()
+        self.refresh()
+        self.assertEqual((self.root.product_count, self.child.product_count, self.other.product_count), (1, 0, 1))
+
+        product.delete()
+        self.refresh()
+        self.assertEqual(self.other.product_count, 0)
+
+    def test_tree_changes(self):
+        """
+        Ensure only moving or deleting nodes rebuilds the counts, and drifted counts never go negative.
+        """
+        Product.objects.create(name='Arepa', slug='arepa', category=self.child, price=100)
+        Category.objects.filter(pk=self.root.pk).update(product_count=5)
+        child = Category.objects.get(pk=self.child.pk)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            child.name = 'Arepas y más'
+            child.save()
+        self.assertNotIn(rebuild_product_counts, callbacks)
+        self.refresh()
+        self.assertEqual(self.root.product_count, 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            child.parent = self.other
+            child.save()
+        self.refresh()
+        self.assertEqual((self.root.product_count, self.other.product_count), (0, 1))
+
+        Category.objects.filter(pk=self.other.pk).update(product_count=0)
+        Product.objects.get(slug='arepa').delete()
+        self.refresh()
+        self.assertEqual((self.other.product_count, self.child.product_count), (0, 0))
+
+
+class CategoryTreeTests(APITestCase):
+    def setUp(self):
+        self.categories_url = '/api/v1/shop/categories/'
+        for i in range(3):
+            root = Category.objects.create(name=f'Root {i}', slug=f'root-{i}')
+            for j in range(3):
+                child = Category.objects.create(name=f'Child {i}{j}', slug=f'child-{i}{j}', parent=root)
+                Category.objects.create(name=f'Leaf {i}{j}', slug=f'leaf-{i}{j}', parent=child)
+
+    def test_tree_in_constant_queries(self):
+        """
+        Ensure the whole tree is serialized from a single ordered query.
+        """
+        with self.assertNumQueries(1):
+            response = self.client.get(self.categories_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        roots = response.data['results']
+        self.assertEqual([root['slug'] for root in roots], ['root-0', 'root-1', 'root-2'])
+        leaf = roots[0]['children'][0]['children'][0]
+        self.assertEqual(leaf['slug'], 'leaf-00')
+        self.assertEqual([ancestor['slug'] for ancestor in leaf['ancestors']], ['root-0', 'child-00'])
+
+    def test_subtree_with_ancestors_and_depth(self):
+        """
+        Ensure a subtree picked by slug carries its breadcrumbs and honours depth.
+        """
+        with self.assertNumQueries(1):
+            response = self.client.get(self.categories_url, {'slug': 'child-10', 'depth': 0})
+        node = response.data['results'][0]
+        self.assertEqual(node['slug'], 'child-10')
+        self.assertEqual([ancestor['slug'] for ancestor in node['ancestors']], ['root-1'])
+        self.assertEqual(node['children'], [])
+
+
+class ProductListTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.products_url = '/api/v1/shop/products/'
+        root = Category.objects.create(name='Alimentos', slug='alimentos')
+        categories = [Category.objects.create(name=f'Sub {i}', slug=f'sub-{i}', parent=root) for i in range(5)]
+        brands = [Brand.objects.create(name=f'Marca {i}', slug=f'marca-{i}') for i in range(3)]
+        for i in range(30):
+            product = Product.objects.create(
+                name=f'Producto {i}',
+                slug=f'producto-{i}',
+                category=categories[i % 5],
+                brand=brands[i % 3],
+                price=1000 + i,
+                stock=10
+            )
+            ProductImage.objects.create(product=product, url=f'http://example.com/{i}-a.jpg')
+            ProductImage.objects.create(product=product, url=f'http://example.com/{i}-b.jpg')
+
+    def test_list_in_constant_queries(self):
+        """
+        Ensure a page of products costs a fixed number of queries and carries flat references.
+        """
+        # next discount expiry + page + images + category paths
+        with self.assertNumQueries(4):
+            response = self.client.get(self.products_url, {'limit': 25})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        product = response.data['results'][0]
+        self.assertEqual(product['category']['path'][0]['slug'], 'alimentos')
+        self.assertEqual(set(product['brand']), {'id', 'name', 'slug'})
+        self.assertEqual(len(product['pictures']), 1)
+
+    def test_price_filters_use_effective_price(self):
+        """
+        Ensure price filters and ordering use the discounted price and expired discounts are swept.
+        """
+        product = Product.objects.get(slug='producto-29')
+        product.discount = 50
+        product.discount_end_date = timezone.now() + timedelta(days=1)
+        product.save()
+        self.assertEqual(product.effective_price, 550)
+
+        response = self.client.get(self.products_url, {'max_price': 600, 'ordering': 'price'})
+        self.assertEqual([p['slug'] for p in response.data['results']], ['producto-29'])
+        response = self.client.get(self.products_url, {'ordering': 'price', 'limit': 2})
+        self.assertEqual(response.data['results'][0]['slug'], 'producto-29')
+
+        # Filtros y orden sobre la columna indexada mientras no haya descuentos vencidos sin barrer
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.products_url, {'min_price': 600, 'ordering': 'price'})
+        self.assertFalse(any('CASE' in query['sql'] for query in queries))
+
+        # Vencido pero sin barrer: filtros y orden usan el precio base y cambia el ETag
+        listing = self.client.get(self.products_url, {'max_price': 600})
+        with mock.patch('django.utils.timezone.now', return_value=product.discount_end_date + timedelta(seconds=1)):
+            response = self.client.get(self.products_url, {'max_price': 600}, HTTP_IF_NONE_MATCH=listing['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['results'], [])
+            response = self.client.get(self.products_url, {'min_price': 1029})
+            self.assertEqual([p['slug'] for p in response.data['results']], ['producto-29'])
+            response = self.client.get(self.products_url, {'ordering': '-price', 'limit': 1})
+            self.assertEqual(response.data['results'][0]['slug'], 'producto-29')
+
+        Product.objects.filter(pk=product.pk).update(discount_end_date=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(expire_discounts(), 1)
+        product.refresh_from_db()
+        self.assertEqual(product.effective_price, product.price)
+
+    def test_keyset_pagination(self):
+        """
+        Ensure cursor pages walk the whole ordering without gaps or repeats at a constant cost.
+        """
+        Product.objects.filter(slug__in=['producto-3', 'producto-4', 'producto-5']).update(
+            price=1003, effective_price=1003
+        )
+        response = self.client.get(self.products_url, {'ordering': '-price', 'limit': 5})
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        pages = [response.data]
+        while pages[-1]['next']:
+            # page + images (las rutas de categorías quedan en caché)
+            with self.assertNumQueries(2):
+                pages.append(self.client.get(pages[-1]['next']).data)
+        slugs = [product['slug'] for page in pages for product in page['results']]
+        self.assertEqual(len(slugs), 30)
+        self.assertEqual(len(set(slugs)), 30)
+        # Empates de precio en el borde de página: desempate por id
+        self.assertEqual(slugs[-6:], [f'producto-{i}' for i in (5, 4, 3, 2, 1, 0)])
+        prices = [product['display_price'] for page in pages for product in page['results']]
+        self.assertEqual(prices, sorted(prices, reverse=True))
+
+        previous = self.client.get(pages[3]['previous']).data
+        self.assertEqual(previous['results'], pages[2]['results'])
+
+        response = self.client.get(self.products_url, {'count': 'true'})
+        self.assertEqual(response.data['count'], 30)
+        with self.assertNumQueries(2):
+            self.client.get(self.products_url, {'count': 'true'})
+        self.assertEqual(self.client.get(self.products_url, {'cursor': 'nope'}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_conditional_get(self):
+        """
+        Ensure catalog endpoints answer 304 from version stamps without querying the database.
+        """
+        for url in (self.products_url, f'{self.products_url}producto-1/', '/api/v1/shop/categories/',
+                    '/api/v1/shop/brands/', '/api/v1/shop/home/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('Last-Modified', response)
+            with self.assertNumQueries(0):
+                cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(cached['ETag'], response['ETag'])
+
+        response = self.client.get(self.products_url)
+        other = self.client.get(self.products_url, {'ordering': 'price'})
+        self.assertNotEqual(response['ETag'], other['ETag'])
+        product = Product.objects.get(slug='producto-1')
+        product.stock = 3
+        product.save()
+        refreshed = self.client.get(self.products_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(refreshed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(refreshed['ETag'], response['ETag'])
+
+    def test_facets(self):
+        """
+        Ensure facet counts cover the filtered result set in a fixed number of queries.
+        """
+        Product.objects.filter(slug__in=['producto-0', 'producto-5']).update(is_new=True)
+        # expiry + count + page + images + category paths + groups + categories + brands + price buckets
+        with self.assertNumQueries(9):
+            response = self.client.get(self.products_url, {'facets': 'true', 'max_price': 1019, 'count': 'true'})
+        facets = response.data['facets']
+        self.assertEqual(response.data['count'], 20)
+        self.assertEqual(facets['categories'][0], {'id': facets['categories'][0]['id'], 'name': 'Alimentos',
+                                                   'slug': 'alimentos', 'parent': None, 'count': 20})
+        self.assertEqual([category['count'] for category in facets['categories'][1:]], [4] * 5)
+        self.assertEqual([brand['count'] for brand in facets['brands']], [7, 7, 6])
+        self.assertEqual(facets['flags'], {'is_new': 2, 'is_top': 0, 'is_featured': 0})
+        self.assertEqual((facets['price']['min'], facets['price']['max']), ('1000.00', '1019.00'))
+        self.assertEqual(facets['price']['buckets'][0], {'min': '1000.00', 'max': '1005.00', 'count': 5})
+        self.assertEqual(sum(bucket['count'] for bucket in facets['price']['buckets']), 20)
+
+        index_products(Product.objects.values_list('id', flat=True))
+        response = self.client.get(self.products_url, {'facets': 'true', 'search': 'producto 7', 'count': 'true'})
+        self.assertEqual(response.data['results'][0]['slug'], 'producto-7')
+        self.assertEqual(sum(brand['count'] for brand in response.data['facets']['brands']), response.data['count'])
+        self.assertNotIn('facets', self.client.get(self.products_url).data)
+
+
+class ProductDetailTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Alimentos', slug='alimentos')
+        other = Category.objects.create(name='Aseo', slug='aseo')
+        self.products = []
+        for i in range(6):
+            product = Product.objects.create(
+                name=f'Producto {i}',
+                slug=f'producto-{i}',
+                category=other if i == 5 else category,
+                price=1000,
+                stock=10
+            )
+            ProductImage.objects.create(product=product, url=f'http://example.com/{i}.jpg')
+            self.products.append(product)
+
+    def test_related_index(self):
+        """
+        Ensure co-purchased products rank first, with same-category fallbacks and neighbours.
+        """
+        first, *_, cross = self.products
+        call_command('build_related_products', stdout=StringIO())
+        record_co_purchases([first.id, cross.id])
+
+        # expiry + product + its images + neighbours row + products in bulk + their images + category paths
+        with self.assertNumQueries(7):
+            response = self.client.get(f'/api/v1/shop/products/{first.slug}/')
+        related = [p['slug'] for p in response.data['related']]
+        self.assertEqual(related[0], cross.slug)
+        self.assertEqual(len(related), 4)
+        self.assertIsNone(response.data['previous'])
+        self.assertEqual(response.data['next']['slug'], 'producto-1')
+        self.assertEqual(response.data['product']['category'], {
+            'id': first.category_id, 'slug': 'alimentos', 'name': 'Alimentos', 'path': [],
+        })
+
+
+    def test_co_purchases_in_bulk(self):
+        """
+        Ensure an order's pairs are counted with a fixed number of queries and detail pages never write.
+        """
+        ids = [product.id for product in self.products[:4]]
+        ProductNeighbors.objects.all().delete()
+        self.assertEqual(get_neighbors(self.products[0]).next_id, ids[1])
+        self.assertFalse(ProductNeighbors.objects.exists())
+
+        record_co_purchases(ids)
+        # savepoint + insert of missing pairs + update + release, then the neighbours rows
+        with self.assertNumQueries(5):
+            record_co_purchases(ids)
+        self.assertEqual(CoPurchase.objects.count(), 12)
+        self.assertEqual(set(CoPurchase.objects.values_list('orders_count', flat=True)), {2})
+
+
+class CatalogImportTests(APITestCase):
+    CSV = (
+        "\ufeffproducto;precio;subcategoria;categoria;imagen\n"
+        "AREPA DE YUCA MASMAÍ 4 UND - 240 G;$ 4.190;Arepas;Alimentos y despensas;http://example.com/a.jpg\n"
+        "ARROZ DIANA 500 G;$ 2.130;Granos;Alimentos y despensas;\n"
+        "JABÓN REY;$ 3.000;;Aseo;http://example.com/j.jpg\n"
+        "SIN PRECIO;;Granos;Alimentos y despensas;\n"
+    )
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'products.csv')
+
+    def run_import(self, content, *args):
+        with open(self.path, 'w', encoding='utf-8') as csv_file:
+            csv_file.write(content)
+        out = StringIO()
+        call_command('import_products', self.path, '--chunk-size', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_and_diff(self):
+        """
+        Ensure the importer upserts by slug, builds the category tree and only touches changed rows in diff mode.
+        """
+        output = self.run_import(self.CSV + "SAL REFISAL;$ 1.000;;Condimentos;\n" * 2)
+        self.assertIn('4 created, 0 updated, 0 unchanged, 2 skipped', output)
+        # bulk_create no dispara señales: vecinos y resúmenes los arma finish()
+        self.assertEqual(ProductNeighbors.objects.count(), 4)
+        self.assertEqual(ProductSalesSummary.objects.count(), 4)
+        self.assertEqual(self.client.get('/api/v1/shop/products/sal-refisal/').status_code, status.HTTP_200_OK)
+        arepa = Product.objects.get(slug='arepa-de-yuca-masmaí-4-und---240-g')
+        self.assertEqual(arepa.price, 4200)
+        self.assertEqual(arepa.effective_price, 4200)
+        self.assertEqual(arepa.category.parent.slug, 'alimentos-y-despensas')
+        self.assertEqual(Category.objects.get(slug='alimentos-y-despensas').product_count, 2)
+        self.assertEqual(Product.objects.get(slug='jabón-rey').category.slug, 'aseo')
+        self.assertEqual(ProductImage.objects.count(), 2)
+        self.assertTrue(Category.objects.get(slug='granos').is_child_node())
+
+        arepa.stock = 7
+        arepa.save()
+        output = self.run_import(self.CSV.replace('$ 2.130', '$ 2.500'), '--diff')
+        self.assertIn('0 created, 1 updated, 2 unchanged', output)
+        self.assertEqual(Product.objects.get(slug='arroz-diana-500-g').price, 2500)
+        self.assertEqual(Product.objects.get(pk=arepa.pk).stock, 7)
+
+
+class WishlistTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = '/api/v1/shop/wishlist/'
+        self.user = get_user_model().objects.create_user(username='ana', password='secret')
+        category = Category.objects.create(name='Alimentos', slug='alimentos')
+        self.products = [
+            Product.objects.create(
+                name=f'Producto {i}', slug=f'producto-{i}', category=category, price=1000 + i, stock=10, is_featured=True,
+            )
+            for i in range(4)
+        ]
+        self.client.force_authenticate(self.user)
+
+    def test_add_list_remove(self):
+        """
+        Ensure products can be added idempotently, listed newest first with keyset pages and removed.
+        """
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        for product in (self.products[0], self.products[2], self.products[0]):
+            response = self.client.post(self.url, {'product': product.id})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.post(self.url, {'product': 999}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {'limit': 1})
+        self.assertEqual([p['slug'] for p in response.data['results']], ['producto-2'])
+        self.assertTrue(response.data['results'][0]['in_wishlist'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([p['slug'] for p in response.data['results']], ['producto-0'])
+        self.assertIsNone(response.data['next'])
+
+        self.assertEqual(self.client.delete(f'{self.url}{self.products[2].id}/').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.delete(f'{self.url}{self.products[2].id}/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(self.client.get(self.url).data['results']), 1)
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_listing_flags(self):
+        """
+        Ensure listings and home flag wishlist products from one cached id set and per-user ETags.
+        """
+        self.client.post(self.url, {'product': self.products[1].id})
+        response = self.client.get('/api/v1/shop/products/')
+        flags = {p['slug']: p['in_wishlist'] for p in response.data['results']}
+        self.assertEqual(flags, {'producto-0': False, 'producto-1': True, 'producto-2': False, 'producto-3': False})
+        self.assertIn('Authorization', response['Vary'])
+        # Ids y rutas ya en caché: solo la página y sus imágenes
+        with self.assertNumQueries(2):
+            self.client.get('/api/v1/shop/products/', {'ordering': 'price'})
+
+        home = self.client.get('/api/v1/shop/home/')
+        self.assertEqual([p['in_wishlist'] for p in home.data['featured'] if p['slug'] == 'producto-1'], [True])
+        self.client.force_authenticate(None)
+        anonymous = self.client.get('/api/v1/shop/home/')
+        self.assertFalse(any(p['in_wishlist'] for p in anonymous.data['featured']))
+        self.assertNotEqual(anonymous['ETag'], home['ETag'])
+
+        self.client.force_authenticate(self.user)
+        self.client.delete(f'{self.url}{self.products[1].id}/')
+        refreshed = self.client.get('/api/v1/shop/products/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(refreshed.status_code, status.HTTP_200_OK)
+        self.assertFalse(any(p['in_wishlist'] for p in refreshed.data['results']))
+
+
+class ProductExportTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        root = Category.objects.create(name='Alimentos', slug='alimentos')
+        child = Category.objects.create(name='Granos', slug='granos', parent=root)
+        brand = Brand.objects.create(name='Diana', slug='diana')
+        for i in range(7):
+            product = Product.objects.create(
+                name=f'Arroz {i}', slug=f'arroz-{i}', category=child if i % 2 else root, brand=brand, price=1000 + i, stock=3,
+            )
+            ProductImage.objects.create(product=product, url=f'http://example.com/{i}.jpg')
+
+    def test_export_in_chunks(self):
+        """
+        Ensure the catalog export walks the table in keyset chunks with a fixed number of queries per chunk.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'products.ndjson')
+        with CaptureQueriesContext(connection) as queries:
+            call_command('export_products', path, '--chunk-size', '3', stdout=StringIO())
+        # rutas de categoría + 3 bloques (productos + imágenes) + el bloque vacío final
+        self.assertEqual(len(queries), 1 + 3 * 2 + 1)
+        with open(path) as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual([row['slug'] for row in rows], [f'arroz-{i}' for i in range(7)])
+        self.assertEqual(rows[1]['category']['path'], ['alimentos', 'granos'])
+        self.assertEqual(rows[1]['images'], ['http://example.com/1.jpg'])
+        self.assertEqual(rows[1]['price'], '1001.00')
+
+        path = os.path.join(directory.name, 'products.csv')
+        call_command('export_products', path, '--format', 'csv', stdout=StringIO())
+        with open(path, newline='') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]['brand_slug'], 'diana')
+        self.assertEqual(json.loads(rows[1]['category_path']), ['alimentos', 'granos'])
+
+    def test_export_endpoint(self):
+        """
+        Ensure staff can stream a filtered export and customers cannot.
+        """
+        url = '/api/v1/shop/products/export/'
+        self.client.force_authenticate(get_user_model().objects.create_user(username='ana', password='x'))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(get_user_model().objects.create_user(username='staff', password='x', is_staff=True))
+        response = self.client.get(url, {'category': 'granos', 'output': 'csv'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="products.csv"')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1 + 3)
+
+
+class PricingCampaignTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.root = Category.objects.create(name='Alimentos', slug='alimentos')
+        self.child = Category.objects.create(name='Arepas', slug='arepas', parent=self.root)
+        self.other = Category.objects.create(name='Aseo', slug='aseo')
+        self.brand = Brand.objects.create(name='Marca', slug='marca')
+        self.products = [
+            Product.objects.create(name=f'Arepa {i}', slug=f'arepa-{i}', category=self.child, price=1000)
+            for i in range(3)
+        ]
+        self.harina = Product.objects.create(name='Harina', slug='harina', category=self.root, price=2000, brand=self.brand)
+        self.jabon = Product.objects.create(name='Jabón', slug='jabon', category=self.other, price=1000, brand=self.brand)
+
+    def campaign(self, **kwargs):
+        fields = {'name': 'Campaña', 'discount': 15, 'starts_at': self.now - timedelta(minutes=1),
+                  'ends_at': self.now + timedelta(days=1)}
+        return PricingCampaign.objects.create(**{**fields, **kwargs})
+
+    def test_apply_to_category_subtree(self):
+        """Ensure a campaign discounts the whole subtree with a constant number of statements."""
+        campaign = self.campaign(category=self.root)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(apply_campaign(campaign, self.now), 4)
+        statements = len(queries)
+
+        self.harina.refresh_from_db()
+        self.assertEqual(self.harina.discount, 15)
+        self.assertEqual(self.harina.discount_end_date, campaign.ends_at)
+        self.assertEqual(self.harina.effective_price, 1700)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).effective_price, 850)
+        self.assertEqual(Product.objects.get(pk=self.jabon.pk).discount, 0)
+        self.assertEqual(campaign.status, PricingCampaign.Status.ACTIVE)
+
+        for i in range(3, 10):
+            Product.objects.create(name=f'Arepa {i}', slug=f'arepa-{i}', category=self.child, price=1000)
+        campaign = self.campaign(category=self.child, discount=20)
+        with CaptureQueriesContext(connection) as queries:
+            # Los productos de la primera campaña activa no se vuelven a tomar
+            self.assertEqual(apply_campaign(campaign, self.now), 7)
+        self.assertEqual(len(queries), statements)
+
+    def test_keeps_better_discount(self):
+        """Ensure products with a larger active discount or another active campaign are skipped."""
+        Product.objects.filter(pk=self.harina.pk).update(discount=30, discount_end_date=self.now + timedelta(days=2))
+        apply_campaign(self.campaign(brand=self.brand, discount=10), self.now)
+        self.assertEqual(apply_campaign(self.campaign(category=self.root), self.now), 3)
+
+        self.harina.refresh_from_db()
+        self.jabon.refresh_from_db()
+        self.assertEqual(self.harina.discount, 30)
+        self.assertEqual(self.jabon.discount, 10)
+
+    def test_revert_restores_previous_discount(self):
+        """Ensure reverting restores the previous discount and leaves manual edits alone."""
+        end_date = self.now + timedelta(days=3)
+        Product.objects.filter(pk=self.products[0].pk).update(discount=5, discount_end_date=end_date)
+        campaign = self.campaign(category=self.child)
+        apply_campaign(campaign, self.now)
+        Product.objects.filter(pk=self.products[1].pk).update(discount=40, discount_end_date=end_date)
+
+        self.assertEqual(revert_campaign(campaign, self.now), 2)
+        self.assertEqual(revert_campaign(campaign, self.now), 0)
+        restored, edited, plain = (Product.objects.get(pk=product.pk) for product in self.products)
+        self.assertEqual((restored.discount, restored.discount_end_date, restored.effective_price), (5, end_date, 950))
+        self.assertEqual((edited.discount, edited.effective_price), (40, 600))
+        self.assertEqual((plain.discount, plain.discount_end_date, plain.effective_price), (0, None, 1000))
+
+    def test_product_set(self):
+        """Ensure a campaign without category or brand targets only its products."""
+        campaign = self.campaign()
+        campaign.products.set([self.jabon, self.products[0]])
+        self.assertEqual(apply_campaign(campaign, self.now), 2)
+        self.assertEqual(
+            set(Product.objects.filter(discount=15).values_list('id', flat=True)), {self.jabon.id, self.products[0].id}
+        )
+
+    def test_sync_campaigns(self):
+        """Ensure the sweep applies started campaigns, reverts ended ones and skips expired windows."""
+        campaign = self.campaign(brand=self.brand)
+        missed = PricingCampaign.objects.create(
+            name='Vieja', discount=50, starts_at=self.now - timedelta(days=2), ends_at=self.now - timedelta(days=1),
+            category=self.root,
+        )
+        out = StringIO()
+        call_command('sync_campaigns', stdout=out)
+        self.assertIn('1 campaigns applied, 0 reverted', out.getvalue())
+        missed.refresh_from_db()
+        self.assertEqual(missed.status, PricingCampaign.Status.ENDED)
+        self.assertEqual(Product.objects.get(pk=self.jabon.pk).effective_price, 850)
+
+        self.assertEqual(sync_campaigns(campaign.ends_at), (0, 1))
+        jabon = Product.objects.get(pk=self.jabon.pk)
+        self.assertEqual((jabon.discount, jabon.effective_price), (0, 1000))